@@ -5,22 +5,96 @@ WRITE_TO_FILE = True
 PROFILING_OUTPUT_FILE_PATH = 'profiling_results.txt'
 ANALYSIS_OUTPUT_FILE_PATH = 'constraints_suggestions.txt'
 FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK = False
+# With ADF framework templates on, accepted suggestions of all tables are also exported as one MERGE script
+# into the DQ rules table. Rules are matched by table, column and rule, so reruns update rules in place
+ADF_FRAMEWORK_DATASOURCE_DESC = '<DS>'
+ADF_FRAMEWORK_DQ_RULES_TABLE = 'UKI_STG_MTD.DQ_RULES'
+ADF_FRAMEWORK_MERGE_SCRIPT_PATH = 'adf_dq_rules_merge.sql'
+
+# Per-column stats of every run are appended to a Parquet dataset partitioned by run date and table
+FLAG_STORE_PROFILING_HISTORY = False
+PROFILING_HISTORY_PATH = 'profiling_history'
+# Compares the current profile of each column with the previous one from the history store,
+# drifted columns are listed in the "DRIFT" section of constraint suggestions
+FLAG_DETECT_DRIFT = False
 
 CSV_SEPARATOR = ','
+# Spark "path" can be a file, a directory, a glob or a list of them, all files are profiled as one table.
+# Format is detected from the extension or from the first data file found, "format" key overrides it.
+# Datasets spread over more directories than the threshold are listed in parallel by a Spark job.
+# Driver lists directories one by one with a round trip of 50-100 ms each on object stores, while a listing job
+# takes about a second to schedule, so it pays off from about 10 directories instead of Spark's default of 32
+SPARK_PARALLEL_LISTING_THRESHOLD = 10
+# Every Spark table is profiled in a session of its own with shuffle partitions, AQE and broadcast settings
+# chosen from its size and column count. Chosen settings are stored in the trace file with the table timings
+FLAG_TUNE_SPARK_EXECUTION = False
+
+# Tables are ordered largest first and packed into concurrency slots by cost estimated from
+# row counts, file sizes and timings of earlier runs. Timings of every run are appended to the trace file
+MAX_CONCURRENT_TABLES = 4
+PROFILING_TRACE_FILE_PATH = 'profiling_trace.jsonl'
+
+# Max number of partitions profiled at the same time for tables configured with "partitioned": True.
+# Partitioned tables are profiled partition by partition, table totals are merged from the partitions profiles.
+# Optional "partitions" key limits profiling to the listed partitions, e.g. ["dt=2023-06-01/country=UK"]
+PARTITION_PARALLELISM = 4
+
+# Column batching collects stats of many columns with one aggregate query and one GROUPING SETS query per batch
+# instead of two queries per column. Useful for wide tables, batches are grouped by column type and shrunk
+# automatically when a batch query fails or its statement is longer than COLUMN_BATCH_MAX_STATEMENT_LENGTH
+FLAG_BATCH_COLUMNS = False
+COLUMN_BATCH_MAX_COST = 100
+COLUMN_BATCH_MAX_STATEMENT_LENGTH = 500000
+
+# Queries running longer than QUERY_TIMEOUT_SEC or past TABLE_TIMEOUT_SEC from the start of their table are cancelled,
+# by the Snowflake connector and by cancelling the job group in Spark. Timed out columns are retried with
+# approximate stats and then with a DEGRADED_SAMPLE_PERCENT sample, the used strategy is stored with column stats.
+# None turns a limit off, e.g. QUERY_TIMEOUT_SEC = 1800 and TABLE_TIMEOUT_SEC = 4 * 3600
+QUERY_TIMEOUT_SEC = None
+TABLE_TIMEOUT_SEC = None
+DEGRADED_SAMPLE_PERCENT = 1
+
+# Key discovery estimates distinct counts of column combinations up to KEY_DISCOVERY_MAX_KEY_SIZE columns
+# with HLL sketches over combined hashes, level by level, extending only combinations which are not unique yet.
+# Found candidates are verified with an exact GROUP BY and suggested as UNIQUENESS rules of the table
+FLAG_DISCOVER_KEYS = False
+KEY_DISCOVERY_MAX_KEY_SIZE = 3
+
+# Suggested NULLABILITY, MINMAX, DETERMINED_LIST, INCONSISTENT_NAMES, FUTURE_DATES and PATTERN rules of a table
+# are compiled into one aggregate query counting violations of every rule, results are added to the suggestions
+FLAG_VALIDATE_SUGGESTED_RULES = False
+
+# "python main.py --coordinator" puts TO_PROFILE into a SQLite work queue and waits for results of all workers,
+# "python main.py --worker" started on the same host pulls tables of the latest run from it. The queue is single-host
+# only, SQLite locking is not reliable on network file systems, so WORK_QUEUE_PATH must not be shared over NFS or SMB.
+# Largest tables are pulled first, tables of workers silent for longer than WORK_QUEUE_LEASE_SEC are pulled again
+WORK_QUEUE_PATH = 'profiling_queue.sqlite'
+WORK_QUEUE_LEASE_SEC = 300
+WORK_QUEUE_WORKER_IDLE_SEC = 60
+
+# "python main.py --serve" starts a long-lived service keeping Spark and Snowflake sessions warm between jobs.
+# Jobs are posted as JSON {"tables": [...], "constraint_identification_rules": {...}, "wait": true} to /jobs
+# and polled at /jobs/<JOB_ID>, tables are configured the same way as in TO_PROFILE
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_MAX_CONCURRENT_JOBS = 2
+SERVICE_MAX_FINISHED_JOBS = 100
 
 # Logic of constraint identification rules can be found at utils.constraint_identifier.ConstraintIdentifier
 # Available identification rules:
 # ## "NULLABILITY" with property "nullability_threshold". Property is 0.99 by default.
-# ## "MINMAX"
+# ## "MINMAX" with property "range_tolerance". Range spans 5th to 95th percentiles widened by this share of the span,
+#    within min and max. Property is 0.1 by default, None suggests raw min and max
 # ## "DETERMINED_LIST" with property "list_size_threshold". Property is 10 by default.
 # ## "INCONSISTENT_NAMES"
 # ## "FUTURE_DATES"
 # ## "FOREIGN_KEYS"
+# ## "PATTERN" with property "pattern_share_threshold". Property is 0.99 by default.
 
 CONSTRAINT_IDENTIFICATION_RULES = {
     ColumnType.NUMERIC.value: [
         {"rule": "NULLABILITY", "properties": {"nullability_threshold": 0.99}},
-        {"rule": "MINMAX", "properties": {}},
+        {"rule": "MINMAX", "properties": {"range_tolerance": 0.1}},
         {"rule": "INCONSISTENT_NAMES", "properties": {}},
         {"rule": "DETERMINED_LIST", "properties": {"list_size_threshold": 2}},
         {"rule": "FOREIGN_KEYS", "properties": {}},
@@ -34,9 +108,16 @@ CONSTRAINT_IDENTIFICATION_RULES = {
         {"rule": "INCONSISTENT_NAMES", "properties": {}},
         {"rule": "DETERMINED_LIST", "properties": {"list_size_threshold": 7}},
         {"rule": "FOREIGN_KEYS", "properties": {}},
+        {"rule": "PATTERN", "properties": {"pattern_share_threshold": 0.99}},
     ]
 }
 
+# Distinct values with their counts are collected in the stats pass for columns with fewer distinct values
+# than the largest DETERMINED_LIST threshold, they are rendered into DETERMINED_LIST regexp suggestions
+VALUE_SET_LIMIT = max([rule["properties"].get("list_size_threshold", 10)
+                       for rules in CONSTRAINT_IDENTIFICATION_RULES.values()
+                       for rule in rules if rule["rule"] == "DETERMINED_LIST"], default=0)
+
 debug_table = {
     "datasource_type": "SNF",
     "schema": "UKI_DWH_SNU",
@@ -70,6 +151,31 @@ parquet_debug_table_1 = {
     "path": "data/IQVIA_OLP_SALES_TRAN.parquet",
     "name": "IQVIA_OLP_SALES_TRAN",
 }
+parquet_partitioned_debug_table_1 = {
+    "path": "data/IQVIA_OLP_SALES_TRAN_PARTITIONED.parquet",
+    "name": "IQVIA_OLP_SALES_TRAN_PARTITIONED",
+    "partitioned": True,
+}
+sliced_debug_table = {
+    "datasource_type": "SNF",
+    "schema": "UKI_DTM_SNU",
+    "name": "DIM_CUSTOMER",
+    # Only a slice of the table is profiled, "filter" takes any SQL predicate,
+    # "time_window" takes "column" with "last_days" and/or "from"/"to" bounds
+    "time_window": {"column": "DWH_CREATEDT", "last_days": 30},
+}
+landing_debug_table = {
+    "path": "data/landing/IQVIA_OLP_SALES_TRAN/*/",
+    "name": "IQVIA_OLP_SALES_TRAN_LANDING",
+}
+budgeted_debug_table = {
+    "datasource_type": "SNF",
+    "schema": "UKI_DTM_SNU",
+    "name": "DIM_CUSTOMER",
+    # Profiling starts from a small sample and is refined until the budget runs out,
+    # "seconds" and/or "bytes" (estimated bytes scanned) can be set
+    "budget": {"seconds": 600},
+}
 
 TO_PROFILE = [
     debug_table,      # testing custom columns
@@ -79,4 +185,8 @@ TO_PROFILE = [
     csv_debug_table_1,    # testing SparkProfiler - non-empty table
     csv_debug_table_2,    # testing SparkProfiler - empty table
     parquet_debug_table_1, #testing SparkProfiler parquet file - non-empty table 
+    # parquet_partitioned_debug_table_1,  # testing SparkProfiler partition-parallel profiling
+    # budgeted_debug_table,  # testing profiling within time budget
+    # sliced_debug_table,  # testing profiling of the last days of a table
+    # landing_debug_table,  # testing SparkProfiler on a folder of files read as one table
 ]
@@ -0,0 +1,62 @@
+ADF_DATASOURCES_TABLE = "UKI_STG_MTD.DATASOURCES"
+
+# Columns of the DQ rules table of the ADF framework, besides DQ_RULE_ID and DATASOURCE_ID
+ADF_RULE_COLUMNS = [
+    "DQ_ACTION_ID",
+    "DQ_RULE_DESC",
+    "META_DQ_DIMENSION",
+    "META_RULE_TYPE",
+    "META_SUITES",
+    "META_RULE_LEVEL",
+    "PARAM_TABLE_NAME",
+    "PARAM_TABLE_COLUMN",
+    "PARAM_MIN",
+    "PARAM_MAX",
+    "PARAM_REGEXP",
+    "PARAM_S2T_VIEW",
+    "PARAM_DEFAULT",
+    "IS_ACTIVE",
+]
+
+
+def build_sql_string_literal(value: str) -> str:
+    # Escaped to survive as a Snowflake string literal
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def build_adf_rule(rule_type_code: int,
+                   dq_dimension: str,
+                   rule_type: str,
+                   suites: str,
+                   related_table: str,
+                   related_column: str,
+                   **params) -> dict:
+    # Values are kept as SQL expressions, so the rule can be rendered both as a single SELECT and as a row of a bulk MERGE
+    return {
+        "RULE_TYPE_CODE": rule_type_code,
+        "VALUES": {
+            "DQ_ACTION_ID": "NULL",
+            "DQ_RULE_DESC": "NULL",
+            "META_DQ_DIMENSION": build_sql_string_literal(dq_dimension),
+            "META_RULE_TYPE": build_sql_string_literal(rule_type),
+            "META_SUITES": build_sql_string_literal(suites),
+            "META_RULE_LEVEL": build_sql_string_literal("EXTENDED"),
+            "PARAM_TABLE_NAME": build_sql_string_literal(related_table),
+            "PARAM_TABLE_COLUMN": build_sql_string_literal(related_column),
+            "PARAM_MIN": params.get("param_min", "NULL"),
+            "PARAM_MAX": params.get("param_max", "NULL"),
+            "PARAM_REGEXP": build_sql_string_literal(params["param_regexp"]) if params.get("param_regexp") else "NULL",
+            "PARAM_S2T_VIEW": "NULL",
+            "PARAM_DEFAULT": build_sql_string_literal(params["param_default"]) if params.get("param_default") else "NULL",
+            "IS_ACTIVE": "TRUE",
+        },
+    }
+
+
+def render_adf_rule_select(adf_rule: dict) -> str:
+    values = ",\n                                    ".join(f"{adf_rule['VALUES'][column]} AS {column}"
+                                                           for column in ADF_RULE_COLUMNS)
+    return f"""SELECT
+                                    <DS><DL>{adf_rule["RULE_TYPE_CODE"]}<NUM> as DQ_RULE_ID,
+                                    (SELECT DATASOURCE_ID FROM {ADF_DATASOURCES_TABLE} WHERE DATASOURCE_DESC = '<DS>') AS DATASOURCE_ID,
+                                    {values}"""
@@ -1,16 +1,157 @@
+import json
+
 from pyspark.sql import DataFrame
 
 from utils.executors import Executor, SnowflakeExecutor, SparkExecutor
 from helpers.object_types import ColumnType
+from helpers.exceptions import IncorrectTimeWindowError
+from helpers.query_limits import EXACT_STRATEGY, SAMPLE_STRATEGY
+from helpers.text_patterns import TEXT_PATTERNS, infer_embedded_type
+from helpers.distribution_stats import PERC25_IDX, MEDIAN_IDX, PERC75_IDX, build_spark_percentiles_expression, \
+    build_spark_distribution_expressions, build_snf_distribution_expressions, build_sign_expressions, \
+    convert_distribution_to_dict
+
+
+SAMPLE_SEED = 42
+
+SEMI_STRUCTURED_DATA_TYPES = ['VARIANT', 'OBJECT', 'ARRAY']
+
+
+def build_snf_sample_clause(sample_percent: float = None) -> str:
+    # Block sampling skips whole micro-partitions, so sampled queries also scan less data
+    return f" SAMPLE BLOCK ({sample_percent}) SEED ({SAMPLE_SEED})" if sample_percent else ""
+
+
+def build_text_shape_expressions(column_name: str, alias_prefix: str = "") -> list[str]:
+    # Pattern matches, lengths and character-class signatures are plain aggregates,
+    # so they are collected in the same pass as distinct counts without a query per pattern
+    value = f"CAST({column_name} AS STRING)"
+    signature = f"REGEXP_REPLACE(REGEXP_REPLACE({value}, '[A-Za-z]+', 'A'), '[0-9]+', '9')"
+    return [f"COUNT({value}) as {alias_prefix}shape_cnt"] \
+        + [f"COUNT_IF({value} RLIKE '{regexp}') as {alias_prefix}{pattern}_cnt"
+           for pattern, regexp in TEXT_PATTERNS.items()] \
+        + [f"MIN(LENGTH({value})) as {alias_prefix}len_min",
+           f"MAX(LENGTH({value})) as {alias_prefix}len_max",
+           f"APPROX_COUNT_DISTINCT({signature}) as {alias_prefix}signature_uniq",
+           f"MODE({signature}) as {alias_prefix}top_signature"]
+
+
+def convert_text_shape_to_dict(row, alias_prefix: str = "") -> dict:
+    shape_cnt = int(row[f"{alias_prefix}shape_cnt"] or 0)
+    text_shape = {f"{pattern}_share": int(row[f"{alias_prefix}{pattern}_cnt"] or 0) / shape_cnt if shape_cnt else 0
+                  for pattern in TEXT_PATTERNS}
+    text_shape.update({
+        "len_min": int(row[f"{alias_prefix}len_min"] or 0),
+        "len_max": int(row[f"{alias_prefix}len_max"] or 0),
+        "signature_uniq": int(row[f"{alias_prefix}signature_uniq"] or 0),
+        "top_signature": str(row[f"{alias_prefix}top_signature"]),
+    })
+    text_shape["inferred_type"] = infer_embedded_type(text_shape)
+    return text_shape
+
+
+def convert_value_set_to_dict(value_set: list[dict], uniq: int, value_set_limit: int) -> dict:
+    # The value set is reported only when it holds every distinct value of the column.
+    # One value over the limit is collected only to tell that the column has too many values
+    values = [entry for entry in value_set if not entry.get("is_null_value")]
+    if not values or len(values) < uniq or uniq > value_set_limit:
+        return {}
+    return {
+        "value_set": [{"value": str(entry["value"]), "freq": int(entry["freq"])}
+                      for entry in sorted(values, key=lambda x: -int(x["freq"]))]
+    }
+
+
+def build_candidate_key_stat(approx_uniq: int, col_type: str) -> dict:
+    # Top values of near-unique columns are not collected, distinct counts are taken from the HLL estimate
+    candidate_key_stat = {
+        "uniq": approx_uniq,
+        "top_value": "NULL",
+        "top_freq": 0,
+        "top_share": 0,
+        "candidate_key": True,
+        "approximate": ["uniq"],
+    }
+    if col_type not in [ColumnType.NUMERIC.value, ColumnType.TIMESTAMP.value]:
+        candidate_key_stat["uniq_upper"] = approx_uniq
+        candidate_key_stat["approximate"].append("uniq_upper")
+    return candidate_key_stat
+
+
+def build_approximate_distinct_stat(approx_uniq: int, col_type: str) -> dict:
+    # Approximate strategies skip the top values scan for every column, not only for near-unique ones
+    approximate_stat = build_candidate_key_stat(approx_uniq, col_type)
+    del approximate_stat["candidate_key"]
+    approximate_stat["approximate"].append("top_value")
+    return approximate_stat
+
+
+def get_time_zone(df_table: DataFrame = None) -> str:
+    # Spark renders timestamps in the session time zone. Snowflake timestamps are converted from epochs
+    # of their wall clock time, so they are rendered in UTC
+    if df_table is None:
+        return "UTC"
+    return df_table.sparkSession.conf.get("spark.sql.session.timeZone")
+
+
+def build_failed_column_stat(col_type: str, error: str) -> dict:
+    return {
+        "ERROR": error,
+        "col_type": col_type,
+        "uniq": 0,
+        "uniq_upper": 0,
+        "top_value": "NULL",
+        "top_freq": 0,
+        "top_share": 0,
+    }
+
+
+def build_filter_predicate(table_info: dict) -> str | None:
+    # "filter" is a SQL predicate, "time_window" limits profiling to a slice of a date or timestamp column,
+    # e.g. {"column": "DWH_CREATEDT", "last_days": 30} or {"column": "DWH_CREATEDT", "from": "2023-06-01"}
+    predicates = [f"({table_info['filter']})"] if table_info.get("filter") else []
+    time_window = table_info.get("time_window")
+    if time_window:
+        if not isinstance(time_window, dict) or not time_window.get("column") \
+           or not any(time_window.get(bound) for bound in ["last_days", "from", "to"]):
+            raise IncorrectTimeWindowError(time_window)
+        if time_window.get("last_days"):
+            predicates.append(f"{time_window['column']} >= CURRENT_DATE() - {int(time_window['last_days'])}")
+        if time_window.get("from"):
+            predicates.append(f"{time_window['column']} >= {TableRulesCheck.build_string_literal(time_window['from'])}")
+        if time_window.get("to"):
+            predicates.append(f"{time_window['column']} < {TableRulesCheck.build_string_literal(time_window['to'])}")
+    return " AND ".join(predicates) if predicates else None
 
 
 class Table:
     def __init__(self, schema: str, name: str):
         self.schema = schema
         self.name = name
+        self.sample_percent = None
+        self.filter_predicate = None
+
+    @property
+    def relation(self) -> str:
+        schema = "" if not self.schema else self.schema + "."
+        relation = f"{schema}{self.name}{self.build_sample_clause()}"
+        if self.filter_predicate:
+            # Filter is a part of every generated query, so Snowflake prunes micro-partitions for each of them
+            return f"(SELECT * FROM {relation} WHERE {self.filter_predicate}) profiled_slice"
+        return relation
+
+    def build_sample_clause(self) -> str:
+        # Spark tables are sampled on the DataFrame level before being registered as a view
+        return ""
 
 
 class TableColumn(Table):
+    # Columns with an HLL distinct estimate this close to their count are treated as candidate keys,
+    # since the GROUP BY for their top values shuffles the whole table to find a frequency of 1
+    NEAR_UNIQUE_SHARE = 0.95
+    # Smaller columns are cheap to group and keep exact stats
+    NEAR_UNIQUE_MIN_COUNT = 10000
+
     def __init__(self, schema: str, table_name: str, column_name: str, **kwargs):
         super().__init__(schema, table_name)
         self.related_schema = self.schema
@@ -19,22 +160,43 @@ class TableColumn(Table):
         self.col_type = kwargs.get("col_type")
         self.df_table = kwargs.get("df_table")
         self.configured_table_name = kwargs.get("configured_table_name")
+        self.sample_percent = kwargs.get("sample_percent")
+        self.filter_predicate = kwargs.get("filter_predicate")
+        self.value_set_limit = kwargs.get("value_set_limit", 0)
+        self.approx_uniq = None
+        self.table_cnt = None
+
+    @property
+    def near_unique(self) -> bool:
+        return self.approx_uniq is not None
+
+    @classmethod
+    def is_near_unique(cls, cnt: int, approx_uniq: int) -> bool:
+        return cnt >= cls.NEAR_UNIQUE_MIN_COUNT and approx_uniq >= cls.NEAR_UNIQUE_SHARE * cnt
+
+    def apply_cardinality_guard(self, count_stat: dict):
+        if self.is_near_unique(count_stat.get("count", 0), count_stat.get("approx_uniq", 0)):
+            self.approx_uniq = min(count_stat["approx_uniq"], count_stat["count"])
 
     async def get_count(self, executor: Executor) -> dict:
-        schema = "" if not self.related_schema else self.related_schema + "."
         sql = f"""SELECT
                     COUNT({self.column_name}) as cnt,
-                    COUNT({self.column_name})/COUNT(*) as share
-                FROM {schema}{self.related_table}"""
+                    COUNT({self.column_name})/COUNT(*) as share,
+                    APPROX_COUNT_DISTINCT({self.column_name}) as approx_uniq,
+                    COUNT(*) as table_cnt
+                FROM {self.relation}"""
         df = await executor.execute_select(sql, df_table=self.df_table)
         if "cnt" not in df.columns:
             return {
                 "ERROR": str(df.head()[0]),
                 "STATEMENT_WAS_TIRED_TO_EXECUTE": str(df.head()[1]),
             }
+        # Top shares of the stats pass are taken from the row count, the relation is not counted again
+        self.table_cnt = int(df.head()["table_cnt"])
         return {
             "count": int(df.head()["cnt"]),
             "share": float(df.head()["share"]),
+            "approx_uniq": int(df.head()["approx_uniq"]),
         }
 
     async def calc_column_stat(self, executor: SparkExecutor) -> dict:
@@ -65,14 +227,11 @@ class TableColumn(Table):
                 return "SELECT 'Unknown data type' as ERROR"
 
     def build_script_for_numeric_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
-        return f"""with quarters_base as (
-                    SELECT 
-                        {self.column_name},
-                        NTILE(4) OVER (ORDER BY {self.column_name}) AS quarter
-                    FROM {schema}{self.related_table}
-                )
-                SELECT
+        # Quartiles, moments and histogram percentiles are aggregates of one pass, no window sort is needed
+        percentiles = build_spark_percentiles_expression(self.column_name)
+        distribution = ",\n                        ".join(build_spark_distribution_expressions(self.column_name)
+                                                          + build_sign_expressions(self.column_name))
+        return f"""SELECT
                     *
                 FROM (
                     SELECT
@@ -80,85 +239,103 @@ class TableColumn(Table):
                         AVG({self.column_name}) as mean,
                         MIN({self.column_name}) as min,
                         MAX({self.column_name}) as max,
-                        perc25,
-                        median,
-                        perc75
-                    FROM {schema}{self.related_table}
-                    JOIN (select max({self.column_name}) as perc25 from quarters_base where quarter = 1) ON 1=1
-                    JOIN (select max({self.column_name}) as median from quarters_base where quarter = 2) ON 1=1
-                    JOIN (select max({self.column_name}) as perc75 from quarters_base where quarter = 3) ON 1=1
+                        {percentiles}[{PERC25_IDX}] as perc25,
+                        {percentiles}[{MEDIAN_IDX}] as median,
+                        {percentiles}[{PERC75_IDX}] as perc75,
+                        {distribution}
+                    FROM {self.relation}
                 )
                 JOIN (
-                    SELECT
-                        COUNT(DISTINCT {self.column_name}) as uniq,
-                        COALESCE(cast({self.column_name} as varchar), 'NULL') as top_value,
-                        COUNT(*) as top_freq,
-                        COUNT(*) / (SELECT COUNT(*) FROM {self.related_table}) as top_share
-                    FROM {schema}{self.related_table}
-                    GROUP BY {self.column_name}
-                    ORDER BY 3 DESC
-                    LIMIT 1
+                    {self.build_script_for_top_values_collection()}
                 ) s ON 1=1"""
 
     def build_script_for_datetime_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
-        return f"""with quarters_base as (
-            SELECT 
-                {self.column_name},
-                NTILE(4) OVER (ORDER BY {self.column_name}) AS quarter
-            FROM {schema}{self.related_table}
-        )
-        SELECT
-            *
-        FROM (
-            SELECT
-                '{ColumnType.TIMESTAMP.value}' AS col_type,
-                median as mean,
-                MIN({self.column_name}) as min,
-                MAX({self.column_name}) as max,
-                perc25,
-                median,
-                perc75
-            FROM {schema}{self.related_table}
-            JOIN (select max({self.column_name}) as perc25 from quarters_base where quarter = 1) ON 1=1
-            JOIN (select max({self.column_name}) as median from quarters_base where quarter = 2) ON 1=1
-            JOIN (select max({self.column_name}) as perc75 from quarters_base where quarter = 3) ON 1=1
-        )
-        JOIN (
-            SELECT
-                COUNT(DISTINCT {self.column_name}) as uniq,
-                COALESCE(cast({self.column_name} as varchar), 'NULL') as top_value,
-                COUNT(*) as top_freq,
-                COUNT(*) / (SELECT COUNT(*) FROM {self.related_table}) as top_share
-            FROM {schema}{self.related_table}
-            GROUP BY {self.column_name}
-            ORDER BY 3 DESC
-            LIMIT 1
-        ) s ON 1=1"""
+        epoch = f"unix_timestamp({self.column_name})"
+        percentiles = build_spark_percentiles_expression(epoch)
+        distribution = ",\n                        ".join(build_spark_distribution_expressions(epoch))
+        return f"""SELECT
+                    *
+                FROM (
+                    SELECT
+                        '{ColumnType.TIMESTAMP.value}' AS col_type,
+                        timestamp_seconds(AVG({epoch})) as mean,
+                        MIN({self.column_name}) as min,
+                        MAX({self.column_name}) as max,
+                        timestamp_seconds({percentiles}[{PERC25_IDX}]) as perc25,
+                        timestamp_seconds({percentiles}[{MEDIAN_IDX}]) as median,
+                        timestamp_seconds({percentiles}[{PERC75_IDX}]) as perc75,
+                        {distribution}
+                    FROM {self.relation}
+                )
+                JOIN (
+                    {self.build_script_for_top_values_collection()}
+                ) s ON 1=1"""
 
     def build_script_for_text_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
+        text_shape = ",\n                        ".join(build_text_shape_expressions(self.column_name))
+        return f"""SELECT
+                    *
+                FROM (
+                    SELECT
+                        '{ColumnType.TEXT.value}' as col_type,
+                        {self.build_upper_distinct_expression()} as uniq_upper,
+                        {text_shape}
+                    FROM {self.relation}
+                )
+                JOIN (
+                    {self.build_script_for_top_values_collection()}
+                ) s ON 1=1"""
+
+    def build_upper_distinct_expression(self) -> str:
+        return "0" if self.near_unique else f"COUNT(DISTINCT UPPER({self.column_name}))"
+
+    def build_top_share_expression(self) -> str:
+        if self.table_cnt is None:
+            return f"MAX(top_freq) / (SELECT COUNT(*) FROM {self.relation})"
+        return f"MAX(top_freq) / {self.table_cnt}" if self.table_cnt else "0"
+
+    def build_script_for_near_unique_top_values_stub(self) -> str:
+        return "SELECT 0 as uniq, 'NULL' as top_value, 0 as top_freq, 0 as top_share, '[]' as value_set"
+
+    def build_script_for_top_values_collection(self) -> str:
+        if self.near_unique:
+            return self.build_script_for_near_unique_top_values_stub()
+        # Only the most frequent groups are kept, so the value set stays bounded for high-cardinality columns.
+        # One extra group is reserved for NULL to keep the set complete for nullable columns
         return f"""SELECT
-                    '{ColumnType.TEXT.value}' as col_type,
-                    COUNT(DISTINCT {self.column_name}) as uniq,
-                    COUNT(DISTINCT UPPER({self.column_name})) as uniq_upper,
-                    COALESCE({self.column_name}, 'NULL') as top_value,
-                    COUNT(*) as top_freq,
-                    COUNT(*) / (SELECT COUNT(*) FROM {schema}{self.related_table}) as top_share
-                FROM
-                    {schema}{self.related_table}
-                GROUP BY {self.column_name}
-                ORDER BY 5 DESC
-                LIMIT 1"""
+                        MAX(uniq) as uniq,
+                        MAX_BY(top_value, top_freq) as top_value,
+                        MAX(top_freq) as top_freq,
+                        {self.build_top_share_expression()} as top_share,
+                        TO_JSON(COLLECT_LIST(STRUCT(top_value as value,
+                                                    top_freq as freq,
+                                                    is_null_value))) as value_set
+                    FROM (
+                        SELECT
+                            COALESCE(CAST({self.column_name} AS STRING), 'NULL') as top_value,
+                            {self.column_name} IS NULL as is_null_value,
+                            COUNT(*) as top_freq,
+                            COUNT({self.column_name}) OVER () as uniq
+                        FROM {self.relation}
+                        GROUP BY {self.column_name}
+                        ORDER BY 3 DESC
+                        LIMIT {self.value_set_limit + 1}
+                    ) top_values"""
 
     def convert_df_stat_to_dict(self, df: DataFrame, col_type: str = ColumnType.TEXT.value):
         match col_type:
             case ColumnType.NUMERIC.value:
-                return self.convert_df_with_numeric_stat_to_dict(df)
+                col_stat = self.convert_df_with_numeric_stat_to_dict(df)
             case ColumnType.TIMESTAMP.value:
-                return self.convert_df_with_datetime_stat_to_dict(df)
+                col_stat = self.convert_df_with_datetime_stat_to_dict(df, get_time_zone(self.df_table))
             case _:
-                return self.convert_df_with_text_stat_to_dict(df)
+                col_stat = self.convert_df_with_text_stat_to_dict(df)
+        col_stat.update(convert_value_set_to_dict(json.loads(df.head()["value_set"] or "[]"),
+                                                  col_stat["uniq"],
+                                                  self.value_set_limit))
+        if self.near_unique:
+            col_stat.update(build_candidate_key_stat(self.approx_uniq, col_stat["col_type"]))
+        return col_stat
 
     @staticmethod
     def convert_df_with_numeric_stat_to_dict(df: DataFrame) -> dict:
@@ -174,10 +351,11 @@ class TableColumn(Table):
             "median": float(df.head()["median"] if df.head()["median"] else 0),
             "perc75": float(df.head()["perc75"] if df.head()["perc75"] else 0),
             "max": float(df.head()["max"] if df.head()["max"] else 0),
+            **convert_distribution_to_dict(df.head(), ColumnType.NUMERIC.value),
         }
 
     @staticmethod
-    def convert_df_with_datetime_stat_to_dict(df: DataFrame) -> dict:
+    def convert_df_with_datetime_stat_to_dict(df: DataFrame, time_zone: str = "UTC") -> dict:
         return {
             "col_type": str(df.head()["col_type"]),
             "uniq": int(df.head()["uniq"]),
@@ -190,6 +368,7 @@ class TableColumn(Table):
             "median": str(df.head()["median"]),
             "perc75": str(df.head()["perc75"]),
             "max": str(df.head()["max"]),
+            **convert_distribution_to_dict(df.head(), ColumnType.TIMESTAMP.value, time_zone=time_zone),
         }
 
     @staticmethod
@@ -201,18 +380,334 @@ class TableColumn(Table):
             "top_value": str(df.head()["top_value"]),
             "top_freq": int(df.head()["top_freq"]),
             "top_share": float(df.head()["top_share"]),
+            "text_shape": convert_text_shape_to_dict(df.head()),
+        }
+
+
+class TableColumnsBatch(Table):
+    def __init__(self, schema: str, table_name: str, columns: list[TableColumn], **kwargs):
+        super().__init__(schema, table_name)
+        self.related_schema = self.schema
+        self.related_table = self.name
+        self.columns = columns
+        self.df_table = kwargs.get("df_table")
+        self.value_set_limit = kwargs.get("value_set_limit", 0)
+        self.sample_percent = kwargs.get("sample_percent")
+        self.filter_predicate = kwargs.get("filter_predicate")
+        self.near_unique_columns = set()
+        self.approximate = False
+        self.sampled_fraction = None
+
+    def apply_strategy(self, strategy: str, sample_percent: float):
+        # Cheaper strategies for columns timed out with exact stats: "approximate" drops the top values scan,
+        # "sample" also reads only a sample of the table
+        self.approximate = strategy != EXACT_STRATEGY
+        if strategy != SAMPLE_STRATEGY:
+            return
+        self.sampled_fraction = sample_percent / 100
+        if self.df_table is not None:
+            sampled_df = self.df_table.sample(fraction=self.sampled_fraction, seed=SAMPLE_SEED)
+            sampled_df.name = self.name = f"{self.df_table.name}__sampled"
+            self.df_table = sampled_df
+        else:
+            self.sample_percent = (self.sample_percent or 100) * self.sampled_fraction
+
+    async def calc_batch_stat(self, executor: Executor) -> dict | None:
+        try:
+            aggregates_df = await executor.execute_select(self.build_script_for_aggregate_stat_collection(),
+                                                          df_table=self.df_table)
+            if "table_cnt" not in aggregates_df.columns:
+                return None
+            aggregates = aggregates_df.head()
+
+            # The HLL estimates of the aggregate pass decide which columns are left out of the GROUPING SETS scan
+            self.near_unique_columns = {col_idx for col_idx in range(len(self.columns))
+                                        if TableColumn.is_near_unique(int(aggregates[f"c{col_idx}_cnt"]),
+                                                                      int(aggregates[f"c{col_idx}_approx_uniq"]))}
+            top_values = []
+            if not self.approximate and len(self.near_unique_columns) < len(self.columns):
+                top_values_df = await executor.execute_select(self.build_script_for_top_values_collection(),
+                                                              df_table=self.df_table)
+                if "stat_key" not in top_values_df.columns:
+                    return None
+                top_values = top_values_df.collect()
+        except Exception:
+            return None
+        return self.convert_batch_stat_to_dict(aggregates, top_values)
+
+    def build_script_for_aggregate_stat_collection(self) -> str:
+        expressions = ",\n                    ".join(
+            expression
+            for col_idx, column in enumerate(self.columns)
+            for expression in self.build_aggregate_expressions(col_idx, column))
+        return f"""SELECT
+                    COUNT(*) as table_cnt,
+                    {expressions}
+                FROM {self.relation}"""
+
+    def build_aggregate_expressions(self, col_idx: int, column: TableColumn) -> list[str]:
+        expressions = [f"COUNT({column.column_name}) as c{col_idx}_cnt",
+                       f"APPROX_COUNT_DISTINCT({column.column_name}) as c{col_idx}_approx_uniq"]
+        match column.col_type:
+            case ColumnType.NUMERIC.value:
+                expressions += [f"AVG({column.column_name}) as c{col_idx}_mean",
+                                f"MIN({column.column_name}) as c{col_idx}_min",
+                                f"MAX({column.column_name}) as c{col_idx}_max"]
+                expressions += self.build_percentile_expressions(col_idx, column)
+                expressions += self.build_distribution_expressions(column.column_name, f"c{col_idx}_")
+                expressions += build_sign_expressions(column.column_name, f"c{col_idx}_")
+            case ColumnType.TIMESTAMP.value:
+                epoch = self.build_epoch_expression(column.column_name)
+                expressions += [f"{self.build_timestamp_expression(f'AVG({epoch})')} as c{col_idx}_mean",
+                                f"MIN({column.column_name}) as c{col_idx}_min",
+                                f"MAX({column.column_name}) as c{col_idx}_max"]
+                expressions += self.build_percentile_expressions(col_idx, column)
+                expressions += self.build_distribution_expressions(epoch, f"c{col_idx}_")
+            case _:
+                expressions += build_text_shape_expressions(column.column_name, f"c{col_idx}_")
+        return expressions
+
+    @staticmethod
+    def build_percentile_expressions(col_idx: int, column: TableColumn) -> list[str]:
+        # Quartiles index into the sketch of the histogram percentiles, so no separate sketch is computed
+        if column.col_type == ColumnType.TIMESTAMP.value:
+            percentiles = build_spark_percentiles_expression(f"unix_timestamp({column.column_name})")
+            return [f"timestamp_seconds({percentiles}[{idx}]) as c{col_idx}_{stat_name}"
+                    for idx, stat_name in [(PERC25_IDX, "perc25"), (MEDIAN_IDX, "median"), (PERC75_IDX, "perc75")]]
+        percentiles = build_spark_percentiles_expression(column.column_name)
+        return [f"{percentiles}[{idx}] as c{col_idx}_{stat_name}"
+                for idx, stat_name in [(PERC25_IDX, "perc25"), (MEDIAN_IDX, "median"), (PERC75_IDX, "perc75")]]
+
+    @staticmethod
+    def build_distribution_expressions(value: str, alias_prefix: str) -> list[str]:
+        return build_spark_distribution_expressions(value, alias_prefix)
+
+    @staticmethod
+    def build_epoch_expression(column_name: str) -> str:
+        return f"unix_timestamp({column_name})"
+
+    @staticmethod
+    def build_timestamp_expression(epoch: str) -> str:
+        return f"timestamp_seconds({epoch})"
+
+    def build_script_for_top_values_collection(self) -> str:
+        # Exact distinct counts and top values of all batch columns are taken from one GROUPING SETS scan
+        # instead of a separate GROUP BY query per column
+        stat_keys = []
+        base_expressions = []
+        for col_idx, column in enumerate(self.columns):
+            if col_idx in self.near_unique_columns:
+                continue
+            stat_keys.append(f"c{col_idx}")
+            base_expressions.append(f"CAST({column.column_name} AS STRING) as c{col_idx}")
+            if column.col_type not in [ColumnType.NUMERIC.value, ColumnType.TIMESTAMP.value]:
+                stat_keys.append(f"c{col_idx}_upper")
+                base_expressions.append(f"UPPER(CAST({column.column_name} AS STRING)) as c{col_idx}_upper")
+
+        stat_key_case = " ".join(f"WHEN GROUPING({key}) = 0 THEN '{key}'" for key in stat_keys)
+        value_case = " ".join(f"WHEN GROUPING({key}) = 0 THEN {key}" for key in stat_keys)
+        base_columns = ",\n                            ".join(base_expressions)
+        grouping_sets = ", ".join(f"({key})" for key in stat_keys)
+        return f"""SELECT
+                    stat_key,
+                    COALESCE(grp_value, 'NULL') as top_value,
+                    grp_value IS NULL as is_null_value,
+                    freq as top_freq,
+                    uniq
+                FROM (
+                    SELECT
+                        stat_key,
+                        grp_value,
+                        freq,
+                        COUNT(grp_value) OVER (PARTITION BY stat_key) as uniq,
+                        ROW_NUMBER() OVER (PARTITION BY stat_key ORDER BY freq DESC) as rn
+                    FROM (
+                        SELECT
+                            CASE {stat_key_case} END as stat_key,
+                            CASE {value_case} END as grp_value,
+                            COUNT(*) as freq
+                        FROM (
+                            SELECT
+                            {base_columns}
+                            FROM {self.relation}
+                        ) batch_base
+                        GROUP BY GROUPING SETS ({grouping_sets})
+                    ) batch_groups
+                ) batch_ranked
+                WHERE rn <= {self.value_set_limit + 1}"""
+
+    def convert_batch_stat_to_dict(self, aggregates, top_values: list) -> dict:
+        table_cnt = int(aggregates["table_cnt"])
+        top_by_key, top_values_by_key = {}, {}
+        for row in sorted(top_values, key=lambda x: -int(x["top_freq"])):
+            top_by_key.setdefault(row["stat_key"], row)
+            top_values_by_key.setdefault(row["stat_key"], []).append({"value": row["top_value"],
+                                                                      "freq": row["top_freq"],
+                                                                      "is_null_value": row["is_null_value"]})
+
+        batch_stat = {}
+        for col_idx, column in enumerate(self.columns):
+            top = top_by_key.get(f"c{col_idx}")
+            cnt = int(aggregates[f"c{col_idx}_cnt"])
+            col_stat = {
+                "count": cnt,
+                "share": cnt / table_cnt if table_cnt else 0,
+                "col_type": column.col_type,
+                "uniq": int(top["uniq"]) if top else 0,
+                "top_value": str(top["top_value"]) if top else "NULL",
+                "top_freq": int(top["top_freq"]) if top else 0,
+                "top_share": int(top["top_freq"]) / table_cnt if top and table_cnt else 0,
+                "approx_uniq": int(aggregates[f"c{col_idx}_approx_uniq"]),
+                **convert_value_set_to_dict(top_values_by_key.get(f"c{col_idx}", []),
+                                            int(top["uniq"]) if top else 0,
+                                            self.value_set_limit),
+            }
+            match column.col_type:
+                case ColumnType.NUMERIC.value:
+                    for stat_name in ["mean", "min", "perc25", "median", "perc75", "max"]:
+                        value = aggregates[f"c{col_idx}_{stat_name}"]
+                        col_stat[stat_name] = float(value if value else 0)
+                    col_stat.update(convert_distribution_to_dict(aggregates, column.col_type, f"c{col_idx}_"))
+                case ColumnType.TIMESTAMP.value:
+                    for stat_name in ["mean", "min", "perc25", "median", "perc75", "max"]:
+                        col_stat[stat_name] = str(aggregates[f"c{col_idx}_{stat_name}"])
+                    col_stat.update(convert_distribution_to_dict(aggregates, column.col_type, f"c{col_idx}_",
+                                                                 get_time_zone(self.df_table)))
+                case _:
+                    top_upper = top_by_key.get(f"c{col_idx}_upper")
+                    col_stat["uniq_upper"] = int(top_upper["uniq"]) if top_upper else 0
+                    col_stat["text_shape"] = convert_text_shape_to_dict(aggregates, f"c{col_idx}_")
+            if col_idx in self.near_unique_columns:
+                col_stat.update(build_candidate_key_stat(min(col_stat["approx_uniq"], cnt), column.col_type))
+            elif self.approximate:
+                col_stat.update(build_approximate_distinct_stat(min(col_stat["approx_uniq"], cnt), column.col_type))
+            if self.sampled_fraction:
+                # Counts are scaled up to the whole table, shares stay as measured on the sample
+                col_stat["count"] = round(cnt / self.sampled_fraction)
+            batch_stat[column.column_name] = col_stat
+        return batch_stat
+
+
+class TableColumnsCombinations(Table):
+    def __init__(self, schema: str, table_name: str, **kwargs):
+        super().__init__(schema, table_name)
+        self.df_table = kwargs.get("df_table")
+        self.sample_percent = kwargs.get("sample_percent")
+        self.filter_predicate = kwargs.get("filter_predicate")
+
+    @staticmethod
+    def build_combination_hash_expression(columns: list[str]) -> str:
+        # 64-bit hash keeps collisions negligible for HLL estimates over billions of rows
+        return f"XXHASH64({', '.join(columns)})"
+
+    async def estimate_distinct_counts(self,
+                                       executor: Executor,
+                                       combinations: list[tuple[str, ...]]) -> dict[tuple[str, ...], int] | None:
+        expressions = ",\n                    ".join(
+            f"APPROX_COUNT_DISTINCT({self.build_combination_hash_expression(list(combination))}) as k{num}_approx_uniq"
+            for num, combination in enumerate(combinations))
+        sql = f"""SELECT
+                    COUNT(*) as table_cnt,
+                    {expressions}
+                FROM {self.relation}"""
+        df = await executor.execute_select(sql, df_table=self.df_table)
+        if "table_cnt" not in df.columns:
+            return None
+        return {combination: int(df.head()[f"k{num}_approx_uniq"]) for num, combination in enumerate(combinations)}
+
+    async def count_duplicated_keys(self, executor: Executor, combination: tuple[str, ...]) -> int | None:
+        sql = f"""SELECT
+                    COUNT(*) as duplicated_keys
+                FROM (
+                    SELECT
+                        1
+                    FROM {self.relation}
+                    GROUP BY {', '.join(combination)}
+                    HAVING COUNT(*) > 1
+                ) duplicates"""
+        df = await executor.execute_select(sql, df_table=self.df_table)
+        if "duplicated_keys" not in df.columns:
+            return None
+        return int(df.head()["duplicated_keys"])
+
+
+class TableRulesCheck(Table):
+    def __init__(self, schema: str, table_name: str, **kwargs):
+        super().__init__(schema, table_name)
+        self.df_table = kwargs.get("df_table")
+        self.filter_predicate = kwargs.get("filter_predicate")
+
+    @staticmethod
+    def build_string_literal(value) -> str:
+        return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+    def build_bound_literal(self, bound, col_type: str) -> str:
+        # Timestamp bounds are kept as strings by the profilers, they are cast back to compare with the column
+        if col_type == ColumnType.NUMERIC.value:
+            return str(bound)
+        return f"CAST({self.build_string_literal(bound)} AS TIMESTAMP)"
+
+    def build_violation_expression(self, rule: str, column_name: str, constraint: dict, base_info: dict) -> str | None:
+        # Every rule is an aggregate over the same relation, so all rules of a table are checked in one scan
+        value = f"CAST({column_name} AS STRING)"
+        match rule:
+            case "NULLABILITY":
+                return f"COUNT_IF({column_name} IS NULL)"
+            case "MINMAX" if base_info.get("min") not in [None, "None"] and base_info.get("max") not in [None, "None"]:
+                bounds = constraint.get("RANGE") or base_info
+                lower = self.build_bound_literal(bounds["min"], base_info.get("col_type"))
+                upper = self.build_bound_literal(bounds["max"], base_info.get("col_type"))
+                return f"COUNT_IF({column_name} < {lower} OR {column_name} > {upper})"
+            case "FUTURE_DATES":
+                return f"COUNT_IF({column_name} > CURRENT_TIMESTAMP())"
+            case "INCONSISTENT_NAMES":
+                # Every distinct value merging with another one when trimmed and upper-cased counts as a violation
+                return f"COUNT(DISTINCT {value}) - COUNT(DISTINCT UPPER(TRIM({value})))"
+            case "DETERMINED_LIST" if constraint.get("VALUES"):
+                values = ", ".join(self.build_string_literal(value) for value in constraint["VALUES"])
+                return f"COUNT_IF({value} NOT IN ({values}))"
+            case "PATTERN":
+                return f"COUNT_IF(NOT ({value} RLIKE {self.build_string_literal(constraint['PATTERN'])}))"
+            case _:
+                return None
+
+    def build_script_for_rules_check(self, expressions: list[str]) -> str:
+        violations = ",\n                    ".join(f"{expression} as r{num}_violations"
+                                                     for num, expression in enumerate(expressions))
+        return f"""SELECT
+                    COUNT(*) as table_cnt,
+                    {violations}
+                FROM {self.relation}"""
+
+    async def count_violations(self, executor: Executor, expressions: list[str]) -> dict | None:
+        df = await executor.execute_select(self.build_script_for_rules_check(expressions), df_table=self.df_table)
+        if "table_cnt" not in df.columns:
+            return None
+        return {
+            "table_cnt": int(df.head()["table_cnt"]),
+            "violations": [int(df.head()[f"r{num}_violations"] or 0) for num in range(len(expressions))],
         }
 
 
 class SNFTable(Table):
-    def __init__(self, schema: str, name: str, columns: list[str] = None):
+    def __init__(self,
+                 schema: str,
+                 name: str,
+                 columns: list[str] = None,
+                 sample_percent: float = None,
+                 filter_predicate: str = None):
         super().__init__(schema, name)
         self.columns = columns
+        self.sample_percent = sample_percent
+        self.filter_predicate = filter_predicate
+
+    def build_sample_clause(self) -> str:
+        return build_snf_sample_clause(self.sample_percent)
 
     async def get_count(self, executor: SnowflakeExecutor) -> dict | None:
         sql = f"""SELECT
                     COUNT(*) as cnt
-                FROM {self.schema}.{self.name}"""
+                FROM {self.relation}"""
         df = await executor.execute_select(sql)
         if "cnt" not in df.columns:
             print(df.head())
@@ -229,6 +724,20 @@ class SNFTable(Table):
             "TABLE_COUNT": int(df.head()["cnt"]),
         }
 
+    async def get_size(self, executor: SnowflakeExecutor) -> dict:
+        sql = f"""SELECT
+                    ROW_COUNT as row_count,
+                    BYTES as bytes
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = UPPER('{self.schema}') and TABLE_NAME in ('{self.name}')"""
+        df = await executor.execute_select(sql)
+        if "row_count" not in df.columns or not df.head():
+            return {}
+        return {
+            "ROWS": int(df.head()["row_count"] or 0),
+            "BYTES": int(df.head()["bytes"] or 0),
+        }
+
     async def get_columns_list(self, executor: SnowflakeExecutor) -> list[str] | None:
         sql = f"""WITH tmp AS (
             SELECT
@@ -244,10 +753,78 @@ class SNFTable(Table):
         df = await executor.execute_select(sql)
         return df.head()["table_columns"].split(",")
 
+    async def get_columns_types(self, executor: SnowflakeExecutor) -> dict[str, str]:
+        sql = f"""SELECT
+                COLUMN_NAME as column_name,
+                DATA_TYPE as data_type
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = UPPER('{self.schema}') and TABLE_NAME in ('{self.name}')
+            ORDER BY ORDINAL_POSITION"""
+        df = await executor.execute_select(sql)
+        if "data_type" not in df.columns:
+            return {}
+        return {row["column_name"]: self.map_data_type_to_column_type(row["data_type"]) for row in df.collect()}
+
+    async def get_semi_structured_columns(self, executor: SnowflakeExecutor) -> list[str]:
+        sql = f"""SELECT
+                COLUMN_NAME as column_name
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = UPPER('{self.schema}') and TABLE_NAME in ('{self.name}')
+                and DATA_TYPE in ({", ".join(f"'{data_type}'" for data_type in SEMI_STRUCTURED_DATA_TYPES)})
+            ORDER BY ORDINAL_POSITION"""
+        df = await executor.execute_select(sql)
+        if "column_name" not in df.columns:
+            return []
+        return [row["column_name"] for row in df.collect()]
+
+    async def get_semi_structured_paths(self, executor: SnowflakeExecutor, columns: list[str]) -> dict[str, str] | None:
+        # All columns are wrapped into one object, so leaf paths of every column are discovered with a single scan.
+        # Array positions are collapsed into [], elements of an array share their paths
+        sql = f"""SELECT
+                    REGEXP_REPLACE(f.path, '[[][0-9]+[]]', '[]') as leaf_path,
+                    COUNT_IF(TYPEOF(f.value) NOT IN ('INTEGER', 'DECIMAL', 'DOUBLE')) = 0 as is_numeric
+                FROM {self.relation},
+                    LATERAL FLATTEN(input => OBJECT_CONSTRUCT({", ".join(f"'{col}', {col}" for col in columns)}),
+                                    RECURSIVE => TRUE) f
+                WHERE TYPEOF(f.value) NOT IN ('OBJECT', 'ARRAY', 'NULL_VALUE')
+                GROUP BY 1
+                ORDER BY 1"""
+        df = await executor.execute_select(sql)
+        if "leaf_path" not in df.columns:
+            return None
+        return {row["leaf_path"]: ColumnType.NUMERIC.value if row["is_numeric"] else ColumnType.TEXT.value
+                for row in df.collect()}
+
+    @staticmethod
+    def split_variant_path(leaf_path: str) -> tuple[str, str]:
+        # Discovered paths start with the column name, the rest is a path within the column value
+        root_end = min([pos for pos in [leaf_path.find("."), leaf_path.find("[")] if pos >= 0] or [len(leaf_path)])
+        return leaf_path[:root_end], leaf_path[root_end:]
+
+    @staticmethod
+    def build_variant_path_expression(root: str, path: str, col_type: str = None) -> str:
+        # FLATTEN keeps keys with special characters in brackets and separates the rest with dots
+        expression = root if not path else f"{root}:{path[1:]}" if path.startswith(".") else f"{root}{path}"
+        if col_type is None:
+            return expression
+        return f"{expression}::{'float' if col_type == ColumnType.NUMERIC.value else 'varchar'}"
+
+    @staticmethod
+    def map_data_type_to_column_type(data_type: str) -> str:
+        if data_type in ['NUMBER', 'DECIMAL', 'NUMERIC', 'INT', 'INTEGER', 'BIGINT', 'SMALLINT',
+                         'FLOAT', 'DOUBLE', 'REAL']:
+            return ColumnType.NUMERIC.value
+        elif data_type == 'DATE' or data_type.startswith('TIMESTAMP'):
+            return ColumnType.TIMESTAMP.value
+        return ColumnType.TEXT.value
+
 
 class SNFTableColumn(TableColumn):
-    def __init__(self, schema: str, table_name: str, column_name: str):
-        super().__init__(schema, table_name, column_name)
+    def __init__(self, schema: str, table_name: str, column_name: str, **kwargs):
+        super().__init__(schema, table_name, column_name, **kwargs)
+
+    def build_sample_clause(self) -> str:
+        return build_snf_sample_clause(self.sample_percent)
 
     async def calc_column_stat(self, executor: SnowflakeExecutor) -> dict:
         sql = f"""EXECUTE IMMEDIATE
@@ -291,8 +868,32 @@ class SNFTableColumn(TableColumn):
             }
         return self.convert_df_stat_to_dict(df, df.head()["col_type"])
 
+    def build_script_for_top_values_collection(self) -> str:
+        if self.near_unique:
+            return self.build_script_for_near_unique_top_values_stub()
+        return f"""SELECT
+                        MAX(uniq) as uniq,
+                        MAX_BY(top_value, top_freq) as top_value,
+                        MAX(top_freq) as top_freq,
+                        {self.build_top_share_expression()} as top_share,
+                        TO_JSON(ARRAY_AGG(OBJECT_CONSTRUCT('value', top_value,
+                                                           'freq', top_freq,
+                                                           'is_null_value', is_null_value))) as value_set
+                    FROM (
+                        SELECT
+                            COALESCE({self.column_name}::varchar, 'NULL') as top_value,
+                            {self.column_name} IS NULL as is_null_value,
+                            COUNT(*) as top_freq,
+                            COUNT({self.column_name}) OVER () as uniq
+                        FROM {self.relation}
+                        GROUP BY {self.column_name}
+                        ORDER BY 3 DESC
+                        LIMIT {self.value_set_limit + 1}
+                    ) top_values"""
+
     def build_script_for_numeric_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
+        distribution = ",\n                        ".join(build_snf_distribution_expressions(self.column_name)
+                                                          + build_sign_expressions(self.column_name))
         return f"""SELECT
                     *
                 FROM (
@@ -305,23 +906,17 @@ class SNFTableColumn(TableColumn):
                             (ORDER BY {self.column_name}) as perc25,
                         MEDIAN({self.column_name}) as median,
                         PERCENTILE_CONT(0.75) WITHIN GROUP
-                            (ORDER BY {self.column_name}) as perc75
-                    FROM {schema}{self.related_table}
+                            (ORDER BY {self.column_name}) as perc75,
+                        {distribution}
+                    FROM {self.relation}
                 )
                 JOIN (
-                    SELECT
-                        COUNT(DISTINCT {self.column_name}) OVER() as uniq,
-                        COALESCE({self.column_name}::varchar, 'NULL') as top_value,
-                        COUNT(*) as top_freq,
-                        COUNT(*) / (SELECT COUNT(*) FROM {schema}{self.related_table}) as top_share
-                    FROM {schema}{self.related_table}
-                    GROUP BY {self.column_name}
-                    ORDER BY 3 DESC
-                    LIMIT 1
+                    {self.build_script_for_top_values_collection()}
                 ) s ON 1=1"""
 
     def build_script_for_datetime_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
+        distribution = ",\n                        ".join(
+            build_snf_distribution_expressions(f"DATE_PART(EPOCH, {self.column_name})"))
         return f"""SELECT
                     *
                 FROM (
@@ -334,32 +929,79 @@ class SNFTableColumn(TableColumn):
                             (ORDER BY DATE_PART(EPOCH, {self.column_name})))::timestamp as perc25,
                         MEDIAN(DATE_PART(EPOCH, {self.column_name}))::timestamp as median,
                         (PERCENTILE_CONT(0.75) WITHIN GROUP
-                            (ORDER BY DATE_PART(EPOCH, {self.column_name})))::timestamp as perc75
-                    FROM {schema}{self.related_table}
+                            (ORDER BY DATE_PART(EPOCH, {self.column_name})))::timestamp as perc75,
+                        {distribution}
+                    FROM {self.relation}
                 )
                 JOIN (
-                    SELECT
-                        COUNT(DISTINCT {self.column_name}) OVER() as uniq,
-                        COALESCE({self.column_name}::varchar, 'NULL') as top_value,
-                        COUNT(*) as top_freq,
-                        COUNT(*) / (SELECT COUNT(*) FROM {schema}{self.related_table}) as top_share
-                    FROM {schema}{self.related_table}
-                    GROUP BY {self.column_name}
-                    ORDER BY 3 DESC
-                    LIMIT 1
+                    {self.build_script_for_top_values_collection()}
                 ) s ON 1=1"""
 
     def build_script_for_text_column_stat_collection(self) -> str:
-        schema = "" if not self.related_schema else self.related_schema + "."
+        text_shape = ",\n                        ".join(build_text_shape_expressions(self.column_name))
         return f"""SELECT
-                    '{ColumnType.TEXT.value}' as col_type,
-                    COUNT(DISTINCT {self.column_name}) OVER() as uniq,
-                    COUNT(DISTINCT UPPER({self.column_name})) OVER() as uniq_upper,
-                    COALESCE({self.column_name}::varchar, 'NULL') as top_value,
-                    COUNT(*) as top_freq,
-                    COUNT(*) / (SELECT COUNT(*) FROM {schema}{self.related_table}) as top_share
-                FROM
-                    {schema}{self.related_table}
-                GROUP BY {self.column_name}
-                ORDER BY 5 DESC
-                LIMIT 1"""
+                    *
+                FROM (
+                    SELECT
+                        '{ColumnType.TEXT.value}' as col_type,
+                        {self.build_upper_distinct_expression()} as uniq_upper,
+                        {text_shape}
+                    FROM {self.relation}
+                )
+                JOIN (
+                    {self.build_script_for_top_values_collection()}
+                ) s ON 1=1"""
+
+
+class SNFTableColumnsBatch(TableColumnsBatch):
+    def __init__(self, schema: str, table_name: str, columns: list[TableColumn], **kwargs):
+        super().__init__(schema, table_name, columns, **kwargs)
+
+    def build_sample_clause(self) -> str:
+        return build_snf_sample_clause(self.sample_percent)
+
+    @staticmethod
+    def build_percentile_expressions(col_idx: int, column: TableColumn) -> list[str]:
+        if column.col_type == ColumnType.TIMESTAMP.value:
+            return [f"""(PERCENTILE_CONT({percentile}) WITHIN GROUP
+                        (ORDER BY DATE_PART(EPOCH, {column.column_name})))::timestamp as c{col_idx}_{stat_name}"""
+                    for percentile, stat_name in [(0.25, "perc25"), (0.5, "median"), (0.75, "perc75")]]
+        return [f"""PERCENTILE_CONT({percentile}) WITHIN GROUP
+                        (ORDER BY {column.column_name}) as c{col_idx}_{stat_name}"""
+                for percentile, stat_name in [(0.25, "perc25"), (0.5, "median"), (0.75, "perc75")]]
+
+    @staticmethod
+    def build_distribution_expressions(value: str, alias_prefix: str) -> list[str]:
+        return build_snf_distribution_expressions(value, alias_prefix)
+
+    @staticmethod
+    def build_epoch_expression(column_name: str) -> str:
+        return f"DATE_PART(EPOCH, {column_name})"
+
+    @staticmethod
+    def build_timestamp_expression(epoch: str) -> str:
+        return f"({epoch})::timestamp"
+
+
+class SNFArrayElementsBatch(SNFTableColumnsBatch):
+    def __init__(self, schema: str, table_name: str, columns: list[TableColumn], array_expression: str, **kwargs):
+        super().__init__(schema, table_name, columns, **kwargs)
+        self.array_expression = array_expression
+
+    @property
+    def relation(self) -> str:
+        # Every element of the array is a row, leaves of elements are read from the element column
+        return f"""(SELECT f.value as element
+                    FROM {super().relation}, LATERAL FLATTEN(input => {self.array_expression}) f) array_elements"""
+
+
+class SNFTableColumnsCombinations(TableColumnsCombinations):
+    def __init__(self, schema: str, table_name: str, **kwargs):
+        super().__init__(schema, table_name, **kwargs)
+
+    def build_sample_clause(self) -> str:
+        return build_snf_sample_clause(self.sample_percent)
+
+    @staticmethod
+    def build_combination_hash_expression(columns: list[str]) -> str:
+        return f"HASH({', '.join(columns)})"
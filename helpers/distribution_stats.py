@@ -0,0 +1,138 @@
+from datetime import datetime, timezone, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from bisect import bisect_right
+import math
+
+from helpers.object_types import ColumnType
+
+HISTOGRAM_BUCKETS = 10
+# Every 5th percentile and the 1st and 99th ones for tails are read from one sketch,
+# quartiles are taken from the same list
+HISTOGRAM_PERCENTILES = [0.01] + [step / 20 for step in range(1, 20)] + [0.99]
+PERC25_IDX, MEDIAN_IDX, PERC75_IDX = [HISTOGRAM_PERCENTILES.index(percentile) for percentile in [0.25, 0.5, 0.75]]
+
+
+def build_spark_percentiles_expression(value: str) -> str:
+    # Spark computes the sketch once for every expression indexing into it, since they share the same aggregate
+    return f"percentile_approx({value}, array({', '.join(str(p) for p in HISTOGRAM_PERCENTILES)}))"
+
+
+def build_spark_distribution_expressions(value: str, alias_prefix: str = "") -> list[str]:
+    percentiles = build_spark_percentiles_expression(value)
+    return build_moment_expressions(value, "SKEWNESS", alias_prefix) \
+        + [f"{percentiles}[{idx}] as {alias_prefix}pct{idx}" for idx in range(len(HISTOGRAM_PERCENTILES))]
+
+
+def build_snf_distribution_expressions(value: str, alias_prefix: str = "") -> list[str]:
+    # APPROX_PERCENTILE keeps one t-digest per column, no sort is needed unlike PERCENTILE_CONT
+    return build_moment_expressions(value, "SKEW", alias_prefix) \
+        + [f"APPROX_PERCENTILE({value}, {percentile}) as {alias_prefix}pct{idx}"
+           for idx, percentile in enumerate(HISTOGRAM_PERCENTILES)]
+
+
+def build_moment_expressions(value: str, skewness_function: str, alias_prefix: str = "") -> list[str]:
+    # Timestamps are passed as epoch seconds, so all stats are plain arithmetic aggregates of the same pass
+    return [f"COUNT({value}) as {alias_prefix}dist_cnt",
+            f"MIN({value}) as {alias_prefix}dist_min",
+            f"MAX({value}) as {alias_prefix}dist_max",
+            f"STDDEV_POP({value}) as {alias_prefix}stddev",
+            f"{skewness_function}({value}) as {alias_prefix}skewness"]
+
+
+def build_sign_expressions(value: str, alias_prefix: str = "") -> list[str]:
+    return [f"COUNT_IF({value} = 0) as {alias_prefix}zero_cnt",
+            f"COUNT_IF({value} < 0) as {alias_prefix}negative_cnt"]
+
+
+def to_float(value) -> float:
+    value = float(value) if value is not None else 0.0
+    return 0.0 if math.isnan(value) else value
+
+
+def build_equi_depth_histogram(min_value: float, percentiles: list[float], max_value: float) -> list[dict]:
+    edges = [min_value] + percentiles + [max_value]
+    shares = [0.0] + HISTOGRAM_PERCENTILES + [1.0]
+    return [{"from": edges[idx], "to": edges[idx + 1], "share": round(shares[idx + 1] - shares[idx], 2)}
+            for idx in range(len(edges) - 1)]
+
+
+def find_histogram_percentile(equi_depth: list[dict], percentile: float) -> float:
+    cumulative_share = 0.0
+    for bucket in equi_depth:
+        cumulative_share += bucket["share"]
+        if round(cumulative_share, 2) >= percentile:
+            return bucket["to"]
+    return equi_depth[-1]["to"]
+
+
+def build_equi_width_histogram(min_value: float,
+                               percentiles: list[float],
+                               max_value: float,
+                               cnt: int) -> list[dict]:
+    # Bucket counts are interpolated from the percentile sketch, so no second pass with known min and max is needed.
+    # They are estimates, values are not spread linearly between percentiles in general
+    points = [(min_value, 0.0)] + list(zip(percentiles, HISTOGRAM_PERCENTILES)) + [(max_value, 1.0)]
+    values = [value for value, _ in points]
+
+    def cumulative_share(value: float) -> float:
+        idx = bisect_right(values, value)
+        if idx == len(points):
+            return 1.0
+        if idx == 0:
+            return 0.0
+        (lower, lower_share), (upper, upper_share) = points[idx - 1], points[idx]
+        return lower_share + (upper_share - lower_share) * (value - lower) / (upper - lower)
+
+    if max_value == min_value:
+        return [{"from": min_value, "to": max_value, "estimated_count": cnt}]
+    edges = [min_value + (max_value - min_value) * idx / HISTOGRAM_BUCKETS for idx in range(HISTOGRAM_BUCKETS + 1)]
+    shares = [cumulative_share(edge) for edge in edges[:-1]] + [1.0]
+    shares[0] = 0.0
+    return [{"from": edges[idx], "to": edges[idx + 1], "estimated_count": round(cnt * (shares[idx + 1] - shares[idx]))}
+            for idx in range(HISTOGRAM_BUCKETS)]
+
+
+def build_time_zone(time_zone: str) -> tzinfo:
+    # Spark session time zones are region ids or offsets like "+01:00"
+    try:
+        return ZoneInfo(time_zone)
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
+    try:
+        return datetime.strptime(time_zone, "%z").tzinfo
+    except ValueError:
+        return timezone.utc
+
+
+def format_epoch(value: float, time_zone: str = "UTC") -> str:
+    # Bounds are formatted in the time zone the other timestamp stats of the column are rendered in
+    return datetime.fromtimestamp(value, build_time_zone(time_zone)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def convert_distribution_to_dict(row, col_type: str, alias_prefix: str = "", time_zone: str = "UTC") -> dict:
+    cnt = int(row[f"{alias_prefix}dist_cnt"] or 0)
+    if not cnt:
+        return {}
+    min_value, max_value = to_float(row[f"{alias_prefix}dist_min"]), to_float(row[f"{alias_prefix}dist_max"])
+    percentiles = [to_float(row[f"{alias_prefix}pct{idx}"]) for idx in range(len(HISTOGRAM_PERCENTILES))]
+    equi_depth = build_equi_depth_histogram(min_value, percentiles, max_value)
+    equi_width = build_equi_width_histogram(min_value, percentiles, max_value, cnt)
+    distribution = {
+        "stddev": to_float(row[f"{alias_prefix}stddev"]),
+        "skewness": to_float(row[f"{alias_prefix}skewness"]),
+    }
+
+    if col_type == ColumnType.TIMESTAMP.value:
+        # Moments and gaps of timestamps are in seconds. Gaps between consecutive values would need a sort,
+        # the widest equi-depth bucket shows the sparsest period instead
+        distribution["avg_gap_sec"] = (max_value - min_value) / (cnt - 1) if cnt > 1 else 0.0
+        distribution["max_bucket_span_sec"] = max(bucket["to"] - bucket["from"] for bucket in equi_depth)
+        for bucket in equi_depth + equi_width:
+            bucket["from"], bucket["to"] = format_epoch(bucket["from"], time_zone), format_epoch(bucket["to"], time_zone)
+    else:
+        distribution["zero_cnt"] = int(row[f"{alias_prefix}zero_cnt"] or 0)
+        distribution["negative_cnt"] = int(row[f"{alias_prefix}negative_cnt"] or 0)
+
+    # Both histograms are derived from approximate percentiles
+    distribution["histogram"] = {"equi_depth": equi_depth, "equi_width": equi_width, "approximate": True}
+    return distribution
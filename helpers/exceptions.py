@@ -79,3 +79,31 @@ class UndefinedDataFrameError(Exception):
     def __init__(self, message: str = None):
         super().__init__("""CSVExecutor.execute_select method cannot operate without pandas.DataFrame defined
         within 'df_table' argument""")
+
+
+class UnsupportedFileFormatError(Exception):
+    def __init__(self, path, message: str = None):
+        super().__init__(f"""Format of the data at {path} is not supported by SparkProfiler.
+                         Supported formats are csv, parquet, orc and json lines, optionally compressed.
+                         Format can be set explicitly in config:
+                         [
+                            {{
+                                "path": "landing/sales/*/",
+                                "name": "SALES",
+                                "format": "csv",
+                            }}
+                         ]""")
+
+
+class IncorrectTimeWindowError(Exception):
+    def __init__(self, time_window, message: str = None):
+        super().__init__(f"""Time window {time_window} lacks the 'column' key or any of 'last_days', 'from' and 'to' bounds.
+                         Example of config:
+                         [
+                            {{
+                                "datasource_type": "SNF",
+                                "schema": "UKI_DTM_SNU",
+                                "name": "DIM_CUSTOMER",
+                                "time_window": {{"column": "DWH_CREATEDT", "last_days": 30}},
+                            }}
+                         ]""")
@@ -0,0 +1,24 @@
+# Compressed files are decompressed by Spark by the codec extension, the format is taken from the extension before it
+COMPRESSION_EXTENSIONS = ["gz", "bz2", "deflate", "lz4", "snappy", "zst"]
+
+FILE_FORMATS = {
+    "csv": "csv",
+    "parquet": "parquet",
+    "orc": "orc",
+    "json": "json",
+    "jsonl": "json",
+    "ndjson": "json",
+}
+
+
+def detect_file_format(file_path: str) -> str | None:
+    extensions = file_path.rstrip('/').split('/')[-1].lower().split('.')[1:]
+    if extensions and extensions[-1] in COMPRESSION_EXTENSIONS:
+        extensions = extensions[:-1]
+    return FILE_FORMATS.get(extensions[-1]) if extensions else None
+
+
+def is_data_file(file_path: str) -> bool:
+    # Markers and checksums written next to the data by Spark and Hadoop
+    file_name = file_path.rstrip('/').split('/')[-1]
+    return not file_name.startswith(('_', '.')) and not file_name.endswith('.crc')
@@ -0,0 +1,39 @@
+from pyspark.sql import Column, DataFrame, types, functions as F
+
+NESTED_DATA_TYPES = (types.StructType, types.ArrayType, types.MapType)
+
+
+def split_struct_leaves(expression: Column,
+                        path: str,
+                        data_type: types.DataType) -> list[tuple[Column, str, types.DataType]]:
+    if isinstance(data_type, types.StructType):
+        return [leaf for field in data_type.fields
+                for leaf in split_struct_leaves(expression.getField(field.name), f"{path}.{field.name}", field.dataType)]
+    return [(expression, path, data_type)]
+
+
+def expand_nested_columns(table: DataFrame,
+                          roots: list[tuple[Column, str, types.DataType]]) -> list[tuple[DataFrame, dict[str, str]]]:
+    # Struct fields share the rows of their table, so all of them are selected into one DataFrame and profiled
+    # with one scan. Elements of an array and entries of a map get a DataFrame with a row per element,
+    # nested collections are expanded the same way recursively.
+    # Returns DataFrames with leaf columns and mapping of leaf column names to their paths
+    leaves, collections = [], []
+    for expression, path, data_type in roots:
+        for leaf in split_struct_leaves(expression, path, data_type):
+            (collections if isinstance(leaf[2], (types.ArrayType, types.MapType)) else leaves).append(leaf)
+
+    nested_slices = []
+    if leaves:
+        nested_slices.append((table.select(*[expression.alias(f"leaf_{num}")
+                                             for num, (expression, _, _) in enumerate(leaves)]),
+                              {f"leaf_{num}": path for num, (_, path, _) in enumerate(leaves)}))
+    for expression, path, data_type in collections:
+        if isinstance(data_type, types.ArrayType):
+            elements = table.select(F.explode(expression).alias("element"))
+            nested_slices += expand_nested_columns(elements, [(F.col("element"), f"{path}[]", data_type.elementType)])
+        else:
+            entries = table.select(F.explode(expression).alias("key", "value"))
+            nested_slices += expand_nested_columns(entries, [(F.col("key"), f"{path}{{}}.key", data_type.keyType),
+                                                             (F.col("value"), f"{path}{{}}.value", data_type.valueType)])
+    return nested_slices
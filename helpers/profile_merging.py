@@ -0,0 +1,120 @@
+import math
+
+from helpers.object_types import ColumnType
+
+# Stats which cannot be combined exactly from per-partition values when value sets of partitions are incomplete.
+# Merged values are listed under "approximate" in the column stat: distinct counts are taken from the HLL estimate
+# over all profiled partitions, top values from summed per-partition top frequencies which are lower bounds
+APPROXIMATE_AFTER_MERGE = ["uniq", "uniq_upper", "top_value", "top_freq", "top_share"]
+# Sketch-based stats are not merged from partitions, they are taken from one aggregate pass over all of them
+UNION_STATS = ["approx_uniq", "mean", "min", "perc25", "median", "perc75", "max", "stddev", "skewness", "zero_cnt",
+               "negative_cnt", "avg_gap_sec", "max_bucket_span_sec", "histogram", "text_shape"]
+
+
+def merge_partition_profiles(table_name: str,
+                             partition_profiles: dict[str, dict],
+                             union_stats: dict[str, dict] = None) -> dict:
+    profiled = {name: profile for name, profile in partition_profiles.items() if not profile.get("ERROR")}
+    table_count = sum(profile["TABLE_PROFILING_INFO"]["TABLE_COUNT"] for profile in profiled.values())
+
+    columns_stats = {}
+    for profile in profiled.values():
+        for col_name, col_stat in profile["TABLE_PROFILING_INFO"]["COLUMNS"].items():
+            columns_stats.setdefault(col_name, []).append(col_stat)
+
+    return {
+        "TABLE_NAME": table_name,
+        "TABLE_PROFILING_INFO": {
+            "TABLE_COUNT": table_count,
+            "COLUMNS": {col_name: merge_column_stats(stats, table_count, (union_stats or {}).get(col_name))
+                        for col_name, stats in columns_stats.items()},
+            "PARTITIONS": partition_profiles,
+        }
+    }
+
+
+def merge_value_sets(stats: list[dict]) -> list[dict] | None:
+    # Value sets hold every distinct value of a partition, so their union is exact
+    # as long as no partition with values is missing its set
+    if any(stat.get("count", 0) and not stat.get("value_set") for stat in stats):
+        return None
+    freq_by_value = {}
+    for stat in stats:
+        for entry in stat.get("value_set") or []:
+            freq_by_value[entry["value"]] = freq_by_value.get(entry["value"], 0) + entry["freq"]
+    return [{"value": value, "freq": freq} for value, freq in sorted(freq_by_value.items(), key=lambda x: -x[1])]
+
+
+def merge_column_stats(stats: list[dict], table_count: int, union_stat: dict = None) -> dict:
+    errors = [stat["ERROR"] for stat in stats if stat.get("ERROR")]
+    if errors:
+        return {
+            "ERROR": errors[0],
+            "col_type": stats[0].get("col_type"),
+            "uniq": 0,
+            "uniq_upper": 0,
+            "top_value": "NULL",
+            "top_freq": 0,
+            "top_share": 0,
+        }
+
+    col_type = stats[0].get("col_type")
+    count = sum(stat.get("count", 0) for stat in stats)
+    merged = {
+        "count": count,
+        "share": count / table_count if table_count else 0,
+        "col_type": col_type,
+    }
+
+    value_set = merge_value_sets(stats)
+    if value_set:
+        merged["uniq"] = len(value_set)
+        merged["top_value"], merged["top_freq"] = value_set[0]["value"], value_set[0]["freq"]
+        merged["value_set"] = value_set
+        if col_type == ColumnType.TEXT.value:
+            merged["uniq_upper"] = len({entry["value"].upper() for entry in value_set})
+    else:
+        top_freq_by_value = {}
+        for stat in stats:
+            top_freq_by_value[stat.get("top_value")] = top_freq_by_value.get(stat.get("top_value"), 0) \
+                                                       + stat.get("top_freq", 0)
+        merged["top_value"], merged["top_freq"] = max(top_freq_by_value.items(), key=lambda x: x[1])
+        merged["uniq"] = union_stat["approx_uniq"] if union_stat \
+            else max(stat.get("uniq", 0) for stat in stats)
+        if col_type == ColumnType.TEXT.value:
+            # Upper-cased values are not estimated separately, so the lower bound from partitions is kept
+            merged["uniq_upper"] = max(stat.get("uniq_upper", 0) for stat in stats)
+    merged["top_share"] = merged["top_freq"] / table_count if table_count else 0
+    if not value_set:
+        merged["approximate"] = [stat_name for stat_name in APPROXIMATE_AFTER_MERGE if stat_name in merged]
+    if stats[0].get("nested"):
+        merged["nested"] = True
+
+    if union_stat:
+        merged.update({stat_name: union_stat[stat_name] for stat_name in UNION_STATS if stat_name in union_stat})
+    else:
+        merge_additive_stats(merged, stats, col_type, count)
+
+    merged["merged_from_partitions"] = len(stats)
+    return merged
+
+
+def merge_additive_stats(merged: dict, stats: list[dict], col_type: str, count: int):
+    # Used when the aggregate pass over all partitions failed: only stats which combine exactly are kept,
+    # together with the pooled standard deviation
+    if col_type in [ColumnType.NUMERIC.value, ColumnType.TIMESTAMP.value]:
+        # Timestamps are kept as strings by the profilers, "None" stands for a partition without values
+        minimums = [stat["min"] for stat in stats if stat.get("min") not in [None, "None"]]
+        maximums = [stat["max"] for stat in stats if stat.get("max") not in [None, "None"]]
+        merged["min"] = min(minimums) if minimums else None
+        merged["max"] = max(maximums) if maximums else None
+    if col_type == ColumnType.NUMERIC.value:
+        merged["mean"] = sum(stat.get("mean", 0) * stat.get("count", 0) for stat in stats) / count if count else 0
+        for stat_name in ["zero_cnt", "negative_cnt"]:
+            if all(stat_name in stat for stat in stats):
+                merged[stat_name] = sum(stat[stat_name] for stat in stats)
+        # Pooled variance combines the spread within partitions with the spread of partition means
+        if count and all("stddev" in stat for stat in stats):
+            merged["stddev"] = math.sqrt(sum(stat.get("count", 0) * (stat["stddev"] ** 2
+                                                                    + (stat.get("mean", 0) - merged["mean"]) ** 2)
+                                             for stat in stats) / count)
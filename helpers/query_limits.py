@@ -0,0 +1,57 @@
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+import time
+
+QUERY_TIMEOUT_ERROR = "QUERY_TIMEOUT"
+
+EXACT_STRATEGY = "exact"
+APPROXIMATE_STRATEGY = "approximate"
+SAMPLE_STRATEGY = "sample"
+# Tried in this order, the next strategy is used only when the previous one timed out
+DEGRADATION_STRATEGIES = [EXACT_STRATEGY, APPROXIMATE_STRATEGY, SAMPLE_STRATEGY]
+
+
+class QueryTimeLimit:
+    # Limits every query issued within the context by its own timeout and by the deadline of the profiled table.
+    # Executors cancel queries running over the limit and mark the limit as timed out
+    def __init__(self, query_timeout_sec: float = None, deadline_ts: float = None):
+        self.query_timeout_sec = query_timeout_sec
+        self.deadline_ts = deadline_ts
+        self.timed_out = False
+        self._token = None
+
+    def get_timeout(self) -> float | None:
+        timeouts = [timeout for timeout in [self.query_timeout_sec,
+                                            self.deadline_ts - time.time() if self.deadline_ts else None]
+                    if timeout is not None]
+        return max(0.0, min(timeouts)) if timeouts else None
+
+    def nested(self) -> "QueryTimeLimit":
+        return QueryTimeLimit(self.query_timeout_sec, self.deadline_ts)
+
+    def __enter__(self) -> "QueryTimeLimit":
+        self._token = current_time_limit.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        current_time_limit.reset(self._token)
+
+
+# Context variables are copied into threads and event loops started for slots and partitions,
+# so the limit set for a table applies to all of its queries
+current_time_limit: ContextVar[QueryTimeLimit | None] = ContextVar("current_time_limit", default=None)
+
+
+async def run_with_degradation(attempt: Callable[[str], Awaitable[dict | None]]) -> tuple[dict | None, str | None]:
+    # Returns the result and the strategy which produced it within the time limit.
+    # Without a limit the exact strategy is the only one and no strategy is reported
+    time_limit = current_time_limit.get()
+    if time_limit is None or time_limit.get_timeout() is None:
+        return await attempt(EXACT_STRATEGY), None
+
+    for strategy in DEGRADATION_STRATEGIES:
+        with time_limit.nested() as attempt_limit:
+            result = await attempt(strategy)
+        if not attempt_limit.timed_out:
+            return result, strategy
+    return None, None
@@ -0,0 +1,89 @@
+from collections.abc import MutableMapping
+import sys
+
+from numpyencoder import NumpyEncoder
+
+
+class ColumnProfile(MutableMapping):
+    # Stats present in most column profiles are kept in slots, so a catalog of 100k columns does not hold
+    # 100k dicts with the same keys. Other keys (text shape, value set, errors, annotations) go to a dict
+    # created only for columns having them. Reads and writes as a dict of stats and is encoded as one
+    FIELDS = ("count", "share", "col_type", "uniq", "uniq_upper", "top_value", "top_freq", "top_share",
+              "approx_uniq", "mean", "min", "perc25", "median", "perc75", "max", "stddev", "skewness", "zero_cnt",
+              "negative_cnt")
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, stats: dict = None):
+        self._extra = None
+        for key, value in (stats or {}).items():
+            self[key] = value
+
+    def __getitem__(self, key: str):
+        if key in SLOT_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value):
+        if key in SLOT_FIELDS:
+            setattr(self, key, sys.intern(value) if key == "col_type" and isinstance(value, str) else value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in SLOT_FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+            return
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+
+SLOT_FIELDS = frozenset(ColumnProfile.FIELDS)
+
+
+def compact_table_description(table_description: dict) -> dict:
+    # Column profiles of a finished table are converted once. Table and column names are interned,
+    # since they are repeated by the history, drift and constraint suggestions of the table
+    if isinstance(table_description.get("TABLE_NAME"), str):
+        table_description["TABLE_NAME"] = sys.intern(table_description["TABLE_NAME"])
+    columns = table_description.get("TABLE_PROFILING_INFO", {}).get("COLUMNS")
+    if columns:
+        table_description["TABLE_PROFILING_INFO"]["COLUMNS"] = {
+            sys.intern(col_name): col_stat if isinstance(col_stat, ColumnProfile) else ColumnProfile(col_stat)
+            for col_name, col_stat in columns.items()
+        }
+    return table_description
+
+
+class ProfilingResultEncoder(NumpyEncoder):
+    # Compact column profiles are turned into plain dicts only while results are written out
+    def default(self, obj):
+        if isinstance(obj, ColumnProfile):
+            return obj.to_dict()
+        return super().default(obj)
@@ -0,0 +1,33 @@
+import json
+import os
+
+
+def build_table_key(table_info: dict) -> str:
+    datasource_type = table_info.get("datasource_type") if table_info.get("datasource_type") else "SPARK"
+    if table_info.get("path"):
+        table_key = f'{datasource_type}:{table_info.get("path")}'
+    else:
+        table_key = f'{datasource_type}:{table_info.get("schema")}.{table_info.get("name")}'
+    # Slices of a table hold different data than the whole table, so their timings and history are kept apart
+    table_slice = {key: table_info[key] for key in ["filter", "time_window"] if table_info.get(key)}
+    return f'{table_key}|{json.dumps(table_slice, sort_keys=True)}' if table_slice else table_key
+
+
+def get_table_key(table: dict) -> str:
+    # Results not produced by the scheduler have no table key and are identified by their name
+    return table.get("TABLE_KEY") or table.get("TABLE_NAME")
+
+
+def read_trace(trace_file_path: str) -> list[dict]:
+    if not trace_file_path or not os.path.exists(trace_file_path):
+        return []
+    with open(trace_file_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_trace(trace_file_path: str, records: list[dict]):
+    if not trace_file_path:
+        return
+    with open(trace_file_path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
@@ -0,0 +1,41 @@
+import math
+
+from pyspark.sql import SparkSession
+
+TARGET_PARTITION_BYTES = 128 * 1024 ** 2
+MAX_SHUFFLE_PARTITIONS = 2000
+# Tables up to this size are small enough for any relation derived from them to be broadcast
+BROADCAST_TABLE_BYTES = 256 * 1024 ** 2
+DEFAULT_BROADCAST_THRESHOLD_BYTES = 10 * 1024 ** 2
+
+
+def build_table_session(spark_session: SparkSession, parallel_listing_threshold: int) -> SparkSession:
+    # New sessions start from the SQL settings of the Spark config, settings made on the shared session at runtime
+    # are not inherited, so the listing threshold is set again before the table is read
+    table_session = spark_session.newSession()
+    table_session.conf.set("spark.sql.sources.parallelPartitionDiscovery.threshold", parallel_listing_threshold)
+    return table_session
+
+
+def build_spark_execution_profile(table_bytes: int | None, columns_cnt: int, default_parallelism: int) -> dict[str, str]:
+    # GROUPING SETS queries emit every row once per grouped column, so the shuffled data grows with the column count.
+    # Small tables get a few shuffle partitions instead of the default 200, large ones at least one per core
+    if table_bytes is None:
+        shuffle_partitions = default_parallelism
+    else:
+        shuffle_partitions = min(MAX_SHUFFLE_PARTITIONS,
+                                 max(1, math.ceil(table_bytes * max(1, columns_cnt) / TARGET_PARTITION_BYTES)))
+        if table_bytes >= TARGET_PARTITION_BYTES:
+            shuffle_partitions = max(shuffle_partitions, default_parallelism)
+
+    broadcast_threshold = BROADCAST_TABLE_BYTES if table_bytes is not None and table_bytes <= BROADCAST_TABLE_BYTES \
+        else DEFAULT_BROADCAST_THRESHOLD_BYTES
+    return {
+        "spark.sql.shuffle.partitions": str(shuffle_partitions),
+        # AQE coalesces partitions left small after aggregation and splits skewed ones of large tables
+        "spark.sql.adaptive.enabled": "true",
+        "spark.sql.adaptive.coalescePartitions.enabled": "true",
+        "spark.sql.adaptive.advisoryPartitionSizeInBytes": str(TARGET_PARTITION_BYTES),
+        "spark.sql.adaptive.skewJoin.enabled": "true",
+        "spark.sql.autoBroadcastJoinThreshold": str(broadcast_threshold),
+    }
@@ -0,0 +1,30 @@
+from helpers.object_types import ColumnType
+
+# Anchored patterns valid both for Spark and Snowflake RLIKE, kept free of backslashes and quotes
+# to be embedded into SQL string literals as is
+TEXT_PATTERNS = {
+    "int_like": "^[+-]?[0-9]+$",
+    "decimal_like": "^[+-]?([0-9]+[.][0-9]*|[.][0-9]+)([eE][+-]?[0-9]+)?$",
+    "date_like": "^([0-9]{4}-[0-9]{2}-[0-9]{2}|[0-9]{2}[/.][0-9]{2}[/.][0-9]{4})$",
+    "timestamp_like": "^[0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}:[0-9]{2}(:[0-9]{2}([.][0-9]+)?)?(Z|[+-][0-9]{2}:?[0-9]{2})?$",
+    "email": "^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+[.][A-Za-z]{2,}$",
+    "uuid": "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$",
+    "code": "^[A-Z0-9]+([_-][A-Z0-9]+)*$",
+}
+
+EMBEDDED_TYPES = {
+    "int_like": ColumnType.NUMERIC.value,
+    "decimal_like": ColumnType.NUMERIC.value,
+    "date_like": ColumnType.TIMESTAMP.value,
+    "timestamp_like": ColumnType.TIMESTAMP.value,
+}
+
+
+def infer_embedded_type(text_shape: dict, share_threshold: float = 0.99) -> str:
+    numeric_share = text_shape.get("int_like_share", 0) + text_shape.get("decimal_like_share", 0)
+    temporal_share = text_shape.get("date_like_share", 0) + text_shape.get("timestamp_like_share", 0)
+    if numeric_share >= share_threshold:
+        return ColumnType.NUMERIC.value
+    elif temporal_share >= share_threshold:
+        return ColumnType.TIMESTAMP.value
+    return ColumnType.TEXT.value
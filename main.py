@@ -1,67 +1,152 @@
-import itertools
-from asyncio import run, gather
-from numpyencoder import NumpyEncoder
+from asyncio import run
+import argparse
 import json
 import time
+import sys
 import os
 
 from config.config import TO_PROFILE, FLAG_PRINT_PROFILING_STAT, \
     FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK, CONSTRAINT_IDENTIFICATION_RULES, \
-    CSV_SEPARATOR, WRITE_TO_FILE, ANALYSIS_OUTPUT_FILE_PATH, PROFILING_OUTPUT_FILE_PATH
-from utils.profilers import Profiler, SNFProfiler, SparkProfiler
+    ADF_FRAMEWORK_DATASOURCE_DESC, ADF_FRAMEWORK_DQ_RULES_TABLE, ADF_FRAMEWORK_MERGE_SCRIPT_PATH, \
+    CSV_SEPARATOR, SPARK_PARALLEL_LISTING_THRESHOLD, PARTITION_PARALLELISM, WRITE_TO_FILE, ANALYSIS_OUTPUT_FILE_PATH, \
+    FLAG_BATCH_COLUMNS, COLUMN_BATCH_MAX_COST, COLUMN_BATCH_MAX_STATEMENT_LENGTH, FLAG_TUNE_SPARK_EXECUTION, \
+    PROFILING_OUTPUT_FILE_PATH, QUERY_TIMEOUT_SEC, TABLE_TIMEOUT_SEC, DEGRADED_SAMPLE_PERCENT, \
+    MAX_CONCURRENT_TABLES, PROFILING_TRACE_FILE_PATH, FLAG_STORE_PROFILING_HISTORY, PROFILING_HISTORY_PATH, \
+    FLAG_DETECT_DRIFT, VALUE_SET_LIMIT, FLAG_DISCOVER_KEYS, KEY_DISCOVERY_MAX_KEY_SIZE, FLAG_VALIDATE_SUGGESTED_RULES, \
+    SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_CONCURRENT_JOBS, SERVICE_MAX_FINISHED_JOBS, \
+    WORK_QUEUE_PATH, WORK_QUEUE_LEASE_SEC, WORK_QUEUE_WORKER_IDLE_SEC
+from utils.profilers import SNFProfiler, SparkProfiler
+from utils.column_batching import ColumnBatchPlanner
+from utils.key_discovery import KeyDiscovery
+from utils.scheduler import TableScheduler
+from utils.history_store import ProfileHistoryStore
+from utils.drift_detector import DriftDetector
 from utils.analyzer import Analyzer
+from utils.rule_validator import RuleValidator
+from utils.adf_exporter import ADFRulesExporter
+from utils.profiling_service import ProfilingService
+from utils.work_queue import TableWorkQueue, QueueWorker, QueueCoordinator
 from helpers.results_printing import print_results
-
-
-async def gather_profiling_results(*profilers: Profiler) -> list:
-    results_by_profiler = await gather(*[profiler.get_tables_descriptions()
-                                         for profiler in profilers
-                                         if profiler.table_config])
-
-    all_configured_tables_descriptions = []
-    for results in results_by_profiler:
-        for table_description in results:
-            all_configured_tables_descriptions.append(table_description)
-
-    return all_configured_tables_descriptions
+from helpers.result_model import ProfilingResultEncoder
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Profiles tables of TO_PROFILE and suggests DQ constraints")
+    parser.add_argument("--serve", action="store_true",
+                        help="run as a long-lived service accepting profiling jobs over HTTP")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--coordinator", action="store_true",
+                        help="share TO_PROFILE with workers through the work queue")
+    parser.add_argument("--worker", action="store_true",
+                        help="profile tables pulled from the work queue until it stays empty")
+    parser.add_argument("--queue-path", default=WORK_QUEUE_PATH)
+    args = parser.parse_args()
+
     ts = time.time()
     for old_out_files in os.listdir(os.curdir):
         if old_out_files == f'{ANALYSIS_OUTPUT_FILE_PATH}' or \
-           old_out_files == f'{PROFILING_OUTPUT_FILE_PATH}':
+           old_out_files == f'{PROFILING_OUTPUT_FILE_PATH}' or \
+           old_out_files == f'{ADF_FRAMEWORK_MERGE_SCRIPT_PATH}':
             os.remove(old_out_files)
 
+    column_batch_planner = ColumnBatchPlanner(max_batch_cost=COLUMN_BATCH_MAX_COST,
+                                              max_statement_length=COLUMN_BATCH_MAX_STATEMENT_LENGTH,
+                                              value_set_limit=VALUE_SET_LIMIT,
+                                              degraded_sample_percent=DEGRADED_SAMPLE_PERCENT) \
+        if FLAG_BATCH_COLUMNS else None
+    key_discovery = KeyDiscovery(max_key_size=KEY_DISCOVERY_MAX_KEY_SIZE) if FLAG_DISCOVER_KEYS else None
+
     available_profilers = {
-        "SNF": SNFProfiler([]),
-        "SPARK": SparkProfiler([], csv_separator=CSV_SEPARATOR)
+        "SNF": SNFProfiler([],
+                           column_batch_planner=column_batch_planner,
+                           value_set_limit=VALUE_SET_LIMIT,
+                           key_discovery=key_discovery,
+                           query_timeout_sec=QUERY_TIMEOUT_SEC,
+                           table_timeout_sec=TABLE_TIMEOUT_SEC,
+                           degraded_sample_percent=DEGRADED_SAMPLE_PERCENT),
+        "SPARK": SparkProfiler([],
+                               csv_separator=CSV_SEPARATOR,
+                               partition_parallelism=PARTITION_PARALLELISM,
+                               column_batch_planner=column_batch_planner,
+                               value_set_limit=VALUE_SET_LIMIT,
+                               key_discovery=key_discovery,
+                               parallel_listing_threshold=SPARK_PARALLEL_LISTING_THRESHOLD,
+                               tune_execution=FLAG_TUNE_SPARK_EXECUTION,
+                               query_timeout_sec=QUERY_TIMEOUT_SEC,
+                               table_timeout_sec=TABLE_TIMEOUT_SEC,
+                               degraded_sample_percent=DEGRADED_SAMPLE_PERCENT)
     }
 
-    for datasource_type, tables in itertools.groupby(TO_PROFILE, lambda x: x.get("datasource_type")
-                                                                           if x.get("datasource_type")
-                                                                           else "SPARK"):
-        if available_profilers.get(datasource_type):
-            available_profilers[datasource_type].table_config = list(tables)
+    if args.serve:
+        ProfilingService(available_profilers,
+                         constraint_identification_rules=CONSTRAINT_IDENTIFICATION_RULES,
+                         add_adf_framework_template=FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK,
+                         validate_suggested_rules=FLAG_VALIDATE_SUGGESTED_RULES,
+                         max_concurrent_jobs=SERVICE_MAX_CONCURRENT_JOBS,
+                         max_finished_jobs=SERVICE_MAX_FINISHED_JOBS,
+                         concurrency_slots=MAX_CONCURRENT_TABLES,
+                         trace_file_path=PROFILING_TRACE_FILE_PATH,
+                         history_store=ProfileHistoryStore(PROFILING_HISTORY_PATH)
+                         if FLAG_STORE_PROFILING_HISTORY else None,
+                         detect_drift=FLAG_DETECT_DRIFT) \
+            .serve_forever(host=args.host, port=args.port)
+        if available_profilers.get("SNF"):
+            available_profilers["SNF"].executor.shutdown()
+        sys.exit()
 
-    profilers_results = run(gather_profiling_results(*available_profilers.values()))
-
-    if available_profilers.get("SNF"):
-        available_profilers["SNF"].executor.shutdown()
+    scheduler = TableScheduler(available_profilers,
+                               concurrency_slots=MAX_CONCURRENT_TABLES,
+                               trace_file_path=PROFILING_TRACE_FILE_PATH)
+    if args.worker:
+        processed = run(QueueWorker(TableWorkQueue(args.queue_path, lease_sec=WORK_QUEUE_LEASE_SEC),
+                                    scheduler,
+                                    idle_sec=WORK_QUEUE_WORKER_IDLE_SEC).run())
+        print(f"Worker profiled {processed} tables in {time.time() - ts} sec.")
+        if available_profilers.get("SNF"):
+            available_profilers["SNF"].executor.shutdown()
+        sys.exit()
+    elif args.coordinator:
+        profilers_results = run(QueueCoordinator(TableWorkQueue(args.queue_path, lease_sec=WORK_QUEUE_LEASE_SEC),
+                                                 scheduler).run(TO_PROFILE))
+    else:
+        profilers_results = run(scheduler.run(TO_PROFILE))
 
     print(f"Profiling took: {time.time() - ts} sec.\n\n")
 
+    drift_by_table = None
+    if FLAG_STORE_PROFILING_HISTORY:
+        history_store = ProfileHistoryStore(PROFILING_HISTORY_PATH)
+        if FLAG_DETECT_DRIFT:
+            drift_by_table = DriftDetector().detect(profilers_results, history_store)
+        history_store.append_run(profilers_results)
+
     analyzer = Analyzer(profiling_results=profilers_results,
                         constraint_identification_rules=CONSTRAINT_IDENTIFICATION_RULES,
-                        add_adf_framework_template=FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK)
+                        add_adf_framework_template=FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK,
+                        drift_by_table=drift_by_table)
+    suggested_constraints = analyzer.suggest_constraints()
+    if FLAG_VALIDATE_SUGGESTED_RULES:
+        suggested_constraints = run(RuleValidator(available_profilers).validate(TO_PROFILE, suggested_constraints))
+
+    if available_profilers.get("SNF"):
+        available_profilers["SNF"].executor.shutdown()
 
     if FLAG_PRINT_PROFILING_STAT:
-        print(json.dumps(profilers_results, indent=4, cls=NumpyEncoder))
+        print(json.dumps(profilers_results, indent=4, cls=ProfilingResultEncoder))
     if WRITE_TO_FILE:
-        print_results(json.dumps(profilers_results, indent=4, cls=NumpyEncoder),
+        print_results(json.dumps(profilers_results, indent=4, cls=ProfilingResultEncoder),
                       output_file_path=PROFILING_OUTPUT_FILE_PATH)
-        print_results(json.dumps(analyzer.suggest_constraints(), indent=4, cls=NumpyEncoder),
+        print_results(json.dumps(suggested_constraints, indent=4, cls=ProfilingResultEncoder),
                       output_file_path=ANALYSIS_OUTPUT_FILE_PATH)
         print(f"Constraint suggestions are available at '{ANALYSIS_OUTPUT_FILE_PATH}'")
     else:
-        print(json.dumps(analyzer.suggest_constraints(), indent=4, cls=NumpyEncoder))
+        print(json.dumps(suggested_constraints, indent=4, cls=ProfilingResultEncoder))
+
+    if FLAG_SUGGEST_MERGE_STATEMENT_FOR_ADF_FRAMEWORK:
+        merge_script = ADFRulesExporter(datasource_desc=ADF_FRAMEWORK_DATASOURCE_DESC,
+                                        rules_table=ADF_FRAMEWORK_DQ_RULES_TABLE) \
+            .build_merge_script(suggested_constraints)
+        if merge_script:
+            print_results(merge_script, output_file_path=ADF_FRAMEWORK_MERGE_SCRIPT_PATH)
+            print(f"MERGE script for ADF framework is available at '{ADF_FRAMEWORK_MERGE_SCRIPT_PATH}'")
@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+# Profilers import Snowflake credentials, the stand-in never connects, so the example config is enough
+try:
+    import config.snf_config
+except ImportError:
+    import config.snf_config_example
+    sys.modules["config.snf_config"] = config.snf_config_example
+
+
+# Spark and DuckDB are imported by the fixtures of stand-in executors only,
+# so unit tests of pure helpers run without them
+@pytest.fixture(scope="session")
+def spark_session():
+    pyspark_sql = pytest.importorskip("pyspark.sql")
+    return pyspark_sql.SparkSession.builder \
+        .master("local[2]") \
+        .config("spark.ui.enabled", "false") \
+        .getOrCreate()
+
+
+@pytest.fixture(scope="session")
+def wide_parquet_path(spark_session, tmp_path_factory) -> str:
+    from tests.harness import WIDE_TABLE_ROWS, build_wide_table_expressions
+
+    path = str(tmp_path_factory.mktemp("wide_table") / "WIDE_TABLE")
+    spark_session.range(WIDE_TABLE_ROWS).selectExpr(*build_wide_table_expressions()).write.parquet(path)
+    return path
+
+
+@pytest.fixture
+def spark_executor(spark_session, wide_parquet_path):
+    from tests.harness import RecordingSparkExecutor
+
+    executor = RecordingSparkExecutor()
+    executor.reset()
+    return executor
+
+
+@pytest.fixture(scope="session")
+def duckdb_connection():
+    duckdb = pytest.importorskip("duckdb")
+    from tests.harness import WIDE_TABLE_ROWS, build_wide_table_expressions
+
+    connection = duckdb.connect()
+    connection.execute("CREATE SCHEMA TEST")
+    connection.execute(f"""CREATE TABLE TEST.WIDE_TABLE AS
+        SELECT {", ".join(build_wide_table_expressions())}
+        FROM range({WIDE_TABLE_ROWS}) t(id)""")
+    return connection
+
+
+@pytest.fixture
+def snf_executor(spark_session, duckdb_connection):
+    from tests.harness import DuckDBSnowflakeExecutor
+
+    executor = DuckDBSnowflakeExecutor(duckdb_connection)
+    executor.reset()
+    return executor
@@ -0,0 +1,135 @@
+import re
+
+import duckdb
+import pandas as pd
+from pyspark.sql import SparkSession
+
+from utils.executors import SnowflakeExecutor, SparkExecutor
+
+WIDE_TABLE_ROWS = 1000
+WIDE_TABLE_NUMERIC_COLUMNS = 25
+WIDE_TABLE_TEXT_COLUMNS = 25
+WIDE_TABLE_TIMESTAMP_COLUMNS = 10
+
+
+def build_wide_table_expressions() -> list[str]:
+    # Valid both for Spark SQL and DuckDB, so both stand-ins profile the same data
+    return [f"(id * {num}) % ({num} + 10) AS N_{num}" for num in range(WIDE_TABLE_NUMERIC_COLUMNS)] \
+        + [f"concat('V', CAST((id + {num}) % ({num} + 3) AS STRING)) AS T_{num}"
+           for num in range(WIDE_TABLE_TEXT_COLUMNS)] \
+        + [f"TIMESTAMP '2024-01-01 00:00:00' + (INTERVAL 1 HOUR) * ((id * {num}) % ({num} + 50)) AS D_{num}"
+           for num in range(WIDE_TABLE_TIMESTAMP_COLUMNS)]
+
+
+class RecordingSparkExecutor(SparkExecutor):
+    # Records every profiling statement and counts Spark jobs started since the last reset
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+        self.jobs_before = 0
+
+    def reset(self):
+        self.statements = []
+        self.jobs_before = self.count_all_jobs()
+
+    def count_all_jobs(self) -> int:
+        # Status tracker lists jobs group by group and time-limited queries run under groups of their own,
+        # the job counter of the scheduler covers jobs of all groups
+        return self.spark_session.sparkContext._jsc.sc().dagScheduler().numTotalJobs()
+
+    @property
+    def jobs(self) -> int:
+        return self.count_all_jobs() - self.jobs_before
+
+    def count_scans(self, relation: str) -> int:
+        return sum(len(re.findall(rf"\b{relation}\b", statement)) for statement in self.statements)
+
+    async def execute_select(self, sql: str, **kwargs):
+        self.statements.append(sql)
+        return await super().execute_select(sql, **kwargs)
+
+
+class DuckDBSnowflakeExecutor(SnowflakeExecutor):
+    # In-process stand-in for Snowflake, statements are recorded and the few Snowflake-only constructs
+    # of generated statements are rewritten for DuckDB. Statements failing in DuckDB are returned
+    # as error rows the same way the Snowflake executor returns them
+    DIALECT_REWRITES = [
+        (r"SAMPLE BLOCK \(([0-9.]+)\) SEED \(([0-9]+)\)", r"USING SAMPLE \1 PERCENT (system, \2)"),
+        (r"CAST\(([^()]*) AS STRING\) RLIKE ('(?:[^']|'')*')", r"regexp_matches(CAST(\1 AS STRING), \2)"),
+        (r"array_agg\((\w+)\) WITHIN GROUP \(ORDER BY (\w+)\)", r"array_agg(\1 ORDER BY \2)"),
+        (r"FROM tmp\s+order by ORDINAL_POSITION", "FROM tmp"),
+        (r"DATE_PART\(EPOCH,", "DATE_PART('epoch',"),
+        (r"\bAPPROX_PERCENTILE\(", "approx_quantile("),
+        (r"\bSKEW\(", "skewness("),
+        (r"\bCURRENT_TIMESTAMP\(\)", "CURRENT_TIMESTAMP"),
+        (r"\bOBJECT_CONSTRUCT\(", "json_object("),
+    ]
+    # Snowflake scripting blocks of per-column profiling are run the way Snowflake runs them:
+    # the type of the column is probed first, then the SELECT of the branch matching the type is executed
+    SCRIPT_TYPE_PROBE = re.compile(r"SELECT\s+typeof\((.+?)::variant\) into :col_type\s+FROM (\(.*?\));", re.S)
+    SCRIPT_BRANCH = re.compile(r"\b(ELSEIF|IF|ELSE)\b(.*?)res := \((.*?)\);\s*RETURN table\(res\);", re.S)
+
+    def __init__(self, connection: duckdb.DuckDBPyConnection):
+        self.connection = connection
+        self.spark_session = SparkSession.builder.getOrCreate()
+        self.statements = []
+
+    def reset(self):
+        self.statements = []
+
+    def count_scans(self, relation: str) -> int:
+        return sum(len(re.findall(rf"\b{relation}\b", statement)) for statement in self.statements)
+
+    def translate(self, sql: str) -> str:
+        for pattern, replacement in self.DIALECT_REWRITES:
+            sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
+        return self.rewrite_epoch_casts(sql)
+
+    @staticmethod
+    def rewrite_epoch_casts(sql: str) -> str:
+        # Snowflake casts epoch seconds to timestamps with ::timestamp, DuckDB casts only strings that way.
+        # Generated casts always follow a parenthesized expression, which is wrapped into epoch_ms instead
+        while (cast_idx := sql.lower().find(")::timestamp")) != -1:
+            start_idx, depth = cast_idx, 0
+            while True:
+                depth += {")": 1, "(": -1}.get(sql[start_idx], 0)
+                if depth == 0:
+                    break
+                start_idx -= 1
+            sql = f"{sql[:start_idx]}epoch_ms(CAST({sql[start_idx:cast_idx + 1]} * 1000 AS BIGINT))" \
+                  f"{sql[cast_idx + len(')::timestamp'):]}"
+        return sql
+
+    @staticmethod
+    def get_variant_type(duckdb_type: str) -> str:
+        # Names returned by Snowflake's typeof() for values of the DuckDB type
+        if duckdb_type.startswith("TIMESTAMP"):
+            return "TIMESTAMP_TZ" if "TIME ZONE" in duckdb_type else "TIMESTAMP_NTZ"
+        if duckdb_type.startswith("DECIMAL"):
+            return "DECIMAL"
+        if duckdb_type in ["DOUBLE", "FLOAT", "REAL"]:
+            return "DOUBLE"
+        if duckdb_type.endswith("INT") or duckdb_type.endswith("INTEGER"):
+            return "INTEGER"
+        return duckdb_type
+
+    def run_script(self, sql: str) -> pd.DataFrame:
+        column, probed_relation = self.SCRIPT_TYPE_PROBE.search(sql).groups()
+        duckdb_type = self.connection.execute(f"SELECT typeof({column}) FROM {probed_relation}").fetchone()[0]
+        variant_type = self.get_variant_type(duckdb_type)
+        for keyword, condition, branch_sql in self.SCRIPT_BRANCH.findall(sql):
+            if keyword == "ELSE" or variant_type in re.findall(r"'(\w+)'", condition):
+                return self.connection.execute(self.translate(branch_sql)).df()
+        return pd.DataFrame()
+
+    def read_sql(self, sql: str) -> pd.DataFrame:
+        self.statements.append(sql)
+        try:
+            if sql.lstrip().startswith("EXECUTE IMMEDIATE"):
+                return self.run_script(sql)
+            return self.connection.execute(self.translate(sql)).df()
+        except duckdb.Error as e:
+            return pd.DataFrame([{'error': str(e), 'statement': sql}])
+
+    def shutdown(self):
+        self.connection.close()
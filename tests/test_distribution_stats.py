@@ -0,0 +1,84 @@
+import pytest
+
+from helpers.distribution_stats import HISTOGRAM_PERCENTILES, HISTOGRAM_BUCKETS, build_equi_depth_histogram, \
+    build_equi_width_histogram, find_histogram_percentile, build_moment_expressions, convert_distribution_to_dict, \
+    format_epoch, to_float
+
+# Values 0..100 spread evenly, so every histogram percentile is known exactly
+UNIFORM_MAX = 100.0
+UNIFORM_PERCENTILES = [percentile * UNIFORM_MAX for percentile in HISTOGRAM_PERCENTILES]
+UNIFORM_CNT = 1000
+# 2024-01-01 00:00:00 UTC
+EPOCH_2024 = 1704067200
+
+
+def build_distribution_row(min_value: float, percentiles: list[float], max_value: float, cnt: int) -> dict:
+    return {
+        "dist_cnt": cnt,
+        "dist_min": min_value,
+        "dist_max": max_value,
+        "stddev": 1.5,
+        "skewness": float("nan"),
+        "zero_cnt": 3,
+        "negative_cnt": None,
+        **{f"pct{idx}": percentile for idx, percentile in enumerate(percentiles)},
+    }
+
+
+def test_equi_depth_buckets_cover_all_rows():
+    equi_depth = build_equi_depth_histogram(0.0, UNIFORM_PERCENTILES, UNIFORM_MAX)
+
+    assert len(equi_depth) == len(HISTOGRAM_PERCENTILES) + 1
+    assert equi_depth[0]["from"] == 0.0 and equi_depth[-1]["to"] == UNIFORM_MAX
+    assert sum(bucket["share"] for bucket in equi_depth) == pytest.approx(1.0)
+    assert find_histogram_percentile(equi_depth, 0.05) == pytest.approx(5.0)
+    assert find_histogram_percentile(equi_depth, 0.95) == pytest.approx(95.0)
+    assert find_histogram_percentile(equi_depth, 1.0) == UNIFORM_MAX
+
+
+def test_equi_width_counts_are_interpolated_from_percentiles():
+    equi_width = build_equi_width_histogram(0.0, UNIFORM_PERCENTILES, UNIFORM_MAX, UNIFORM_CNT)
+
+    assert len(equi_width) == HISTOGRAM_BUCKETS
+    assert [bucket["estimated_count"] for bucket in equi_width] == [UNIFORM_CNT // HISTOGRAM_BUCKETS] * HISTOGRAM_BUCKETS
+    assert build_equi_width_histogram(7.0, [7.0] * len(HISTOGRAM_PERCENTILES), 7.0, 5) \
+        == [{"from": 7.0, "to": 7.0, "estimated_count": 5}]
+
+
+def test_moments_are_aggregates_of_one_pass():
+    expressions = build_moment_expressions("x", "SKEW", "c0_")
+
+    assert expressions == ["COUNT(x) as c0_dist_cnt", "MIN(x) as c0_dist_min", "MAX(x) as c0_dist_max",
+                           "STDDEV_POP(x) as c0_stddev", "SKEW(x) as c0_skewness"]
+    assert to_float(None) == 0.0 and to_float(float("nan")) == 0.0
+
+
+def test_numeric_distribution_is_converted_from_aggregates():
+    distribution = convert_distribution_to_dict(
+        build_distribution_row(0.0, UNIFORM_PERCENTILES, UNIFORM_MAX, UNIFORM_CNT), "NUMERIC")
+
+    assert distribution["stddev"] == 1.5
+    assert distribution["skewness"] == 0.0
+    assert (distribution["zero_cnt"], distribution["negative_cnt"]) == (3, 0)
+    assert set(distribution["histogram"]) == {"equi_depth", "equi_width", "approximate"}
+    assert distribution["histogram"]["approximate"]
+    assert convert_distribution_to_dict(build_distribution_row(0.0, [], 0.0, 0), "NUMERIC") == {}
+
+
+def test_timestamp_distribution_is_in_seconds_and_rendered_in_time_zone():
+    hour_percentiles = [EPOCH_2024 + percentile * 3600 for percentile in HISTOGRAM_PERCENTILES]
+    distribution = convert_distribution_to_dict(
+        build_distribution_row(EPOCH_2024, hour_percentiles, EPOCH_2024 + 3600, 3601), "TIMESTAMP",
+        time_zone="Europe/Berlin")
+
+    assert distribution["avg_gap_sec"] == pytest.approx(1.0)
+    assert distribution["max_bucket_span_sec"] == pytest.approx(180.0)
+    assert "zero_cnt" not in distribution
+    assert distribution["histogram"]["equi_depth"][0]["from"] == "2024-01-01 01:00:00"
+    assert distribution["histogram"]["equi_width"][-1]["to"] == "2024-01-01 02:00:00"
+
+
+def test_epochs_are_formatted_in_region_and_offset_time_zones():
+    assert format_epoch(EPOCH_2024) == "2024-01-01 00:00:00"
+    assert format_epoch(EPOCH_2024, "America/New_York") == "2023-12-31 19:00:00"
+    assert format_epoch(EPOCH_2024, "+05:30") == "2024-01-01 05:30:00"
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+# Profilers import Spark, both stand-in executors are needed by every test of the module
+pytest.importorskip("pyspark")
+pytest.importorskip("duckdb")
+
+from config.config import CONSTRAINT_IDENTIFICATION_RULES, VALUE_SET_LIMIT
+from utils.profilers import SNFProfiler, SparkProfiler
+from utils.column_batching import ColumnBatchPlanner
+from utils.analyzer import Analyzer
+from utils.rule_validator import RuleValidator
+from tests.harness import WIDE_TABLE_NUMERIC_COLUMNS, WIDE_TABLE_TEXT_COLUMNS, WIDE_TABLE_TIMESTAMP_COLUMNS
+
+WIDE_TABLE_COLUMNS = WIDE_TABLE_NUMERIC_COLUMNS + WIDE_TABLE_TEXT_COLUMNS + WIDE_TABLE_TIMESTAMP_COLUMNS
+# Columns of every type fit into one batch
+WIDE_TABLE_BATCHES = 3
+SNF_WIDE_TABLE = {
+    "datasource_type": "SNF",
+    "schema": "TEST",
+    "name": "WIDE_TABLE",
+}
+
+# Count, column list, semi-structured columns and column types lookups,
+# then an aggregate and a top values query for the numeric, the text and the timestamp batch
+SNF_BATCHED_MAX_STATEMENTS = 4 + 2 * WIDE_TABLE_BATCHES
+SNF_BATCHED_MAX_SCANS = 1 + 2 * WIDE_TABLE_BATCHES
+SPARK_BATCHED_MAX_STATEMENTS = 2 * WIDE_TABLE_BATCHES
+# Per-column profiling starts at least one job per statement, so at least two per column.
+# Batched profiling has to stay below one job per two columns
+SPARK_BATCHED_MAX_JOBS = WIDE_TABLE_COLUMNS // 2
+# Count and stats query per column
+SPARK_PER_COLUMN_MAX_STATEMENTS = 2 * WIDE_TABLE_COLUMNS
+# Count, column list and semi-structured columns lookups, then a distinct estimate and a stats script per column
+SNF_PER_COLUMN_MAX_STATEMENTS = 3 + 2 * WIDE_TABLE_COLUMNS
+
+
+def assert_all_columns_profiled(table_description: dict):
+    columns = table_description["TABLE_PROFILING_INFO"]["COLUMNS"]
+    assert len(columns) == WIDE_TABLE_COLUMNS
+    assert not [col_name for col_name, col_stat in columns.items() if col_stat.get("ERROR")]
+
+
+def test_snf_batched_profiling_of_wide_table(snf_executor):
+    profiler = SNFProfiler([], executor=snf_executor, column_batch_planner=ColumnBatchPlanner())
+
+    table_description = asyncio.run(profiler.describe_table_config(SNF_WIDE_TABLE))
+
+    assert_all_columns_profiled(table_description)
+    assert len(snf_executor.statements) <= SNF_BATCHED_MAX_STATEMENTS
+    assert snf_executor.count_scans("TEST.WIDE_TABLE") <= SNF_BATCHED_MAX_SCANS
+
+
+def test_snf_per_column_profiling_of_wide_table(snf_executor):
+    profiler = SNFProfiler([], executor=snf_executor)
+
+    table_description = asyncio.run(profiler.describe_table_config(SNF_WIDE_TABLE))
+
+    assert_all_columns_profiled(table_description)
+    assert len(snf_executor.statements) <= SNF_PER_COLUMN_MAX_STATEMENTS
+
+
+def test_snf_rules_of_table_are_validated_with_one_query(snf_executor):
+    profiler = SNFProfiler([], executor=snf_executor,
+                           column_batch_planner=ColumnBatchPlanner(value_set_limit=VALUE_SET_LIMIT),
+                           value_set_limit=VALUE_SET_LIMIT)
+    suggested_constraints = Analyzer(
+        profiling_results=[asyncio.run(profiler.describe_table_config(SNF_WIDE_TABLE))],
+        constraint_identification_rules=CONSTRAINT_IDENTIFICATION_RULES).suggest_constraints()
+    snf_executor.reset()
+
+    asyncio.run(RuleValidator({"SNF": profiler}).validate([SNF_WIDE_TABLE], suggested_constraints))
+
+    assert suggested_constraints[0]["VALIDATION"]["CHECKED_RULES"] > 0
+    assert len(snf_executor.statements) == 1
+
+
+def test_spark_batched_profiling_of_wide_table(spark_executor, wide_parquet_path):
+    profiler = SparkProfiler([], executor=spark_executor, column_batch_planner=ColumnBatchPlanner())
+
+    table_description = asyncio.run(profiler.describe_table_config({"path": wide_parquet_path,
+                                                                    "name": "WIDE_TABLE"}))
+
+    assert_all_columns_profiled(table_description)
+    assert len(spark_executor.statements) <= SPARK_BATCHED_MAX_STATEMENTS
+    assert spark_executor.jobs <= SPARK_BATCHED_MAX_JOBS
+
+
+def test_spark_per_column_profiling_of_wide_table(spark_executor, wide_parquet_path):
+    profiler = SparkProfiler([], executor=spark_executor)
+
+    table_description = asyncio.run(profiler.describe_table_config({"path": wide_parquet_path,
+                                                                    "name": "WIDE_TABLE"}))
+
+    assert_all_columns_profiled(table_description)
+    assert len(spark_executor.statements) <= SPARK_PER_COLUMN_MAX_STATEMENTS
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from helpers.query_limits import QueryTimeLimit, current_time_limit, run_with_degradation, DEGRADATION_STRATEGIES
+
+QUERY_TIMEOUT_SEC = 60
+
+
+def build_attempt(timed_out_strategies: list[str], attempts: list[str]):
+    # Stands for a column profiled with a strategy, timed out strategies mark their limit the way executors do
+    async def attempt(strategy: str) -> dict:
+        attempts.append(strategy)
+        if strategy in timed_out_strategies:
+            current_time_limit.get().timed_out = True
+            return {"ERROR": "QUERY_TIMEOUT"}
+        return {"strategy": strategy}
+    return attempt
+
+
+def run_limited(attempt, time_limit: QueryTimeLimit = None) -> tuple[dict | None, str | None]:
+    async def run():
+        if time_limit is None:
+            return await run_with_degradation(attempt)
+        with time_limit:
+            return await run_with_degradation(attempt)
+    return asyncio.run(run())
+
+
+def test_exact_strategy_is_the_only_one_without_limit():
+    attempts = []
+
+    result, strategy = run_limited(build_attempt([], attempts))
+
+    assert attempts == ["exact"]
+    assert (result, strategy) == ({"strategy": "exact"}, None)
+
+
+def test_exact_result_within_limit_is_kept():
+    attempts = []
+
+    result, strategy = run_limited(build_attempt([], attempts), QueryTimeLimit(QUERY_TIMEOUT_SEC))
+
+    assert attempts == ["exact"]
+    assert (result, strategy) == ({"strategy": "exact"}, "exact")
+
+
+def test_timed_out_strategies_degrade_to_approximate_then_sample():
+    attempts = []
+    time_limit = QueryTimeLimit(QUERY_TIMEOUT_SEC)
+
+    result, strategy = run_limited(build_attempt(["exact", "approximate"], attempts), time_limit)
+
+    assert attempts == ["exact", "approximate", "sample"]
+    assert (result, strategy) == ({"strategy": "sample"}, "sample")
+    # Every attempt runs under a limit of its own, a timed out attempt does not mark the table limit
+    assert not time_limit.timed_out
+
+
+def test_nothing_is_returned_when_all_strategies_time_out():
+    attempts = []
+
+    result, strategy = run_limited(build_attempt(DEGRADATION_STRATEGIES, attempts), QueryTimeLimit(QUERY_TIMEOUT_SEC))
+
+    assert attempts == DEGRADATION_STRATEGIES
+    assert (result, strategy) == (None, None)
+
+
+def test_passed_deadline_leaves_no_time_for_queries():
+    time_limit = QueryTimeLimit(QUERY_TIMEOUT_SEC, deadline_ts=time.time() - 1)
+
+    assert time_limit.get_timeout() == 0.0
+    assert QueryTimeLimit().get_timeout() is None
@@ -0,0 +1,73 @@
+import copy
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from helpers.result_model import ColumnProfile, ProfilingResultEncoder, compact_table_description
+
+COLUMN_STAT = {
+    "count": 10,
+    "share": 1.0,
+    "col_type": "NUMERIC",
+    "mean": np.float64(2.5),
+    "histogram": {"equi_depth": [{"from": 0.0, "to": 5.0, "share": 1.0}]},
+    "strategy": "exact",
+}
+
+
+def test_column_profile_reads_and_writes_as_dict():
+    profile = ColumnProfile(COLUMN_STAT)
+
+    assert profile == COLUMN_STAT
+    assert list(profile) == list(COLUMN_STAT)
+    assert len(profile) == len(COLUMN_STAT)
+    assert profile.get("uniq") is None
+    assert "uniq" not in profile and "strategy" in profile
+
+    profile["uniq"] = 4
+    profile["ERROR"] = "failed"
+    del profile["mean"]
+    del profile["strategy"]
+    assert profile["uniq"] == 4 and profile["ERROR"] == "failed"
+    assert "mean" not in profile and "strategy" not in profile
+
+
+def test_missing_keys_raise_key_error():
+    profile = ColumnProfile({"count": 1})
+
+    with pytest.raises(KeyError):
+        profile["uniq"]
+    with pytest.raises(KeyError):
+        profile["histogram"]
+    with pytest.raises(KeyError):
+        del profile["uniq"]
+
+
+def test_column_profile_is_encoded_as_plain_dict():
+    encoded = json.dumps({"COLUMNS": {"C": ColumnProfile(COLUMN_STAT)}}, cls=ProfilingResultEncoder)
+
+    assert json.loads(encoded) == {"COLUMNS": {"C": {**COLUMN_STAT, "mean": 2.5}}}
+
+
+def test_column_profile_survives_pickle_and_deepcopy():
+    profile = ColumnProfile(COLUMN_STAT)
+
+    for restored in [pickle.loads(pickle.dumps(profile)), copy.deepcopy(profile)]:
+        assert isinstance(restored, ColumnProfile)
+        assert restored == profile
+    copied = copy.deepcopy(profile)
+    copied["histogram"]["equi_depth"].clear()
+    assert profile["histogram"]["equi_depth"]
+
+
+def test_table_description_is_compacted_once():
+    table_description = compact_table_description({
+        "TABLE_NAME": "T",
+        "TABLE_PROFILING_INFO": {"TABLE_COUNT": 10, "COLUMNS": {"C": dict(COLUMN_STAT)}},
+    })
+    profile = table_description["TABLE_PROFILING_INFO"]["COLUMNS"]["C"]
+
+    assert isinstance(profile, ColumnProfile)
+    assert compact_table_description(table_description)["TABLE_PROFILING_INFO"]["COLUMNS"]["C"] is profile
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+# The queue schedules tables with the profilers, which import Spark
+pytest.importorskip("pyspark")
+
+from utils.work_queue import TableWorkQueue, QueueCoordinator
+
+DEAD_WORKER_ID = "dead-worker"
+LEASE_SEC = 0.2
+POLL_SEC = 0.05
+
+
+class StubScheduler:
+    concurrency_slots = 2
+    trace_file_path = None
+
+    def __init__(self):
+        self.profilers = {"SPARK": object()}
+        self.profiled = []
+
+    @staticmethod
+    def get_datasource_type(table_info: dict) -> str:
+        return "SPARK"
+
+    def assign_profilers(self, table_config: list[dict]) -> list[tuple[dict, object]]:
+        return [(table_info, self.profilers["SPARK"]) for table_info in table_config]
+
+    async def estimate_costs(self, assigned: list[tuple[dict, object]]) -> list[dict]:
+        return [{"ESTIMATED_SEC": len(assigned) - table_num} for table_num in range(len(assigned))]
+
+    async def profile_table(self, table_info: dict, profiler, estimate: dict) -> tuple[dict, None]:
+        self.profiled.append(table_info["name"])
+        return {"TABLE_NAME": table_info["name"]}, None
+
+
+class AbandonedClaimQueue(TableWorkQueue):
+    # Another worker claims the largest table right after it is enqueued and dies without sending heartbeats
+    def enqueue(self, run_id: str, table_config: list[dict], estimates: list[dict]):
+        super().enqueue(run_id, table_config, estimates)
+        self.abandoned_item = self.claim(DEAD_WORKER_ID, run_id)
+
+
+def test_coordinator_reruns_table_of_expired_claim(tmp_path):
+    work_queue = AbandonedClaimQueue(str(tmp_path / "queue.sqlite"), lease_sec=LEASE_SEC)
+    scheduler = StubScheduler()
+    table_config = [{"name": f"TABLE_{table_num}"} for table_num in range(3)]
+
+    results = asyncio.run(asyncio.wait_for(QueueCoordinator(work_queue, scheduler, poll_sec=POLL_SEC)
+                                           .run(table_config), timeout=10))
+
+    assert [result["TABLE_NAME"] for result in results] == ["TABLE_0", "TABLE_1", "TABLE_2"]
+    assert work_queue.abandoned_item["table_num"] == 0
+    assert scheduler.profiled.count("TABLE_0") == 1
+
+
+def test_coordinator_claims_tables_of_its_run_only(tmp_path):
+    work_queue = TableWorkQueue(str(tmp_path / "queue.sqlite"), lease_sec=LEASE_SEC)
+    # Items of a coordinator which died before collecting its results
+    work_queue.enqueue("dead-run", [{"name": "STALE_TABLE"}], [{"ESTIMATED_SEC": 100}])
+    scheduler = StubScheduler()
+
+    results = asyncio.run(asyncio.wait_for(QueueCoordinator(work_queue, scheduler, poll_sec=POLL_SEC)
+                                           .run([{"name": "TABLE_0"}]), timeout=10))
+
+    assert [result["TABLE_NAME"] for result in results] == ["TABLE_0"]
+    assert scheduler.profiled == ["TABLE_0"]
+    assert work_queue.count_unfinished("dead-run") == 1
@@ -0,0 +1,98 @@
+import hashlib
+
+from helpers.adf_framework import ADF_DATASOURCES_TABLE, ADF_RULE_COLUMNS, build_sql_string_literal
+
+
+class ADFRulesExporter:
+    # DQ_RULE_ID = DATASOURCE_ID * 10^13 + rule type code * 10^12 + rule number within the rule type.
+    # Numbers are hashed from rule identities, the wide space keeps collisions unlikely for thousands of rules
+    RULE_NUMBERS_PER_TYPE = 10 ** 12
+    # Rules are matched by table, column and rule, the rule name is kept in the description of the rule
+    RULE_IDENTITY_COLUMNS = ["DATASOURCE_ID", "PARAM_TABLE_NAME", "PARAM_TABLE_COLUMN", "META_RULE_TYPE",
+                             "DQ_RULE_DESC"]
+
+    def __init__(self, datasource_desc: str, rules_table: str = 'UKI_STG_MTD.DQ_RULES'):
+        self.datasource_desc = datasource_desc
+        self.rules_table = rules_table
+
+    @staticmethod
+    def is_accepted(suggestion: dict) -> bool:
+        # Suggestions violating the data beyond their tolerated share are not exported when the validation stage
+        # was run. Rules which can not be validated are exported as they are,
+        # determined lists are exported only when their values are known
+        validation = suggestion.get("VALIDATION", {})
+        return "ADF_RULE" in suggestion \
+            and not (validation.get("VALIDATABLE") and not validation.get("HOLDS")) \
+            and not (suggestion.get("RULE") == "DETERMINED_LIST" and not suggestion.get("VALUES"))
+
+    def collect_rules(self, suggested_constraints: list[dict]) -> list[tuple[str, dict]]:
+        rules = []
+        for table in suggested_constraints:
+            for col_name, col_suggestions in table.get("SUGGESTED_CONSTRAINTS", {}).items():
+                rules += [(f'{table["TABLE_NAME"]}.{col_name}.{suggestion["RULE"]}', self.describe_rule(suggestion))
+                          for suggestion in col_suggestions.get("POSSIBLE_CONSTRAINTS", [])
+                          if self.is_accepted(suggestion)]
+            rules += [(f'{table["TABLE_NAME"]}.{",".join(suggestion["COLUMNS"])}.{suggestion["RULE"]}',
+                       self.describe_rule(suggestion))
+                      for suggestion in table.get("SUGGESTED_KEYS", []) if self.is_accepted(suggestion)]
+        return rules
+
+    @staticmethod
+    def describe_rule(suggestion: dict) -> dict:
+        # Several rules share a rule type, e.g. DETERMINED_LIST and PATTERN are both REGEXP rules
+        adf_rule = suggestion["ADF_RULE"]
+        return {**adf_rule,
+                "VALUES": {**adf_rule["VALUES"], "DQ_RULE_DESC": build_sql_string_literal(suggestion["RULE"])}}
+
+    def assign_rule_numbers(self, rules: list[tuple[str, dict]]) -> list[tuple[int, dict]]:
+        # Numbers are derived from the rule identity, instead of the order of suggestions, so the same rule gets
+        # the same DQ_RULE_ID in every run. Colliding rules take the next free number in the order of identities.
+        # MERGE matches existing rules by identity and keeps their ids, so a probed number never moves a rule
+        taken, numbered = set(), []
+        for rule_identity, adf_rule in sorted(rules, key=lambda x: x[0]):
+            rule_num = int(hashlib.sha1(rule_identity.encode()).hexdigest(), 16) % self.RULE_NUMBERS_PER_TYPE
+            while (adf_rule["RULE_TYPE_CODE"], rule_num) in taken:
+                rule_num = (rule_num + 1) % self.RULE_NUMBERS_PER_TYPE
+            taken.add((adf_rule["RULE_TYPE_CODE"], rule_num))
+            numbered.append((adf_rule["RULE_TYPE_CODE"] * self.RULE_NUMBERS_PER_TYPE + rule_num, adf_rule))
+        return numbered
+
+    def resolve_datasource(self, value: str) -> str:
+        # Rule parameters hold checking SQL with a quoted <DS> placeholder, nested in the string literal
+        # of the parameter, so the datasource literal is escaped once more for that nesting
+        placeholder = build_sql_string_literal("'<DS>'")[1:-1]
+        return value.replace(placeholder,
+                             build_sql_string_literal(build_sql_string_literal(self.datasource_desc))[1:-1])
+
+    def build_merge_script(self, suggested_constraints: list[dict]) -> str | None:
+        rules = self.assign_rule_numbers(self.collect_rules(suggested_constraints))
+        if not rules:
+            return None
+
+        datasource_desc = build_sql_string_literal(self.datasource_desc)
+        rows = ",\n        ".join(
+            "(" + ", ".join([str(rule_num)] + [self.resolve_datasource(str(adf_rule["VALUES"][column]))
+                                               for column in ADF_RULE_COLUMNS]) + ")"
+            for rule_num, adf_rule in rules)
+        source_columns = ", ".join(["RULE_NUM"] + ADF_RULE_COLUMNS)
+        insert_columns = ", ".join(["DQ_RULE_ID", "DATASOURCE_ID"] + ADF_RULE_COLUMNS)
+        insert_values = ", ".join(f"s.{column}" for column in ["DQ_RULE_ID", "DATASOURCE_ID"] + ADF_RULE_COLUMNS)
+        identity_match = "\n    AND ".join(f"t.{column} = s.{column}" for column in self.RULE_IDENTITY_COLUMNS)
+        update_columns = ",\n        ".join(f"t.{column} = s.{column}" for column in ADF_RULE_COLUMNS
+                                            if column not in self.RULE_IDENTITY_COLUMNS)
+        return f"""MERGE INTO {self.rules_table} t
+USING (
+    SELECT
+        ds.DATASOURCE_ID * {10 * self.RULE_NUMBERS_PER_TYPE} + r.RULE_NUM AS DQ_RULE_ID,
+        ds.DATASOURCE_ID,
+        r.*
+    FROM (VALUES
+        {rows}
+    ) r ({source_columns})
+    JOIN {ADF_DATASOURCES_TABLE} ds ON ds.DATASOURCE_DESC = {datasource_desc}
+) s
+ON {identity_match}
+WHEN MATCHED THEN UPDATE SET
+        {update_columns}
+WHEN NOT MATCHED THEN INSERT ({insert_columns})
+    VALUES ({insert_values});"""
@@ -1,16 +1,19 @@
 from helpers.exceptions import LackDataForAnalysisError, UndefinedColumnTypeError
 from helpers.object_types import ColumnType
-from utils.constraint_identifier import ConstraintIdentifierBuilder
+from helpers.run_trace import get_table_key
+from utils.constraint_identifier import ConstraintIdentifierBuilder, identify_unique_keys
 
 
 class Analyzer:
     def __init__(self,
                  profiling_results: list,
                  constraint_identification_rules: dict[str, list[dict]],
-                 add_adf_framework_template: bool = False):
+                 add_adf_framework_template: bool = False,
+                 drift_by_table: dict[str, dict] = None):
         self._profiling_results = [x for x in profiling_results if not x.get("ERROR")]
         self.constraint_identification_rules = constraint_identification_rules
         self.add_adf_framework_template = add_adf_framework_template
+        self.drift_by_table = drift_by_table
 
     @property
     def profiling_results(self):
@@ -18,20 +21,35 @@ class Analyzer:
 
     @profiling_results.setter
     def profiling_results(self, profiling_results: list):
-        self.__init__(profiling_results, self.constraint_identification_rules)
+        self.__init__(profiling_results,
+                      self.constraint_identification_rules,
+                      self.add_adf_framework_template,
+                      self.drift_by_table)
 
     def suggest_constraints(self) -> list[dict]:
         suggested_constraints = []
         for table in self.profiling_results:
             suggestions_for_table = {
                 "TABLE_NAME": table.get("TABLE_NAME"),
+                "TABLE_KEY": get_table_key(table),
                 "SUGGESTED_CONSTRAINTS": {},
             }
+            if self.drift_by_table is not None:
+                # Suggestions for columns listed as stable were already reviewed in the previous run
+                suggestions_for_table["DRIFT"] = self.drift_by_table.get(get_table_key(table), {
+                    "DESCRIPTION": "No previous profiling run to compare with",
+                })
 
             if not table.get("TABLE_PROFILING_INFO") \
                or not table["TABLE_PROFILING_INFO"].get("COLUMNS"):
                 raise LackDataForAnalysisError(data_provided=table)
 
+            if table["TABLE_PROFILING_INFO"].get("KEY_CANDIDATES"):
+                suggestions_for_table["SUGGESTED_KEYS"] = identify_unique_keys(
+                    key_candidates=table["TABLE_PROFILING_INFO"]["KEY_CANDIDATES"],
+                    related_table=table.get("TABLE_NAME"),
+                    add_adf_framework_template=self.add_adf_framework_template)
+
             for col_name, col_stat in table["TABLE_PROFILING_INFO"]["COLUMNS"].items():
                 if col_stat.get("ERROR"):
                     suggestions_for_table["SUGGESTED_CONSTRAINTS"][col_name] = {
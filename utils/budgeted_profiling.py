@@ -0,0 +1,116 @@
+import math
+import time
+
+from utils.profilers import Profiler
+from helpers.object_types import ColumnType
+
+
+class ProgressiveRefinement:
+    SAMPLE_PERCENT_STEPS = [1, 10, 100]
+    # A 1% sample of a table below this size has under 1000 rows, so its margins are too wide to be useful
+    # and a full pass over it is cheap, such tables are profiled completely in one step
+    FULL_PASS_MAX_ROWS = 100000
+    # A profiling pass reads the table for the row count, for the aggregate stats and for the top values,
+    # used to predict bytes scanned
+    SCANS_PER_PROFILING_PASS = 3
+    # z-value for 95% confidence margins of shares
+    Z_95 = 1.96
+
+    def __init__(self, seconds: float = None, bytes_scanned: int = None, sample_percent_steps: list[float] = None):
+        self.seconds = seconds
+        self.bytes_scanned = bytes_scanned
+        self.sample_percent_steps = sample_percent_steps if sample_percent_steps else self.SAMPLE_PERCENT_STEPS
+
+    def fits_budget(self, spent_sec: float, spent_bytes: int, predicted_sec: float, predicted_bytes: int) -> bool:
+        if self.seconds is not None and spent_sec + predicted_sec > self.seconds:
+            return False
+        if self.bytes_scanned is not None and spent_bytes + predicted_bytes > self.bytes_scanned:
+            return False
+        return True
+
+    async def profile(self, profiler: Profiler, table_info: dict, table_size: dict = None) -> dict:
+        table_bytes, table_rows = (table_size or {}).get("BYTES"), (table_size or {}).get("ROWS")
+        ts = time.time()
+        spent_bytes = 0
+        best_profile, best_percent = None, None
+        previous_elapsed, previous_percent = None, None
+        sample_percent_steps = [100] if table_rows is not None and table_rows <= self.FULL_PASS_MAX_ROWS \
+            else self.sample_percent_steps
+
+        for sample_percent in sample_percent_steps:
+            predicted_bytes = int((table_bytes or 0) * sample_percent / 100 * self.SCANS_PER_PROFILING_PASS)
+            if best_profile is not None:
+                # Profiling time is assumed to grow linearly with the sample size
+                predicted_sec = previous_elapsed * sample_percent / previous_percent
+                if not self.fits_budget(time.time() - ts, spent_bytes, predicted_sec, predicted_bytes):
+                    break
+
+            step_ts = time.time()
+            table_profile = await profiler.describe_table_config(table_info,
+                                                                 sample_percent=sample_percent
+                                                                 if sample_percent < 100 else None,
+                                                                 table_size=table_size)
+            previous_elapsed, previous_percent = time.time() - step_ts, sample_percent
+            spent_bytes += predicted_bytes
+
+            # A sample may miss all rows of a small or filtered table, errors of sampled passes are not kept
+            # and the next larger sample is tried, only the error of the full pass is returned
+            if table_profile.get("ERROR"):
+                if sample_percent < 100:
+                    continue
+                if best_profile is not None:
+                    break
+            best_profile, best_percent = table_profile, sample_percent
+
+        if best_profile is None or best_profile.get("ERROR") or not best_profile.get("TABLE_PROFILING_INFO"):
+            return best_profile if best_profile is not None else table_profile
+        return self.annotate_accuracy(best_profile, best_percent, time.time() - ts, spent_bytes)
+
+    def annotate_accuracy(self, table_profile: dict, sample_percent: float, spent_sec: float, spent_bytes: int) -> dict:
+        profiling_info = table_profile["TABLE_PROFILING_INFO"]
+        fraction = sample_percent / 100
+        sampled_count = profiling_info.get("TABLE_COUNT", 0)
+
+        profiling_info["BUDGET"] = {
+            "seconds": self.seconds,
+            "bytes_scanned": self.bytes_scanned,
+            "spent_sec": spent_sec,
+            "estimated_bytes_scanned": spent_bytes,
+            "sample_percent": sample_percent,
+        }
+        if sample_percent >= 100:
+            for col_stat in profiling_info["COLUMNS"].values():
+                col_stat["accuracy"] = {"sample_percent": 100, "exact": True}
+            return table_profile
+
+        profiling_info["SAMPLED_TABLE_COUNT"] = sampled_count
+        profiling_info["TABLE_COUNT"] = int(sampled_count / fraction)
+        for col_stat in profiling_info["COLUMNS"].values():
+            if col_stat.get("ERROR"):
+                continue
+            col_stat["accuracy"] = self.estimate_column_accuracy(col_stat, sampled_count, sample_percent)
+            # Counts are scaled to the whole table, shares keep their sampled values
+            col_stat["count"] = int(col_stat.get("count", 0) / fraction)
+            col_stat["top_freq"] = int(col_stat.get("top_freq", 0) / fraction)
+        return table_profile
+
+    def estimate_column_accuracy(self, col_stat: dict, sampled_count: int, sample_percent: float) -> dict:
+        # Margins assume independently sampled rows. Snowflake samples whole micro-partitions, so for columns
+        # clustered by load order the real error of block samples is wider than the reported margins
+        def share_margin(share: float, sample_size: int) -> float:
+            return self.Z_95 * math.sqrt(share * (1 - share) / sample_size) if sample_size else 1.0
+
+        accuracy = {
+            "sample_percent": sample_percent,
+            "exact": False,
+            "share_margin_95": share_margin(col_stat.get("share", 0), sampled_count),
+            "top_share_margin_95": share_margin(col_stat.get("top_share", 0), sampled_count),
+            "uniq": "lower_bound",
+        }
+        if col_stat.get("col_type") in [ColumnType.NUMERIC.value, ColumnType.TIMESTAMP.value]:
+            # Dvoretzky-Kiefer-Wolfowitz bound on the rank error of sample quantiles
+            non_null_sample_size = col_stat.get("count", 0)
+            accuracy["quantile_rank_error_95"] = math.sqrt(math.log(2 / 0.05) / (2 * non_null_sample_size)) \
+                if non_null_sample_size else 1.0
+            accuracy["min_max"] = "sample_bounds"
+        return accuracy
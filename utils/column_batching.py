@@ -0,0 +1,108 @@
+from typing import Callable
+
+from utils.executors import Executor
+from helpers.db_objects import TableColumn, TableColumnsBatch, build_failed_column_stat
+from helpers.object_types import ColumnType
+from helpers.query_limits import APPROXIMATE_STRATEGY, run_with_degradation
+
+
+class ColumnBatchPlanner:
+    # Relative cost of a column within a batch query: every column adds a grouping set to the top values scan,
+    # text columns add one more for upper-cased values, numeric and timestamp columns add a percentile sketch
+    COLUMN_TYPE_COST = {
+        ColumnType.NUMERIC.value: 3,
+        ColumnType.TIMESTAMP.value: 3,
+        ColumnType.TEXT.value: 2,
+    }
+
+    def __init__(self,
+                 max_batch_cost: int = 100,
+                 max_statement_length: int = 500000,
+                 value_set_limit: int = 0,
+                 degraded_sample_percent: float = 1):
+        self.max_batch_cost = max_batch_cost
+        self.max_statement_length = max_statement_length
+        self.value_set_limit = value_set_limit
+        self.degraded_sample_percent = degraded_sample_percent
+
+    def estimate_column_cost(self, column: TableColumn) -> int:
+        return self.COLUMN_TYPE_COST.get(column.col_type, self.COLUMN_TYPE_COST[ColumnType.TEXT.value])
+
+    @staticmethod
+    def group_by_type(columns: list[TableColumn]) -> list[list[TableColumn]]:
+        groups = {col_type: [] for col_type in ColumnType.list_possible_types()}
+        for column in columns:
+            groups.get(column.col_type, groups[ColumnType.TEXT.value]).append(column)
+        return [group for group in groups.values() if group]
+
+    def take_batch(self, pending: list[TableColumn], max_batch_cost: int) -> list[TableColumn]:
+        batch, batch_cost = [pending[0]], self.estimate_column_cost(pending[0])
+        for column in pending[1:]:
+            if batch_cost + self.estimate_column_cost(column) > max_batch_cost:
+                break
+            batch.append(column)
+            batch_cost += self.estimate_column_cost(column)
+        return batch
+
+    async def calc_batch_stat(self,
+                              batch_columns: list[TableColumn],
+                              build_batch: Callable[[list[TableColumn]], TableColumnsBatch],
+                              executor: Executor,
+                              strategy: str) -> dict | None:
+        batch = build_batch(batch_columns)
+        batch.value_set_limit = self.value_set_limit
+        batch.apply_strategy(strategy, self.degraded_sample_percent)
+        return await batch.calc_batch_stat(executor)
+
+    async def collect_stats(self,
+                            columns: list[TableColumn],
+                            build_batch: Callable[[list[TableColumn]], TableColumnsBatch],
+                            executor: Executor) -> dict[str, dict]:
+        columns_stat = {}
+        max_batch_cost = self.max_batch_cost
+
+        for pending in self.group_by_type(columns):
+            while pending:
+                batch_columns = self.take_batch(pending, max_batch_cost)
+                batch = build_batch(batch_columns)
+                batch.value_set_limit = self.value_set_limit
+
+                batch_stat, strategy = None, None
+                if len(batch_columns) == 1 \
+                   or len(batch.build_script_for_aggregate_stat_collection()) <= self.max_statement_length \
+                   and len(batch.build_script_for_top_values_collection()) <= self.max_statement_length:
+                    # Batches timed out with exact stats are retried with cheaper strategies before being split
+                    batch_stat, strategy = await run_with_degradation(
+                        lambda attempt_strategy: self.calc_batch_stat(batch_columns, build_batch, executor,
+                                                                      attempt_strategy))
+
+                if batch_stat is None and len(batch_columns) > 1:
+                    # Shrinking is kept for the rest of the table, the failed batch is retried with half of the size
+                    max_batch_cost = max(1, sum(self.estimate_column_cost(column)
+                                                for column in batch_columns) // 2)
+                    continue
+                if batch_stat is None:
+                    batch_stat = {batch_columns[0].column_name: build_failed_column_stat(
+                        batch_columns[0].col_type, "Failed to collect column stat within a batch")}
+                elif strategy:
+                    batch_stat = {col_name: {**col_stat, "strategy": strategy}
+                                  for col_name, col_stat in batch_stat.items()}
+
+                columns_stat.update(batch_stat)
+                pending = pending[len(batch_columns):]
+
+        return {column.column_name: columns_stat[column.column_name] for column in columns}
+
+    async def collect_aggregate_stats(self,
+                                      columns: list[TableColumn],
+                                      build_batch: Callable[[list[TableColumn]], TableColumnsBatch],
+                                      executor: Executor) -> dict[str, dict]:
+        # Only the aggregate pass without the top values scan, columns of failed batches are left out
+        columns_stat = {}
+        for pending in self.group_by_type(columns):
+            while pending:
+                batch_columns = self.take_batch(pending, self.max_batch_cost)
+                columns_stat.update(await self.calc_batch_stat(batch_columns, build_batch, executor,
+                                                               APPROXIMATE_STRATEGY) or {})
+                pending = pending[len(batch_columns):]
+        return columns_stat
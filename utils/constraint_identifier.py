@@ -1,8 +1,14 @@
 from datetime import datetime
+import re
 import dateutil.parser
 from pytz import UTC
 from functools import reduce
 
+from helpers.object_types import ColumnType
+from helpers.text_patterns import TEXT_PATTERNS, EMBEDDED_TYPES
+from helpers.distribution_stats import find_histogram_percentile
+from helpers.adf_framework import ADF_DATASOURCES_TABLE, build_adf_rule, render_adf_rule_select
+
 
 class ConstraintIdentifier:
     def __init__(self,
@@ -20,6 +26,7 @@ class ConstraintIdentifier:
         self.inconsistent_names: dict | None = None
         self.future_dates      : dict | None = None
         self.foreign_key       : dict | None = None
+        self.text_pattern      : dict | None = None
 
         self.add_adf_framework_template_flag: bool = add_adf_framework_template
 
@@ -34,6 +41,7 @@ class ConstraintIdentifier:
                     self.inconsistent_names,
                     self.future_dates,
                     self.foreign_key,
+                    self.text_pattern,
                 ]
             )
         )
@@ -43,27 +51,17 @@ class ConstraintIdentifier:
             return self
 
         if nullability_threshold < self.base_info.get("share") <= 1:
+            # Columns are suggested as non-nullable while holding up to this share of nulls
             self.nullability = {
                 "DESCRIPTION": "NULLABILITY: Maybe this column should be non-nullable",
+                "RULE": "NULLABILITY",
+                "TOLERATED_VIOLATION_SHARE": round(1 - nullability_threshold, 6),
             }
             if self.add_adf_framework_template_flag:
-                self.nullability["MERGE_INTO_ADF_FRM"] = f"""SELECT
-                                    <DS><DL>3<NUM> as DQ_RULE_ID,
-                                    (SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = '<DS>') AS DATASOURCE_ID,
-                                    NULL DQ_ACTION_ID,
-                                    NULL DQ_RULE_DESC,
-                                    'COMPLETENESS' AS META_DQ_DIMENSION,
-                                    'NULLABILITY' AS META_RULE_TYPE,
-                                    'SMOKE,REGRESSION,INTEGRATION' AS META_SUITES,
-                                    'EXTENDED' AS META_RULE_LEVEL,
-                                    '{self.related_table}' AS PARAM_TABLE_NAME,
-                                    '{self.related_column}' AS PARAM_TABLE_COLUMN,
-                                    NULL PARAM_MIN,
-                                    NULL PARAM_MAX,
-                                    NULL PARAM_REGEXP,
-                                    NULL PARAM_S2T_VIEW,
-                                    NULL PARAM_DEFAULT,
-                                    TRUE IS_ACTIVE"""
+                adf_rule = build_adf_rule(3, "COMPLETENESS", "NULLABILITY", "SMOKE,REGRESSION,INTEGRATION",
+                                          self.related_table, self.related_column)
+                self.nullability["ADF_RULE"] = adf_rule
+                self.nullability["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
 
         elif self.base_info.get("share") == 0:
             self.nullability = {
@@ -72,7 +70,21 @@ class ConstraintIdentifier:
             }
         return self
 
-    def identify_min_max_range(self, **kwargs):
+    def build_data_driven_range(self, range_tolerance: float | None) -> tuple:
+        # 5th and 95th percentiles of the equi-depth histogram widened by a share of their span,
+        # so a few outliers do not define the range. Raw min and max are used without a histogram.
+        # Returns the range with the share of profiled values it may leave out
+        equi_depth = (self.base_info.get("histogram") or {}).get("equi_depth")
+        if not equi_depth or range_tolerance is None or self.base_info.get("col_type") != ColumnType.NUMERIC.value:
+            return self.base_info.get("min"), self.base_info.get("max"), 0.0
+        lower_percentile, upper_percentile = 0.05, 0.95
+        lower = find_histogram_percentile(equi_depth, lower_percentile)
+        upper = find_histogram_percentile(equi_depth, upper_percentile)
+        margin = (upper - lower) * range_tolerance
+        return max(self.base_info["min"], lower - margin), min(self.base_info["max"], upper + margin), \
+            round(lower_percentile + 1 - upper_percentile, 6)
+
+    def identify_min_max_range(self, range_tolerance: float = 0.1, **kwargs):
         # FUTURE_ENHANCEMENT: exclude ID columns and leave columns with values satisfy the regexp
         if not self.base_info.get("min") or not self.base_info.get("max") or not self.base_info.get("uniq"):
             return self
@@ -80,85 +92,66 @@ class ConstraintIdentifier:
         if self.base_info.get("min") != self.base_info.get("max") \
            and not (self.base_info.get("min") == 0 and self.base_info.get("max") == 1)\
            and self.base_info.get("uniq") > 2:
+            range_min, range_max, tolerated_share = self.build_data_driven_range(range_tolerance)
             self.minmax = {
                 "DESCRIPTION": "MINMAX: Maybe this column has business-determined validity range",
+                "RULE": "MINMAX",
+                "RANGE": {"min": range_min, "max": range_max},
+                "TOLERATED_VIOLATION_SHARE": tolerated_share,
             }
             if self.add_adf_framework_template_flag:
-                self.minmax["MERGE_INTO_ADF_FRM"] = f"""SELECT
-                                    <DS><DL>7<NUM> as DQ_RULE_ID,
-                                    (SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = '<DS>') AS DATASOURCE_ID,
-                                    NULL DQ_ACTION_ID,
-                                    NULL DQ_RULE_DESC,
-                                    'VALIDITY' AS META_DQ_DIMENSION,
-                                    'MINMAX' AS META_RULE_TYPE,
-                                    'REGRESSION,INTEGRATION' AS META_SUITES,
-                                    'EXTENDED' AS META_RULE_LEVEL,
-                                    '{self.related_table}' AS PARAM_TABLE_NAME,
-                                    '{self.related_column}' AS PARAM_TABLE_COLUMN,
-                                    {self.base_info.get("min")} AS PARAM_MIN,
-                                    {self.base_info.get("max")} AS PARAM_MAX,
-                                    NULL PARAM_REGEXP,
-                                    NULL PARAM_S2T_VIEW,
-                                    NULL PARAM_DEFAULT,
-                                    TRUE IS_ACTIVE"""
+                adf_rule = build_adf_rule(7, "VALIDITY", "MINMAX", "REGRESSION,INTEGRATION",
+                                          self.related_table, self.related_column,
+                                          param_min=range_min,
+                                          param_max=range_max)
+                self.minmax["ADF_RULE"] = adf_rule
+                self.minmax["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
         return self
 
+    def has_exact_distinct_counts(self) -> bool:
+        # Estimated or merged distinct counts may hide values, list and naming rules need exact ones
+        return not {"uniq", "uniq_upper"} & set(self.base_info.get("approximate") or [])
+
     def identify_determined_list(self, list_size_threshold: int = 10, **kwargs):
-        if not self.base_info.get("uniq"):
+        if not self.base_info.get("uniq") or not self.has_exact_distinct_counts():
             return self
 
         if 0 < self.base_info.get("uniq") < list_size_threshold:
             self.determined_list = {
                     "DESCRIPTION": "DETERMINED LIST: Maybe column should contain values only from determined list",
+                    "RULE": "DETERMINED_LIST",
                 }
+            determined_list_regexp = "^<VAL1>|<VAL2>|<VAL3>$"
+            if self.base_info.get("value_set"):
+                values = [entry["value"] for entry in self.base_info.get("value_set")]
+                determined_list_regexp = "^(" + "|".join(re.escape(value) for value in values) + ")$"
+                self.determined_list["VALUES"] = values
+                self.determined_list["REGEXP"] = determined_list_regexp
             if self.add_adf_framework_template_flag:
-                self.determined_list["MERGE_INTO_ADF_FRM"] = f"""SELECT
-                                        <DS><DL>8<NUM> as DQ_RULE_ID,
-                                        (SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = '<DS>') AS DATASOURCE_ID,
-                                        NULL DQ_ACTION_ID,
-                                        NULL DQ_RULE_DESC,
-                                        'VALIDITY' AS META_DQ_DIMENSION,
-                                        'REGEXP' AS META_RULE_TYPE,
-                                        'INTEGRATION,EXTENDED' AS META_SUITES,
-                                        'EXTENDED' AS META_RULE_LEVEL,
-                                        '{self.related_table}' AS PARAM_TABLE_NAME,
-                                        '{self.related_column}' AS PARAM_TABLE_COLUMN,
-                                        NULL PARAM_MIN,
-                                        NULL PARAM_MAX,
-                                        '^<VAL1>|<VAL2>|<VAL3>$' PARAM_REGEXP,
-                                        NULL PARAM_S2T_VIEW,
-                                        NULL PARAM_DEFAULT,
-                                        TRUE IS_ACTIVE"""
+                adf_rule = build_adf_rule(8, "VALIDITY", "REGEXP", "INTEGRATION,EXTENDED",
+                                          self.related_table, self.related_column,
+                                          param_regexp=determined_list_regexp)
+                self.determined_list["ADF_RULE"] = adf_rule
+                self.determined_list["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
         return self
 
     def identify_inconsistent_names(self, **kwargs):
-        if not self.base_info.get("uniq_upper") or not self.base_info.get("uniq"):
+        if not self.base_info.get("uniq_upper") or not self.base_info.get("uniq") or not self.has_exact_distinct_counts():
             return self
 
         if self.base_info.get("uniq_upper") != self.base_info.get("uniq"):
             self.inconsistent_names = {
                     "DESCRIPTION": "INCONSISTENT NAMES: Maybe some unique values have same meaning and should be uppercased",
+                    "RULE": "INCONSISTENT_NAMES",
                 }
             if self.add_adf_framework_template_flag:
-                self.inconsistent_names["MERGE_INTO_ADF_FRM"] = f"""SELECT
-                                        <DL>8<NUM> + 100000*(SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = <DS>) as DQ_RULE_ID,
-                                        (SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = <DS>) AS DATASOURCE_ID,
-                                        NULL DQ_ACTION_ID,
-                                        NULL DQ_RULE_DESC,
-                                        'CONSISTENCY' AS META_DQ_DIMENSION,
-                                        'DEFAULT' AS META_RULE_TYPE,
-                                        'REGRESSION,INTEGRATION' AS META_SUITES,
-                                        'EXTENDED' AS META_RULE_LEVEL,
-                                        '{self.related_table}' AS PARAM_TABLE_NAME,
-                                        '{self.related_column}' AS PARAM_TABLE_COLUMN,
-                                        NULL PARAM_MIN,
-                                        NULL PARAM_MAX,
-                                        NULL PARAM_REGEXP,
-                                        NULL PARAM_S2T_VIEW,
-                                        'select iff(count(upper({self.related_column})) <> COUNT({self.related_column}), 1, 0) from
-                                                (SELECT DATASOURCE_RELATED_SCHEMA FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = <DS>)
-                                                .{self.related_table}' AS PARAM_DEFAULT,
-                                        TRUE IS_ACTIVE"""
+                adf_rule = build_adf_rule(8, "CONSISTENCY", "DEFAULT", "REGRESSION,INTEGRATION",
+                                          self.related_table, self.related_column,
+                                          param_default=f"""select iff(count(distinct upper({self.related_column})) <> count(distinct {self.related_column}), 1, 0) from
+                                                (SELECT DATASOURCE_RELATED_SCHEMA FROM {ADF_DATASOURCES_TABLE} WHERE DATASOURCE_DESC = '<DS>')
+                                                .{self.related_table}""")
+                self.inconsistent_names["ADF_RULE"] = adf_rule
+                self.inconsistent_names["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
         return self
 
     def identify_dates_in_future(self, **kwargs):
@@ -173,27 +166,16 @@ class ConstraintIdentifier:
            or cast_to_datetime(self.base_info.get("min")) > datetime.now().replace(tzinfo=UTC):
             self.future_dates = {
                 "DESCRIPTION": "FUTURE DATES: Maybe this column should not contain dates from the future",
+                "RULE": "FUTURE_DATES",
             }
             if self.add_adf_framework_template_flag:
-                self.future_dates["MERGE_INTO_ADF_FRM"] = f"""SELECT
-                                    <DS><DL>8<NUM> as DQ_RULE_ID,
-                                    (SELECT DATASOURCE_ID FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = '<DS>') AS DATASOURCE_ID,
-                                    NULL DQ_ACTION_ID,
-                                    NULL DQ_RULE_DESC,
-                                    'VALIDITY' AS META_DQ_DIMENSION,
-                                    'DEFAULT' AS META_RULE_TYPE,
-                                    'REGRESSION,INTEGRATION' AS META_SUITES,
-                                    'EXTENDED' AS META_RULE_LEVEL,
-                                    '{self.related_table}' AS PARAM_TABLE_NAME,
-                                    '{self.related_column}' AS PARAM_TABLE_COLUMN,
-                                    NULL PARAM_MIN,
-                                    NULL PARAM_MAX,
-                                    NULL PARAM_REGEXP,
-                                    NULL PARAM_S2T_VIEW,
-                                    'select iff(count({self.related_column}) > 0), 1, 0) from
-                                            (SELECT DATASOURCE_RELATED_SCHEMA FROM UKI_STG_MTD.DATASOURCES WHERE DATASOURCE_DESC = <DS>)
-                                    .{self.related_table} WHERE {self.related_column} > getdate()' AS PARAM_DEFAULT,
-                                    TRUE IS_ACTIVE"""
+                adf_rule = build_adf_rule(8, "VALIDITY", "DEFAULT", "REGRESSION,INTEGRATION",
+                                          self.related_table, self.related_column,
+                                          param_default=f"""select iff(count({self.related_column}) > 0, 1, 0) from
+                                            (SELECT DATASOURCE_RELATED_SCHEMA FROM {ADF_DATASOURCES_TABLE} WHERE DATASOURCE_DESC = '<DS>')
+                                    .{self.related_table} WHERE {self.related_column} > getdate()""")
+                self.future_dates["ADF_RULE"] = adf_rule
+                self.future_dates["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
         return self
 
     def identify_foreign_key(self, **kwargs):
@@ -207,9 +189,63 @@ class ConstraintIdentifier:
            == round(self.base_info.get("top_share"), 3):
             self.foreign_key = {
                 "DESCRIPTION": "POSSIBLE FOREIGN KEY: Maybe this column is a foreign key and it is worth to check for CONSISTENCY",
+                "RULE": "FOREIGN_KEYS",
             }
         return self
 
+    def identify_text_pattern(self, pattern_share_threshold: float = 0.99, **kwargs):
+        if not self.base_info.get("text_shape"):
+            return self
+
+        text_shape = self.base_info.get("text_shape")
+        matched_patterns = [pattern for pattern in TEXT_PATTERNS
+                            if text_shape.get(f"{pattern}_share", 0) >= pattern_share_threshold]
+        if not matched_patterns:
+            return self
+
+        # Embedded types are checked first since they are more specific than generic codes
+        pattern = sorted(matched_patterns, key=lambda x: x not in EMBEDDED_TYPES)[0]
+        self.text_pattern = {
+            "DESCRIPTION": f"PATTERN: Maybe values of this column should match '{pattern}' pattern",
+            "RULE": "PATTERN",
+            "PATTERN": TEXT_PATTERNS[pattern],
+            "TOLERATED_VIOLATION_SHARE": round(1 - pattern_share_threshold, 6),
+        }
+        if text_shape.get("inferred_type") and text_shape.get("inferred_type") != ColumnType.TEXT.value:
+            self.text_pattern["DESCRIPTION"] += f", values look like {text_shape.get('inferred_type')} " \
+                                                f"and column could be stored with such type"
+        if self.add_adf_framework_template_flag:
+            adf_rule = build_adf_rule(8, "VALIDITY", "REGEXP", "INTEGRATION,EXTENDED",
+                                      self.related_table, self.related_column,
+                                      param_regexp=TEXT_PATTERNS[pattern])
+            self.text_pattern["ADF_RULE"] = adf_rule
+            self.text_pattern["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
+        return self
+
+
+def identify_unique_keys(key_candidates: list[dict],
+                         related_table: str,
+                         add_adf_framework_template: bool = False) -> list[dict]:
+    unique_keys = []
+    for key in key_candidates:
+        key_columns = ", ".join(key["COLUMNS"])
+        unique_key = {
+            "DESCRIPTION": f"UNIQUENESS: Maybe ({key_columns}) is a unique key of the table "
+                           f"and duplicates of it should be reported",
+            "RULE": "UNIQUENESS",
+            "COLUMNS": key["COLUMNS"],
+        }
+        if add_adf_framework_template:
+            adf_rule = build_adf_rule(8, "UNIQUENESS", "DEFAULT", "REGRESSION,INTEGRATION",
+                                      related_table, key_columns,
+                                      param_default=f"""select iff(count(*) > 0, 1, 0) from (select 1 from
+                                            (SELECT DATASOURCE_RELATED_SCHEMA FROM {ADF_DATASOURCES_TABLE} WHERE DATASOURCE_DESC = '<DS>')
+                                    .{related_table} group by {key_columns} having count(*) > 1)""")
+            unique_key["ADF_RULE"] = adf_rule
+            unique_key["MERGE_INTO_ADF_FRM"] = render_adf_rule_select(adf_rule)
+        unique_keys.append(unique_key)
+    return unique_keys
+
 
 class ConstraintIdentifierBuilder:
     def __init__(self,
@@ -229,6 +265,7 @@ class ConstraintIdentifierBuilder:
             "INCONSISTENT_NAMES": ConstraintIdentifier.identify_inconsistent_names,
             "FUTURE_DATES": ConstraintIdentifier.identify_dates_in_future,
             "FOREIGN_KEYS": ConstraintIdentifier.identify_foreign_key,
+            "PATTERN": ConstraintIdentifier.identify_text_pattern,
         }
         self.identification_rules = constraint_identification_rules
 
@@ -0,0 +1,133 @@
+import math
+
+import dateutil.parser
+
+from utils.history_store import ProfileHistoryStore
+from helpers.run_trace import get_table_key
+from helpers.object_types import ColumnType
+
+
+class DriftDetector:
+    QUANTILE_LEVELS = [("min", 0.0), ("perc25", 0.25), ("median", 0.5), ("perc75", 0.75), ("max", 1.0)]
+    # Floor for empty bins, keeps PSI finite
+    PSI_EPSILON = 0.0001
+
+    def __init__(self,
+                 null_share_threshold: float = 0.05,
+                 uniq_change_threshold: float = 0.2,
+                 top_share_threshold: float = 0.1,
+                 psi_threshold: float = 0.2,
+                 ks_threshold: float = 0.1):
+        self.null_share_threshold = null_share_threshold
+        self.uniq_change_threshold = uniq_change_threshold
+        self.top_share_threshold = top_share_threshold
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+
+    def detect(self, profiling_results: list[dict], history_store: ProfileHistoryStore) -> dict[str, dict]:
+        drift_by_table = {}
+        for table in profiling_results:
+            if table.get("ERROR") or not table.get("TABLE_PROFILING_INFO"):
+                continue
+            previous_stats = history_store.get_table_latest_stats(get_table_key(table))
+            if previous_stats:
+                drift_by_table[get_table_key(table)] = self.compare_table(table, previous_stats)
+        return drift_by_table
+
+    def compare_table(self, table: dict, previous_stats: dict[str, dict]) -> dict:
+        table_drift = {
+            "DRIFTED_COLUMNS": {},
+            "STABLE_COLUMNS": [],
+            "NEW_COLUMNS": [],
+            "DROPPED_COLUMNS": [col_name for col_name in previous_stats
+                                if col_name not in table["TABLE_PROFILING_INFO"]["COLUMNS"]],
+        }
+        for col_name, col_stat in table["TABLE_PROFILING_INFO"]["COLUMNS"].items():
+            if col_name not in previous_stats:
+                table_drift["NEW_COLUMNS"].append(col_name)
+                continue
+            column_drift = self.compare_column(col_stat, previous_stats[col_name]["stats"])
+            if column_drift["REASONS"]:
+                table_drift["DRIFTED_COLUMNS"][col_name] = {
+                    **column_drift,
+                    "PREVIOUS_RUN_ID": previous_stats[col_name]["run_id"],
+                }
+            else:
+                table_drift["STABLE_COLUMNS"].append(col_name)
+        return table_drift
+
+    def compare_column(self, current: dict, previous: dict) -> dict:
+        metrics, reasons = {}, []
+        if current.get("ERROR") or previous.get("ERROR"):
+            return {"METRICS": metrics, "REASONS": reasons}
+
+        if current.get("col_type") != previous.get("col_type"):
+            reasons.append(f'TYPE_CHANGE: {previous.get("col_type")} -> {current.get("col_type")}')
+
+        metrics["null_share_delta"] = (1 - current.get("share", 0)) - (1 - previous.get("share", 0))
+        if abs(metrics["null_share_delta"]) > self.null_share_threshold:
+            reasons.append("NULL_SHARE")
+
+        if previous.get("uniq"):
+            metrics["uniq_change"] = (current.get("uniq", 0) - previous["uniq"]) / previous["uniq"]
+            if abs(metrics["uniq_change"]) > self.uniq_change_threshold:
+                reasons.append("DISTINCT_COUNT")
+
+        metrics["top_value_changed"] = current.get("top_value") != previous.get("top_value")
+        metrics["top_share_delta"] = current.get("top_share", 0) - previous.get("top_share", 0)
+        if abs(metrics["top_share_delta"]) > self.top_share_threshold:
+            reasons.append("TOP_VALUE_SHARE")
+
+        if current.get("col_type") in [ColumnType.NUMERIC.value, ColumnType.TIMESTAMP.value] \
+           and current.get("col_type") == previous.get("col_type"):
+            current_quantiles = self.get_quantiles(current)
+            previous_quantiles = self.get_quantiles(previous)
+            if current_quantiles and previous_quantiles:
+                metrics["psi"] = self.calc_psi(current_quantiles, previous_quantiles)
+                metrics["ks"] = self.calc_ks(current_quantiles, previous_quantiles)
+                if metrics["psi"] > self.psi_threshold:
+                    reasons.append("PSI")
+                if metrics["ks"] > self.ks_threshold:
+                    reasons.append("KS")
+
+        return {"METRICS": metrics, "REASONS": reasons}
+
+    def get_quantiles(self, col_stat: dict) -> list[tuple[float, float]] | None:
+        # Quantile summary as (value, cumulative share) knots of a piecewise-linear CDF
+        quantiles = []
+        for stat_name, level in self.QUANTILE_LEVELS:
+            value = col_stat.get(stat_name)
+            if value is None or value == "None":
+                return None
+            if col_stat.get("col_type") == ColumnType.TIMESTAMP.value:
+                value = dateutil.parser.parse(str(value)).timestamp()
+            quantiles.append((float(value), level))
+        return quantiles
+
+    @staticmethod
+    def cdf(quantiles: list[tuple[float, float]], x: float) -> float:
+        if x < quantiles[0][0]:
+            return 0.0
+        if x >= quantiles[-1][0]:
+            return 1.0
+        for (x_left, cdf_left), (x_right, cdf_right) in zip(quantiles, quantiles[1:]):
+            if x_left <= x < x_right:
+                return cdf_left + (cdf_right - cdf_left) * (x - x_left) / (x_right - x_left)
+        return 1.0
+
+    def calc_psi(self, current: list[tuple[float, float]], previous: list[tuple[float, float]]) -> float:
+        # Bins are the quartile ranges of the previous run, so each holds a quarter of the previous values
+        bin_edges = [value for value, _ in previous[1:-1]]
+        current_cdf = [0.0] + [self.cdf(current, edge) for edge in bin_edges] + [1.0]
+        previous_cdf = [0.0] + [level for _, level in previous[1:-1]] + [1.0]
+
+        psi = 0.0
+        for bin_num in range(len(current_cdf) - 1):
+            actual = max(current_cdf[bin_num + 1] - current_cdf[bin_num], self.PSI_EPSILON)
+            expected = max(previous_cdf[bin_num + 1] - previous_cdf[bin_num], self.PSI_EPSILON)
+            psi += (actual - expected) * math.log(actual / expected)
+        return psi
+
+    def calc_ks(self, current: list[tuple[float, float]], previous: list[tuple[float, float]]) -> float:
+        knots = [value for value, _ in current] + [value for value, _ in previous]
+        return max(abs(self.cdf(current, knot) - self.cdf(previous, knot)) for knot in knots)
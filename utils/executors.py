@@ -1,11 +1,18 @@
 from abc import abstractmethod
+import asyncio
+import math
+import time
+import uuid
 import pandas as pd
 import sqlalchemy.exc
+import snowflake.connector.errors
 from snowflake.sqlalchemy import URL
 from sqlalchemy.engine import create_engine
 from pyspark.sql import SparkSession, DataFrame
+from pyspark.sql.types import StructType, StructField, StringType
 
 from helpers.exceptions import UndefinedDataFrameError
+from helpers.query_limits import QUERY_TIMEOUT_ERROR, QueryTimeLimit, current_time_limit
 
 
 class Singleton(type):
@@ -24,18 +31,67 @@ class Executor(metaclass=Singleton):
 
 
 class SnowflakeExecutor(Executor):
+    # "SQL execution canceled", returned for queries cancelled by the connector timeout
+    QUERY_CANCELLED_ERRNO = 604
+    # Timed out network calls and cancellations surface as these errors, depending on where the query was stopped
+    QUERY_TIMEOUT_ERRORS = (snowflake.connector.errors.OperationalError,
+                            snowflake.connector.errors.GatewayTimeoutError,
+                            snowflake.connector.errors.RequestTimeoutError)
+
     def __init__(self, snf_config: dict):
         self.engine = create_engine(URL(**snf_config))
         self.spark_session = SparkSession.builder.getOrCreate()
+        # Query results are transferred from pandas to Spark with Arrow instead of row by row pickling
+        self.spark_session.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
 
     async def execute_select(self, sql: str, **kwargs) -> DataFrame:
-        try:
-            df = pd.read_sql_query(sql, self.engine)
-        except sqlalchemy.exc.ProgrammingError as e:
-            df = pd.DataFrame([{'error': e.args[0], 'statement': e.statement}])
+        time_limit = current_time_limit.get()
+        if time_limit is None or time_limit.get_timeout() is None:
+            df = self.read_sql(sql)
+        else:
+            df = await self.read_sql_with_timeout(sql, time_limit)
+        if df.empty:
+            # Schema can not be inferred from an empty result, its columns are kept as strings
+            return self.spark_session.createDataFrame([], StructType([StructField(col, StringType())
+                                                                      for col in df.columns]))
         df = self.spark_session.createDataFrame(df)
         return df
 
+    def read_sql(self, sql: str) -> pd.DataFrame:
+        try:
+            return pd.read_sql_query(sql, self.engine)
+        except sqlalchemy.exc.ProgrammingError as e:
+            return pd.DataFrame([{'error': e.args[0], 'statement': e.statement}])
+
+    async def read_sql_with_timeout(self, sql: str, time_limit: QueryTimeLimit) -> pd.DataFrame:
+        # The connector cancels queries running over the timeout in Snowflake itself, so no status polling
+        # delays short queries. The query waits in a thread to keep the event loop of the slot free
+        timeout = time_limit.get_timeout()
+        if timeout <= 0:
+            time_limit.timed_out = True
+            return pd.DataFrame([{'error': QUERY_TIMEOUT_ERROR, 'statement': sql}])
+        return await asyncio.to_thread(self.read_sql_cancelled_after, sql, timeout, time_limit)
+
+    def read_sql_cancelled_after(self, sql: str, timeout: float, time_limit: QueryTimeLimit) -> pd.DataFrame:
+        connection = self.engine.raw_connection()
+        started_ts = time.time()
+        try:
+            cursor = connection.connection.cursor()
+            # Timeout of the connector is in whole seconds
+            cursor.execute(sql, timeout=max(1, math.ceil(timeout)))
+            # Unquoted identifiers come back uppercased, they are lowercased the same way SQLAlchemy does
+            columns = [col[0].lower() if col[0].upper() == col[0] else col[0] for col in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+        except snowflake.connector.errors.Error as e:
+            # Cancelled queries may also fail with a generic error, running over the limit tells them apart
+            if isinstance(e, self.QUERY_TIMEOUT_ERRORS) or e.errno == self.QUERY_CANCELLED_ERRNO \
+                    or time.time() - started_ts >= timeout:
+                time_limit.timed_out = True
+                return pd.DataFrame([{'error': QUERY_TIMEOUT_ERROR, 'statement': sql}])
+            return pd.DataFrame([{'error': e.msg, 'statement': sql}])
+        finally:
+            connection.close()
+
     def shutdown(self):
         self.engine.dispose()
 
@@ -48,9 +104,39 @@ class SparkExecutor(Executor):
         try:
             df_table = kwargs["df_table"]
             df_table.createOrReplaceTempView(df_table.name)
-            df = self.spark_session.sql(sql)
+            # Queried within the session of the table, where its view and execution settings live
+            df = df_table.sparkSession.sql(sql)
         except KeyError:
             raise UndefinedDataFrameError
         except Exception as e:
-            df = self.spark_session.createDataFrame([(e, sql)])
-        return df
+            return self.spark_session.createDataFrame([(e, sql)])
+
+        time_limit = current_time_limit.get()
+        if time_limit is None or time_limit.get_timeout() is None:
+            return df
+        return await self.collect_with_timeout(df, sql, time_limit)
+
+    async def collect_with_timeout(self, df: DataFrame, sql: str, time_limit: QueryTimeLimit) -> DataFrame:
+        # Profiling results are small, so they are collected eagerly under a job group,
+        # which is cancelled together with its running jobs when the limit is exceeded
+        timeout = time_limit.get_timeout()
+        if timeout <= 0:
+            time_limit.timed_out = True
+            return self.spark_session.createDataFrame([(QUERY_TIMEOUT_ERROR, sql)])
+
+        spark_context = df.sparkSession.sparkContext
+        job_group = f"profiling-{uuid.uuid4().hex}"
+
+        def collect():
+            spark_context.setJobGroup(job_group, sql[:100], interruptOnCancel=True)
+            return df.collect()
+
+        try:
+            rows = await asyncio.wait_for(asyncio.to_thread(collect), timeout)
+        except asyncio.TimeoutError:
+            spark_context.cancelJobGroup(job_group)
+            time_limit.timed_out = True
+            return self.spark_session.createDataFrame([(QUERY_TIMEOUT_ERROR, sql)])
+        except Exception as e:
+            return self.spark_session.createDataFrame([(str(e), sql)])
+        return df.sparkSession.createDataFrame(rows, df.schema)
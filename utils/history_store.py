@@ -0,0 +1,147 @@
+from datetime import datetime
+from urllib.parse import quote
+import hashlib
+import json
+import numbers
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from helpers.result_model import ProfilingResultEncoder
+from helpers.run_trace import get_table_key
+
+
+class ProfileHistoryStore:
+    HISTORY_SCHEMA = pa.schema([
+        ("run_id", pa.string()),
+        ("run_ts", pa.string()),
+        ("table_key", pa.string()),
+        ("table_name", pa.string()),
+        ("column_name", pa.string()),
+        ("table_count", pa.int64()),
+        ("col_type", pa.string()),
+        ("count", pa.int64()),
+        ("share", pa.float64()),
+        ("uniq", pa.int64()),
+        ("top_value", pa.string()),
+        ("top_freq", pa.int64()),
+        ("top_share", pa.float64()),
+        ("stats_json", pa.string()),
+    ])
+
+    def __init__(self, root_path: str = 'profiling_history'):
+        self.root_path = root_path
+        self.index_path = os.path.join(root_path, 'index.json')
+        self._index = None
+
+    @property
+    def index(self) -> dict:
+        # {table_key: [{"run_id": ..., "run_ts": ..., "file": ...}, ...]}, runs in append order.
+        # Columns of a run share its file, so the index grows by one entry per table and run
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+            else:
+                self._index = {}
+        return self._index
+
+    def append_run(self, profiling_results: list[dict], run_ts: datetime = None) -> str:
+        run_ts = run_ts if run_ts else datetime.now()
+        run_id = f'{run_ts.strftime("%Y%m%dT%H%M%S")}_{uuid.uuid4().hex[:8]}'
+
+        for table in profiling_results:
+            if table.get("ERROR") or not table.get("TABLE_PROFILING_INFO"):
+                continue
+            rows = [self.build_history_row(run_id, run_ts, table, col_name, col_stat)
+                    for col_name, col_stat in table["TABLE_PROFILING_INFO"].get("COLUMNS", {}).items()]
+            if not rows:
+                continue
+
+            # Tables of different schemas or slices of one table may share a name,
+            # so files and index entries are told apart by the table key
+            partition_dir = os.path.join(self.root_path,
+                                         'data',
+                                         f'run_date={run_ts.strftime("%Y-%m-%d")}',
+                                         f'table_name={quote(table["TABLE_NAME"], safe="")}')
+            os.makedirs(partition_dir, exist_ok=True)
+            table_key_hash = hashlib.sha1(get_table_key(table).encode()).hexdigest()[:8]
+            file_path = os.path.join(partition_dir, f'part-{run_id}-{table_key_hash}.parquet')
+            pq.write_table(pa.Table.from_pylist(rows, schema=self.HISTORY_SCHEMA), file_path)
+
+            self.index.setdefault(get_table_key(table), []).append({
+                "run_id": run_id,
+                "run_ts": run_ts.isoformat(),
+                "file": os.path.relpath(file_path, self.root_path),
+            })
+
+        self.__write_index()
+        return run_id
+
+    @staticmethod
+    def build_history_row(run_id: str, run_ts: datetime, table: dict, col_name: str, col_stat: dict) -> dict:
+        def to_int(value) -> int | None:
+            return int(value) if isinstance(value, numbers.Number) else None
+
+        def to_float(value) -> float | None:
+            return float(value) if isinstance(value, numbers.Number) else None
+
+        return {
+            "run_id": run_id,
+            "run_ts": run_ts.isoformat(),
+            "table_key": get_table_key(table),
+            "table_name": table["TABLE_NAME"],
+            "column_name": col_name,
+            "table_count": to_int(table["TABLE_PROFILING_INFO"].get("TABLE_COUNT")),
+            "col_type": col_stat.get("col_type"),
+            "count": to_int(col_stat.get("count")),
+            "share": to_float(col_stat.get("share")),
+            "uniq": to_int(col_stat.get("uniq")),
+            "top_value": None if col_stat.get("top_value") is None else str(col_stat.get("top_value")),
+            "top_freq": to_int(col_stat.get("top_freq")),
+            "top_share": to_float(col_stat.get("top_share")),
+            "stats_json": json.dumps(col_stat, cls=ProfilingResultEncoder),
+        }
+
+    def __write_index(self):
+        os.makedirs(self.root_path, exist_ok=True)
+        tmp_index_path = f'{self.index_path}.tmp'
+        with open(tmp_index_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_index_path, self.index_path)
+
+    def __read_stats(self, run_entry: dict, column_names: list[str] = None) -> dict[str, dict]:
+        rows = pq.read_table(os.path.join(self.root_path, run_entry["file"]),
+                             columns=["run_id", "run_ts", "column_name", "stats_json"],
+                             filters=[("column_name", "in", column_names)] if column_names else None).to_pylist()
+        return {row["column_name"]: {
+            "run_id": row["run_id"],
+            "run_ts": row["run_ts"],
+            "stats": json.loads(row["stats_json"]),
+        } for row in rows}
+
+    def get_runs(self, table_key: str, before_run_id: str = None, since: datetime = None) -> list[dict]:
+        runs = self.index.get(table_key, [])
+        if before_run_id:
+            runs = [run for run in runs if run["run_id"] < before_run_id]
+        if since:
+            runs = [run for run in runs if run["run_ts"] >= since.isoformat()]
+        return runs
+
+    def get_latest_stats(self, table_key: str, column_name: str, before_run_id: str = None) -> dict | None:
+        for run in reversed(self.get_runs(table_key, before_run_id)):
+            stats = self.__read_stats(run, [column_name]).get(column_name)
+            if stats:
+                return stats
+        return None
+
+    def get_column_history(self, table_key: str, column_name: str, since: datetime = None) -> list[dict]:
+        return [stats for stats in [self.__read_stats(run, [column_name]).get(column_name)
+                                    for run in self.get_runs(table_key, since=since)] if stats]
+
+    def get_table_latest_stats(self, table_key: str, before_run_id: str = None) -> dict[str, dict]:
+        # Columns missing from the latest run of the table are reported as dropped, so only that run is read
+        runs = self.get_runs(table_key, before_run_id)
+        return self.__read_stats(runs[-1]) if runs else {}
@@ -0,0 +1,93 @@
+from itertools import combinations
+import math
+
+from utils.executors import Executor
+from helpers.db_objects import TableColumnsCombinations
+
+
+class KeyDiscovery:
+    # HLL estimates have a few percent of relative error, combinations above this share are verified exactly
+    SKETCH_UNIQUE_SHARE = 0.95
+
+    def __init__(self,
+                 max_key_size: int = 3,
+                 max_combinations_per_level: int = 50,
+                 max_keys_to_verify: int = 5):
+        self.max_key_size = max_key_size
+        self.max_combinations_per_level = max_combinations_per_level
+        self.max_keys_to_verify = max_keys_to_verify
+
+    def is_sketch_unique(self, approx_uniq: int, table_count: int) -> bool:
+        return approx_uniq >= self.SKETCH_UNIQUE_SHARE * table_count
+
+    @staticmethod
+    def get_columns_uniq(columns_stat: dict[str, dict]) -> dict[str, int]:
+        # Columns without values can not be a part of a key, nested paths do not have a row per table row
+        return {col_name: max(col_stat.get("uniq", 0), col_stat.get("approx_uniq", 0))
+                for col_name, col_stat in columns_stat.items()
+                if not col_stat.get("ERROR") and not col_stat.get("nested") and col_stat.get("count")}
+
+    def build_next_level(self,
+                         non_unique: set[tuple[str, ...]],
+                         unique: list[tuple[str, ...]]) -> list[tuple[str, ...]]:
+        # Apriori-style join: a combination is built only when all its subsets one column smaller
+        # are known to be non-unique, so every key found is minimal
+        level = set()
+        for left, right in combinations(sorted(non_unique), 2):
+            if left[:-1] != right[:-1]:
+                continue
+            candidate = left + right[-1:]
+            if any(subset not in non_unique for subset in combinations(candidate, len(candidate) - 1)):
+                continue
+            if any(set(key) <= set(candidate) for key in unique):
+                continue
+            level.add(candidate)
+        return sorted(level)
+
+    async def discover(self,
+                       table_count: int,
+                       columns_stat: dict[str, dict],
+                       columns_combinations: TableColumnsCombinations,
+                       executor: Executor) -> list[dict]:
+        if not table_count:
+            return []
+        columns_uniq = self.get_columns_uniq(columns_stat)
+
+        # Single columns are estimated from the column stats without an extra scan
+        estimates = {(col_name,): uniq for col_name, uniq in columns_uniq.items()}
+        unique = [combination for combination, uniq in estimates.items() if self.is_sketch_unique(uniq, table_count)]
+        non_unique = {combination for combination in estimates if combination not in unique}
+
+        for _ in range(2, self.max_key_size + 1):
+            level = self.build_next_level(non_unique, unique)
+            # A combination can not have more distinct values than the product of distinct values of its columns,
+            # such combinations are known to be non-unique without a scan
+            upper_bounds = {combination: math.prod(columns_uniq[col] for col in combination) for combination in level}
+            non_unique = {combination for combination in level
+                          if not self.is_sketch_unique(upper_bounds[combination], table_count)}
+            # Combinations of the most selective columns are the most promising ones
+            to_estimate = sorted([combination for combination in level if combination not in non_unique],
+                                 key=lambda x: -upper_bounds[x])[:self.max_combinations_per_level]
+            if not to_estimate:
+                if not non_unique:
+                    break
+                continue
+
+            level_estimates = await columns_combinations.estimate_distinct_counts(executor, to_estimate)
+            if level_estimates is None:
+                break
+            estimates.update(level_estimates)
+            unique += [combination for combination, uniq in level_estimates.items()
+                       if self.is_sketch_unique(uniq, table_count)]
+            non_unique |= {combination for combination in level_estimates if combination not in unique}
+
+        # Smaller keys with the highest estimates go first, only they are checked with an exact GROUP BY
+        key_candidates = []
+        for combination in sorted(unique, key=lambda x: (len(x), -estimates[x]))[:self.max_keys_to_verify]:
+            duplicated_keys = await columns_combinations.count_duplicated_keys(executor, combination)
+            if duplicated_keys == 0:
+                key_candidates.append({
+                    "COLUMNS": list(combination),
+                    "APPROX_UNIQ": estimates[combination],
+                })
+        return key_candidates
@@ -1,19 +1,46 @@
 from abc import abstractmethod
+from functools import reduce
+from urllib.parse import unquote
+from typing import Callable
 import asyncio
+import time
 
-from pyspark.sql import DataFrame, types
+from pyspark.sql import DataFrame, SparkSession, types, functions as F
 
 from config.snf_config import SNF_CONFIG
 from utils.executors import SnowflakeExecutor, SparkExecutor
+from utils.column_batching import ColumnBatchPlanner
+from utils.key_discovery import KeyDiscovery
 from helpers.object_types import TableType, ColumnType
-from helpers.db_objects import SNFTable, SNFTableColumn, TableColumn
-from helpers.exceptions import IncorrectConfigError, UnexpectedTableType
+from helpers.db_objects import SNFTable, SNFTableColumn, SNFTableColumnsBatch, SNFArrayElementsBatch, \
+    SNFTableColumnsCombinations, TableColumn, TableColumnsBatch, TableColumnsCombinations, TableRulesCheck, \
+    SAMPLE_SEED, build_failed_column_stat, build_filter_predicate
+from helpers.exceptions import IncorrectConfigError, UnexpectedTableType, UnsupportedFileFormatError
+from helpers.file_formats import detect_file_format, is_data_file
+from helpers.nested_columns import NESTED_DATA_TYPES, expand_nested_columns
+from helpers.spark_tuning import build_spark_execution_profile, build_table_session
+from helpers.profile_merging import merge_partition_profiles
+from helpers.query_limits import EXACT_STRATEGY, QueryTimeLimit, current_time_limit, run_with_degradation
 
 
 class Profiler:
-    def __init__(self, table_config: list[dict], executor: SnowflakeExecutor | SparkExecutor = None):
+    def __init__(self,
+                 table_config: list[dict],
+                 executor: SnowflakeExecutor | SparkExecutor = None,
+                 column_batch_planner: ColumnBatchPlanner = None,
+                 value_set_limit: int = 0,
+                 key_discovery: KeyDiscovery = None,
+                 query_timeout_sec: float = None,
+                 table_timeout_sec: float = None,
+                 degraded_sample_percent: float = 1):
         self.executor = executor
         self._table_config = table_config
+        self.column_batch_planner = column_batch_planner
+        self.value_set_limit = value_set_limit
+        self.key_discovery = key_discovery
+        self.query_timeout_sec = query_timeout_sec
+        self.table_timeout_sec = table_timeout_sec
+        self.degraded_sample_percent = degraded_sample_percent
         self.supported_datasource_type = "DEFAULT"
 
     @property
@@ -23,34 +50,130 @@ class Profiler:
     @table_config.setter
     def table_config(self, table_config: list[dict]):
         self.__init__(table_config=table_config,
-                      executor=self.executor)
+                      executor=self.executor,
+                      column_batch_planner=self.column_batch_planner,
+                      value_set_limit=self.value_set_limit,
+                      key_discovery=self.key_discovery,
+                      query_timeout_sec=self.query_timeout_sec,
+                      table_timeout_sec=self.table_timeout_sec,
+                      degraded_sample_percent=self.degraded_sample_percent)
 
     @abstractmethod
     def get_tables_descriptions(self):
         raise NotImplementedError
 
+    @abstractmethod
+    def describe_table_config(self, table_info: dict, sample_percent: float = None, table_size: dict = None):
+        # table_size is the estimate of estimate_table_size when the caller already has it
+        raise NotImplementedError
+
+    @abstractmethod
+    def estimate_table_size(self, table_info: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def build_rules_check(self, table_info: dict) -> TableRulesCheck:
+        raise NotImplementedError
+
+    def build_time_limit(self) -> QueryTimeLimit:
+        # Every query of a table is limited by the query timeout and by the deadline of the whole table
+        return QueryTimeLimit(self.query_timeout_sec,
+                              time.time() + self.table_timeout_sec if self.table_timeout_sec else None)
+
+    async def collect_column_stat(self,
+                                  column: TableColumn,
+                                  build_batch: Callable[[list[TableColumn]], TableColumnsBatch]) -> dict:
+        async def collect_with_strategy(strategy: str) -> dict | None:
+            if strategy != EXACT_STRATEGY:
+                # Cheaper strategies reuse the batch aggregate pass for the single column
+                batch = build_batch([column])
+                batch.value_set_limit = self.value_set_limit
+                batch.apply_strategy(strategy, self.degraded_sample_percent)
+                batch_stat = await batch.calc_batch_stat(self.executor)
+                return batch_stat.get(column.column_name) if batch_stat else None
+
+            common_stat = await column.get_count(self.executor)
+            time_limit = current_time_limit.get()
+            if time_limit and time_limit.timed_out:
+                return None
+            column.apply_cardinality_guard(common_stat)
+            quantitative_stat = await column.calc_column_stat(self.executor)
+            return {
+                **common_stat,
+                **quantitative_stat
+            }
+
+        column_stat, strategy = await run_with_degradation(collect_with_strategy)
+        if column_stat is None:
+            return build_failed_column_stat(column.col_type, "Failed to collect column stat with any strategy")
+        return {**column_stat, "strategy": strategy} if strategy else column_stat
+
+    async def discover_keys(self, table_description: dict, columns_combinations: TableColumnsCombinations) -> dict:
+        if not self.key_discovery or not table_description.get("TABLE_PROFILING_INFO"):
+            return table_description
+        profiling_info = table_description["TABLE_PROFILING_INFO"]
+        profiling_info["KEY_CANDIDATES"] = await self.key_discovery.discover(profiling_info.get("TABLE_COUNT", 0),
+                                                                             profiling_info.get("COLUMNS", {}),
+                                                                             columns_combinations,
+                                                                             self.executor)
+        return table_description
+
 
 class SNFProfiler(Profiler):
-    def __init__(self, table_config: list[dict], executor: SnowflakeExecutor | SparkExecutor = None):
+    def __init__(self,
+                 table_config: list[dict],
+                 executor: SnowflakeExecutor | SparkExecutor = None,
+                 column_batch_planner: ColumnBatchPlanner = None,
+                 value_set_limit: int = 0,
+                 key_discovery: KeyDiscovery = None,
+                 query_timeout_sec: float = None,
+                 table_timeout_sec: float = None,
+                 degraded_sample_percent: float = 1):
         super().__init__(table_config=table_config,
-                         executor=SnowflakeExecutor(SNF_CONFIG))
+                         executor=executor or SnowflakeExecutor(SNF_CONFIG),
+                         column_batch_planner=column_batch_planner,
+                         value_set_limit=value_set_limit,
+                         key_discovery=key_discovery,
+                         query_timeout_sec=query_timeout_sec,
+                         table_timeout_sec=table_timeout_sec,
+                         degraded_sample_percent=degraded_sample_percent)
         self.supported_datasource_type = "SNF"
 
     async def get_tables_descriptions(self):
-        tables_to_profile = []
-
-        for table_info in self.table_config:
-            if not table_info.get("datasource_type") == TableType.SNF.value:
-                raise UnexpectedTableType(TableType.SNF.value)
-            if not table_info.get("schema") or not table_info.get("name"):
-                raise IncorrectConfigError()
-
-            table = SNFTable(table_info.get("schema"), table_info.get("name"), table_info.get("columns"))
-            tables_to_profile.append(table)
-
-        tables_description = [self.__describe_table(tbl, tbl.columns) for tbl in tables_to_profile]
+        tables_description = [self.describe_table_config(table_info) for table_info in self.table_config]
         return await asyncio.gather(*tables_description)
 
+    async def describe_table_config(self,
+                                    table_info: dict,
+                                    sample_percent: float = None,
+                                    table_size: dict = None) -> dict:
+        table = self.__build_table(table_info)
+        table.sample_percent = sample_percent
+        with self.build_time_limit():
+            return await self.discover_keys(await self.__describe_table(table, table.columns),
+                                            SNFTableColumnsCombinations(table.schema, table.name,
+                                                                        sample_percent=table.sample_percent,
+                                                                        filter_predicate=table.filter_predicate))
+
+    async def estimate_table_size(self, table_info: dict) -> dict:
+        return await self.__build_table(table_info).get_size(self.executor)
+
+    def build_rules_check(self, table_info: dict) -> TableRulesCheck:
+        table = self.__build_table(table_info)
+        return TableRulesCheck(table.schema, table.name, filter_predicate=table.filter_predicate)
+
+    @staticmethod
+    def __build_table(table_info: dict) -> SNFTable:
+        if not table_info.get("datasource_type") == TableType.SNF.value:
+            raise UnexpectedTableType(TableType.SNF.value)
+        if not table_info.get("schema") or not table_info.get("name"):
+            raise IncorrectConfigError()
+
+        return SNFTable(table_info.get("schema"),
+                        table_info.get("name"),
+                        table_info.get("columns"),
+                        filter_predicate=build_filter_predicate(table_info))
+
     async def __describe_table(self, table: SNFTable, columns: list[str] = None) -> dict:
         table_cnt_info = await table.get_count(self.executor)
 
@@ -67,64 +190,342 @@ class SNFProfiler(Profiler):
             }
         }
         columns_to_describe = columns if columns else await table.get_columns_list(self.executor)
-
+        semi_structured_columns = {col.upper() for col in await table.get_semi_structured_columns(self.executor)}
+        nested_columns = [col for col in columns_to_describe if col.upper() in semi_structured_columns]
+        columns_to_describe = [col for col in columns_to_describe if col.upper() not in semi_structured_columns]
+        if nested_columns:
+            table_description["TABLE_PROFILING_INFO"]["COLUMNS"] = await self.__describe_nested_columns(
+                table, nested_columns)
+
+        if self.column_batch_planner:
+            columns_types = await table.get_columns_types(self.executor)
+            table_description["TABLE_PROFILING_INFO"]["COLUMNS"].update(await self.column_batch_planner.collect_stats(
+                [SNFTableColumn(table.schema, table.name, col,
+                                col_type=columns_types.get(col.upper(), ColumnType.TEXT.value),
+                                sample_percent=table.sample_percent,
+                                filter_predicate=table.filter_predicate)
+                 for col in columns_to_describe],
+                lambda batch_columns: SNFTableColumnsBatch(table.schema, table.name, batch_columns,
+                                                           sample_percent=table.sample_percent,
+                                                           filter_predicate=table.filter_predicate),
+                self.executor))
+            return table_description
+
+        # Types are needed only by the cheaper strategies of columns timed out with exact stats
+        columns_types = await table.get_columns_types(self.executor) \
+            if self.query_timeout_sec or self.table_timeout_sec else {}
         for col in columns_to_describe:
-            table_description["TABLE_PROFILING_INFO"]["COLUMNS"][col] = await self.__collect_column_stat(SNFTableColumn(
-                table.schema,
-                table.name,
-                col))
+            table_description["TABLE_PROFILING_INFO"]["COLUMNS"][col] = await self.collect_column_stat(
+                SNFTableColumn(table.schema,
+                               table.name,
+                               col,
+                               col_type=columns_types.get(col.upper()),
+                               sample_percent=table.sample_percent,
+                               filter_predicate=table.filter_predicate,
+                               value_set_limit=self.value_set_limit),
+                lambda batch_columns: SNFTableColumnsBatch(table.schema, table.name, batch_columns,
+                                                           sample_percent=table.sample_percent,
+                                                           filter_predicate=table.filter_predicate))
         return table_description
 
-    async def __collect_column_stat(self, column: SNFTableColumn) -> dict:
-        common_stat = await column.get_count(self.executor)
-        quantitative_stat = await column.calc_column_stat(self.executor)
-        return {
-            **common_stat,
-            **quantitative_stat
-        }
+    async def __describe_nested_columns(self, table: SNFTable, nested_columns: list[str]) -> dict:
+        # Leaf paths of semi-structured columns are profiled as typed path expressions. Paths outside arrays
+        # share batches over the table, paths within an array share batches over the flattened elements
+        leaf_paths = await table.get_semi_structured_paths(self.executor, nested_columns)
+        if leaf_paths is None:
+            return {col: {"ERROR": "Failed to discover paths of a semi-structured column"} for col in nested_columns}
+
+        table_leaves, array_leaves = {}, {}
+        for leaf_path, col_type in leaf_paths.items():
+            root, path = SNFTable.split_variant_path(leaf_path)
+            array_path, within_array, element_path = path.partition("[]")
+            if not within_array:
+                table_leaves[SNFTable.build_variant_path_expression(root, path, col_type)] = (leaf_path, col_type)
+            elif "[]" not in element_path:
+                # Arrays nested into array elements would need a FLATTEN per level and are left out
+                array_leaves.setdefault(SNFTable.build_variant_path_expression(root, array_path), {})[
+                    SNFTable.build_variant_path_expression("element", element_path, col_type)] = (leaf_path, col_type)
+
+        column_batch_planner = self.column_batch_planner or ColumnBatchPlanner(value_set_limit=self.value_set_limit)
+        columns_stat = {}
+        for array_expression, leaves in [(None, table_leaves)] + list(array_leaves.items()):
+            if not leaves:
+                continue
+            leaves_stat = await column_batch_planner.collect_stats(
+                [SNFTableColumn(table.schema, table.name, expression, col_type=col_type,
+                                sample_percent=table.sample_percent,
+                                filter_predicate=table.filter_predicate)
+                 for expression, (_, col_type) in leaves.items()],
+                lambda batch_columns: SNFTableColumnsBatch(table.schema, table.name, batch_columns,
+                                                           sample_percent=table.sample_percent,
+                                                           filter_predicate=table.filter_predicate)
+                if array_expression is None else
+                SNFArrayElementsBatch(table.schema, table.name, batch_columns, array_expression,
+                                      sample_percent=table.sample_percent,
+                                      filter_predicate=table.filter_predicate),
+                self.executor)
+            columns_stat.update({leaves[expression][0]: {**leaf_stat, "nested": True}
+                                 for expression, leaf_stat in leaves_stat.items()})
+        return columns_stat
 
 
 class SparkProfiler(Profiler):
     def __init__(self,
                  table_config: list[dict],
                  csv_separator: str = ',',
-                 executor: SnowflakeExecutor | SparkExecutor = SparkExecutor()):
+                 partition_parallelism: int = 4,
+                 executor: SnowflakeExecutor | SparkExecutor = SparkExecutor(),
+                 column_batch_planner: ColumnBatchPlanner = None,
+                 value_set_limit: int = 0,
+                 key_discovery: KeyDiscovery = None,
+                 parallel_listing_threshold: int = 10,
+                 tune_execution: bool = False,
+                 query_timeout_sec: float = None,
+                 table_timeout_sec: float = None,
+                 degraded_sample_percent: float = 1):
         super().__init__(table_config=table_config,
-                         executor=executor)
+                         executor=executor,
+                         column_batch_planner=column_batch_planner,
+                         value_set_limit=value_set_limit,
+                         key_discovery=key_discovery,
+                         query_timeout_sec=query_timeout_sec,
+                         table_timeout_sec=table_timeout_sec,
+                         degraded_sample_percent=degraded_sample_percent)
         self.supported_datasource_type = "SPARK"
         self.csv_separator = csv_separator
-
-    def read_data_inferring_data_type(self, table_info: dict):
-        match table_info.get('path').split('.')[-1]:
+        self.partition_parallelism = partition_parallelism
+        self.parallel_listing_threshold = parallel_listing_threshold
+        self.tune_execution = tune_execution
+        # Datasets with more directories than the threshold are listed by a distributed Spark job
+        # instead of the driver walking the file system one directory at a time
+        self.executor.spark_session.conf.set("spark.sql.sources.parallelPartitionDiscovery.threshold",
+                                             parallel_listing_threshold)
+
+    @Profiler.table_config.setter
+    def table_config(self, table_config: list[dict]):
+        self.__init__(table_config=table_config,
+                      csv_separator=self.csv_separator,
+                      partition_parallelism=self.partition_parallelism,
+                      executor=self.executor,
+                      column_batch_planner=self.column_batch_planner,
+                      value_set_limit=self.value_set_limit,
+                      key_discovery=self.key_discovery,
+                      parallel_listing_threshold=self.parallel_listing_threshold,
+                      tune_execution=self.tune_execution,
+                      query_timeout_sec=self.query_timeout_sec,
+                      table_timeout_sec=self.table_timeout_sec,
+                      degraded_sample_percent=self.degraded_sample_percent)
+
+    @staticmethod
+    def get_paths(table_info: dict) -> list[str]:
+        return table_info.get('path') if isinstance(table_info.get('path'), list) else [table_info.get('path')]
+
+    def glob_file_statuses(self, path: str) -> tuple:
+        jvm = self.executor.spark_session.sparkContext._jvm
+        hadoop_conf = self.executor.spark_session.sparkContext._jsc.hadoopConfiguration()
+        hadoop_path = jvm.org.apache.hadoop.fs.Path(path)
+        file_system = hadoop_path.getFileSystem(hadoop_conf)
+        return file_system, file_system.globStatus(hadoop_path) or []
+
+    def iterate_data_files(self, path: str):
+        file_system, statuses = self.glob_file_statuses(path)
+        for status in statuses:
+            if status.isFile():
+                yield status.getPath().toString()
+                continue
+            files = file_system.listFiles(status.getPath(), True)
+            while files.hasNext():
+                yield files.next().getPath().toString()
+
+    def detect_dataset_format(self, table_info: dict) -> str | None:
+        if table_info.get('format'):
+            return table_info.get('format')
+        for path in self.get_paths(table_info):
+            if detect_file_format(path):
+                return detect_file_format(path)
+        # Directories and globs without an extension take the format of the first data file found,
+        # the rest of the files are not listed here since Spark lists them once again on read
+        for path in self.get_paths(table_info):
+            for file_path in self.iterate_data_files(path):
+                if is_data_file(file_path):
+                    return detect_file_format(file_path)
+        return None
+
+    def read_data_inferring_data_type(self, table_info: dict, spark_session: SparkSession = None):
+        # All files of the dataset are read as one DataFrame, compressed csv and json files are decompressed by Spark
+        spark_session = spark_session or self.executor.spark_session
+        file_format = self.detect_dataset_format(table_info)
+        match file_format:
             case 'csv':
-                table = self.executor.spark_session.read.csv(path=table_info.get('path'),
-                                                             inferSchema=True,
-                                                             header=True,
-                                                             sep=self.csv_separator)
-                table.name = table_info.get('name')
-                return table
-            case 'parquet':
-                table = self.executor.spark_session.read.option("mergeSchema", "true").parquet(table_info.get('path'))
-                table.name = table_info.get('name')
-                return table
+                reader = spark_session.read.options(inferSchema=True,
+                                                    header=True,
+                                                    sep=self.csv_separator)
+            case 'parquet' | 'orc':
+                reader = spark_session.read.option("mergeSchema", "true")
+            case 'json':
+                reader = spark_session.read
             case _:
-                print(f'Empty dataframe will be created instead of data from {table_info.get("path")}'
-                      f'since file type is not supported by this profiler')
-                return self.executor.spark_session.createDataFrame([])
+                raise UnsupportedFileFormatError(table_info.get('path'))
+        table = reader.format(file_format).load(self.get_paths(table_info))
+
+        filter_predicate = build_filter_predicate(table_info)
+        if filter_predicate:
+            # Filtered before the view is registered, so partition filters and pushed down predicates
+            # reduce the files read by every query
+            table = table.where(filter_predicate)
+        table.name = table_info.get('name')
+        return table
 
     async def get_tables_descriptions(self):
-        tables_to_profile = []
+        tables_description = [self.describe_table_config(table_info) for table_info in self.table_config]
+        return await asyncio.gather(*tables_description)
 
-        for table_info in self.table_config:
-            if table_info.get("datasource_type") and not table_info.get("datasource_type") == TableType.SPARK.value:
-                raise UnexpectedTableType(TableType.SPARK.value)
-            if not table_info.get("path"):
-                raise IncorrectConfigError()
+    async def describe_table_config(self,
+                                    table_info: dict,
+                                    sample_percent: float = None,
+                                    table_size: dict = None) -> dict:
+        self.__validate_table_info(table_info)
+        with self.build_time_limit():
+            return await self.__describe_table_config(table_info, sample_percent, table_size)
+
+    async def __describe_table_config(self,
+                                      table_info: dict,
+                                      sample_percent: float = None,
+                                      table_size: dict = None) -> dict:
+        # Every table is read in a session of its own. Temp views are registered under table names, so tables
+        # of concurrent jobs with the same name, as well as their settings, do not clash
+        spark_session = build_table_session(self.executor.spark_session, self.parallel_listing_threshold)
+        try:
+            table = self.read_data_inferring_data_type(table_info, spark_session)
+        except UnsupportedFileFormatError as e:
+            return {
+                "TABLE_NAME": table_info.get('name'),
+                "ERROR": str(e),
+            }
+        execution_profile = None
+        if self.tune_execution:
+            if table_size is None:
+                table_size = await self.estimate_table_size(table_info)
+            execution_profile = build_spark_execution_profile(
+                table_size.get("BYTES") * (sample_percent or 100) // 100 if table_size.get("BYTES") else None,
+                len(table.columns),
+                spark_session.sparkContext.defaultParallelism)
+            for key, value in execution_profile.items():
+                spark_session.conf.set(key, value)
+        if sample_percent:
+            table_name = table.name
+            table = table.sample(fraction=sample_percent / 100, seed=SAMPLE_SEED)
+            table.name = table_name
+        if table_info.get("partitioned"):
+            table_description = await self.__describe_partitioned_table(table, table_info.get("partitions"))
+        else:
+            table_description = await self.__describe_table(table)
+        if execution_profile:
+            table_description["EXECUTION_PROFILE"] = execution_profile
+        # Keys are discovered over the whole table, even when its stats were merged from partitions
+        return await self.discover_keys(table_description, TableColumnsCombinations('', table.name, df_table=table))
+
+    async def estimate_table_size(self, table_info: dict) -> dict:
+        self.__validate_table_info(table_info)
+        try:
+            # Sizes of globbed files come with their statuses, only directories need a content summary.
+            # Summaries are requested concurrently, since each of them is a round trip to the file system
+            files_bytes, directories = 0, []
+            for path in self.get_paths(table_info):
+                file_system, statuses = self.glob_file_statuses(path)
+                for status in statuses:
+                    if status.isFile():
+                        files_bytes += int(status.getLen())
+                    else:
+                        directories.append((file_system, status.getPath()))
+            directories_bytes = await asyncio.gather(*[asyncio.to_thread(self.get_directory_bytes, file_system, path)
+                                                       for file_system, path in directories])
+            return {"BYTES": files_bytes + sum(directories_bytes)}
+        except Exception:
+            return {}
 
-            tables_to_profile.append(self.read_data_inferring_data_type(table_info))
+    @staticmethod
+    def get_directory_bytes(file_system, path) -> int:
+        return int(file_system.getContentSummary(path).getLength())
+
+    def build_rules_check(self, table_info: dict) -> TableRulesCheck:
+        self.__validate_table_info(table_info)
+        table = self.read_data_inferring_data_type(
+            table_info, build_table_session(self.executor.spark_session, self.parallel_listing_threshold))
+        return TableRulesCheck('', table.name, df_table=table)
+
+    @staticmethod
+    def __validate_table_info(table_info: dict):
+        if table_info.get("datasource_type") and not table_info.get("datasource_type") == TableType.SPARK.value:
+            raise UnexpectedTableType(TableType.SPARK.value)
+        if not table_info.get("path"):
+            raise IncorrectConfigError()
+
+    @staticmethod
+    def list_partitions(table: DataFrame) -> list[tuple[tuple[str, str | None], ...]]:
+        # Hive-style partition values are taken from the file paths, so no data is scanned to discover them
+        partitions = set()
+        for file_path in table.inputFiles():
+            partition_spec = []
+            for segment in reversed(file_path.split('/')[:-1]):
+                if '=' not in segment:
+                    break
+                key, value = segment.split('=', 1)
+                partition_spec.insert(0, (unquote(key),
+                                          None if value == '__HIVE_DEFAULT_PARTITION__' else unquote(value)))
+            if partition_spec:
+                partitions.add(tuple(partition_spec))
+        return sorted(partitions, key=lambda spec: [(key, str(value)) for key, value in spec])
+
+    @staticmethod
+    def build_partition_condition(partition_spec: tuple):
+        return reduce(lambda cond, other: cond & other, [F.col(key).eqNullSafe(value) for key, value in partition_spec])
+
+    async def __describe_partitioned_table(self, table: DataFrame, partitions_to_profile: list[str] = None):
+        all_partitions = {'/'.join(f'{key}={value}' for key, value in spec): spec
+                          for spec in self.list_partitions(table)}
+        partitions = all_partitions
+        if partitions_to_profile:
+            partitions = {name: spec for name, spec in partitions.items() if name in partitions_to_profile}
+        if not partitions:
+            return await self.__describe_table(table)
+
+        semaphore = asyncio.Semaphore(self.partition_parallelism)
+
+        async def describe_partition(partition_num: int, partition_spec: tuple) -> dict:
+            partition = table.where(self.build_partition_condition(partition_spec))
+            partition.name = f'{table.name}__partition_{partition_num}'
+            async with semaphore:
+                # Spark calls are blocking, so each partition gets its own thread and event loop
+                # to let Spark schedule jobs of different partitions concurrently
+                return await asyncio.to_thread(asyncio.run, self.__describe_table(partition))
+
+        partition_profiles = await asyncio.gather(*[describe_partition(num, spec)
+                                                    for num, spec in enumerate(partitions.values())])
+        partition_profiles = dict(zip(partitions.keys(), partition_profiles))
+
+        if all(profile.get("ERROR") for profile in partition_profiles.values()):
+            return {
+                "TABLE_NAME": f"{table.name}",
+                "ERROR": "All partitions failed to be profiled",
+                "PARTITIONS": partition_profiles,
+            }
 
-        tables_description = [self.__describe_table(tbl) for tbl in tables_to_profile]
-        return await asyncio.gather(*tables_description)
+        # Distinct estimates, percentiles, histograms, moments and text shapes of partitions cannot be combined,
+        # they are taken from one aggregate pass over all profiled partitions without the top values scan
+        profiled_specs = [partitions[name] for name, profile in partition_profiles.items() if not profile.get("ERROR")]
+        profiled_table = table
+        if len(profiled_specs) < len(all_partitions):
+            profiled_table = table.where(reduce(lambda cond, other: cond | other,
+                                                [self.build_partition_condition(spec) for spec in profiled_specs]))
+            profiled_table.name = f'{table.name}__profiled_partitions'
+        columns_to_describe, _ = self.__build_columns(profiled_table)
+        column_batch_planner = self.column_batch_planner or ColumnBatchPlanner(value_set_limit=self.value_set_limit)
+        union_stats = await column_batch_planner.collect_aggregate_stats(
+            columns_to_describe,
+            lambda batch_columns: TableColumnsBatch('', profiled_table.name, batch_columns, df_table=profiled_table),
+            self.executor)
+        return merge_partition_profiles(table.name, partition_profiles, union_stats)
 
     async def __describe_table(self, table: DataFrame):
         if table.isEmpty():
@@ -140,29 +541,69 @@ class SparkProfiler(Profiler):
             }
         }
 
-        for col in table.columns:
-            col_type = ColumnType.TEXT.value
+        columns_to_describe, nested_columns = self.__build_columns(table)
+        if self.column_batch_planner:
+            table_description["TABLE_PROFILING_INFO"]["COLUMNS"] = await self.column_batch_planner.collect_stats(
+                columns_to_describe,
+                lambda batch_columns: TableColumnsBatch('', table.name, batch_columns, df_table=table),
+                self.executor)
+        else:
+            for column in columns_to_describe:
+                table_description["TABLE_PROFILING_INFO"]["COLUMNS"][column.column_name] = \
+                    await self.collect_column_stat(
+                        column, lambda batch_columns: TableColumnsBatch('', table.name, batch_columns, df_table=table))
+
+        if nested_columns:
+            table_description["TABLE_PROFILING_INFO"]["COLUMNS"].update(
+                await self.__describe_nested_columns(table, nested_columns))
+        return table_description
 
-            if table.schema[col] in [types.LongType(), types.NumericType(), types.FloatType(),
-                                     types.DecimalType(), types.DoubleType()]:
-                col_type = ColumnType.NUMERIC.value
-            elif table.schema[col] in [types.DateType()]:
-                col_type = ColumnType.TIMESTAMP.value
+    def __build_columns(self, table: DataFrame) -> tuple[list[TableColumn], list[tuple]]:
+        columns_to_describe, nested_columns = [], []
+        for col in table.columns:
+            # schema[col] is a StructField, type checks have to be done against its dataType
+            if isinstance(table.schema[col].dataType, NESTED_DATA_TYPES):
+                nested_columns.append((F.col(col), col, table.schema[col].dataType))
+                continue
 
-            table_description["TABLE_PROFILING_INFO"]["COLUMNS"][col] = await self.__collect_column_stat(TableColumn(
+            columns_to_describe.append(TableColumn(
                 schema='',
                 table_name=table.name,
                 configured_table_name=table.name,
                 column_name=col,
                 df_table=table,
-                col_type=col_type))
+                col_type=self.get_column_type(table.schema[col].dataType),
+                value_set_limit=self.value_set_limit))
+        return columns_to_describe, nested_columns
+
+    @staticmethod
+    def get_column_type(data_type: types.DataType) -> str:
+        if isinstance(data_type, types.NumericType):
+            return ColumnType.NUMERIC.value
+        elif isinstance(data_type, (types.DateType, types.TimestampType, types.TimestampNTZType)):
+            return ColumnType.TIMESTAMP.value
+        return ColumnType.TEXT.value
+
+    async def __describe_nested_columns(self, table: DataFrame, nested_columns: list[tuple]) -> dict:
+        # Leaf paths of structs, arrays and maps are profiled as ordinary columns of expanded DataFrames.
+        # Leaves of one DataFrame are always collected with a batch, so all paths sharing rows cost one scan
+        column_batch_planner = self.column_batch_planner or ColumnBatchPlanner(value_set_limit=self.value_set_limit)
+        columns_stat = {}
+        for slice_num, (nested_slice, leaf_paths) in enumerate(expand_nested_columns(table, nested_columns)):
+            nested_slice.name = f'{table.name}__nested_{slice_num}'
+            leaves = [TableColumn(schema='',
+                                  table_name=nested_slice.name,
+                                  configured_table_name=nested_slice.name,
+                                  column_name=leaf,
+                                  df_table=nested_slice,
+                                  col_type=self.get_column_type(nested_slice.schema[leaf].dataType),
+                                  value_set_limit=self.value_set_limit)
+                      for leaf in leaf_paths]
+            slice_stat = await column_batch_planner.collect_stats(
+                leaves,
+                lambda batch_columns: TableColumnsBatch('', nested_slice.name, batch_columns, df_table=nested_slice),
+                self.executor)
+            columns_stat.update({leaf_paths[leaf]: {**leaf_stat, "nested": True}
+                                 for leaf, leaf_stat in slice_stat.items()})
+        return columns_stat
 
-        return table_description
-
-    async def __collect_column_stat(self, column: TableColumn) -> dict:
-        common_stat = await column.get_count(self.executor)
-        quantitative_stat = await column.calc_column_stat(self.executor)
-        return {
-            **common_stat,
-            **quantitative_stat
-        }
@@ -0,0 +1,196 @@
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import threading
+import uuid
+
+from utils.profilers import Profiler
+from utils.scheduler import TableScheduler
+from utils.history_store import ProfileHistoryStore
+from utils.drift_detector import DriftDetector
+from utils.analyzer import Analyzer
+from utils.rule_validator import RuleValidator
+from helpers.result_model import ProfilingResultEncoder
+
+
+class ProfilingService:
+    # Profilers and their executors are created once and shared by all jobs, so a job pays only for its queries.
+    # Jobs run on one long-lived event loop, at most max_concurrent_jobs of them at the same time, the rest wait
+    def __init__(self,
+                 profilers: dict[str, Profiler],
+                 constraint_identification_rules: dict[str, list[dict]],
+                 add_adf_framework_template: bool = False,
+                 validate_suggested_rules: bool = False,
+                 max_concurrent_jobs: int = 2,
+                 max_finished_jobs: int = 100,
+                 concurrency_slots: int = 4,
+                 trace_file_path: str = None,
+                 history_store: ProfileHistoryStore = None,
+                 detect_drift: bool = False):
+        self.profilers = profilers
+        self.constraint_identification_rules = constraint_identification_rules
+        self.add_adf_framework_template = add_adf_framework_template
+        self.validate_suggested_rules = validate_suggested_rules
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_finished_jobs = max_finished_jobs
+        self.concurrency_slots = concurrency_slots
+        self.trace_file_path = trace_file_path
+        self.history_store = history_store
+        self.detect_drift = detect_drift
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        # History files and index are rewritten by every run, so jobs read and append them one at a time
+        self.history_lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.job_slots = None
+
+    def start(self):
+        self.loop_thread.start()
+        # Semaphore has to be bound to the loop the jobs run on
+        self.job_slots = asyncio.run_coroutine_threadsafe(self.__create_job_slots(), self.loop).result()
+
+    async def __create_job_slots(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.max_concurrent_jobs)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+
+    def submit(self, job_request: dict) -> dict:
+        if not isinstance(job_request.get("tables"), list) or not job_request["tables"]:
+            return {"ERROR": "Job has to contain a non-empty list of tables"}
+
+        job_id = str(uuid.uuid4())
+        with self.jobs_lock:
+            self.jobs[job_id] = {
+                "JOB_ID": job_id,
+                "STATUS": "QUEUED",
+                "SUBMITTED_TS": datetime.now().isoformat(),
+            }
+            self.__forget_finished_jobs()
+        job_future = asyncio.run_coroutine_threadsafe(self.run_job(job_id, job_request), self.loop)
+        if job_request.get("wait"):
+            job_future.result()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self.jobs_lock:
+            return dict(self.jobs[job_id]) if job_id in self.jobs else None
+
+    def list_jobs(self) -> list[dict]:
+        with self.jobs_lock:
+            return [{key: job[key] for key in ["JOB_ID", "STATUS", "SUBMITTED_TS"]} for job in self.jobs.values()]
+
+    def __forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["STATUS"] in ["DONE", "FAILED"]]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def __update_job(self, job_id: str, **job_fields):
+        with self.jobs_lock:
+            self.jobs[job_id].update(job_fields)
+
+    async def run_job(self, job_id: str, job_request: dict):
+        async with self.job_slots:
+            self.__update_job(job_id, STATUS="RUNNING", STARTED_TS=datetime.now().isoformat())
+            try:
+                # Jobs of a service run concurrently, so each of them gets its own scheduler.
+                # The scheduler reads the trace file when created, which is done in a thread
+                scheduler = await asyncio.to_thread(TableScheduler,
+                                                    self.profilers,
+                                                    concurrency_slots=self.concurrency_slots,
+                                                    trace_file_path=self.trace_file_path)
+                profiling_results = await scheduler.run(job_request["tables"])
+
+                # History, analysis and validation read files and wait for queries without yielding,
+                # so they run in threads and the loop keeps serving the other jobs
+                drift_by_table = None
+                if self.history_store:
+                    drift_by_table = await asyncio.to_thread(self.__update_history, profiling_results)
+
+                suggested_constraints = await asyncio.to_thread(Analyzer(
+                    profiling_results=profiling_results,
+                    constraint_identification_rules=job_request.get("constraint_identification_rules",
+                                                                    self.constraint_identification_rules),
+                    add_adf_framework_template=self.add_adf_framework_template,
+                    drift_by_table=drift_by_table).suggest_constraints)
+                if job_request.get("validate_suggested_rules", self.validate_suggested_rules):
+                    suggested_constraints = await asyncio.to_thread(
+                        asyncio.run, RuleValidator(self.profilers).validate(job_request["tables"],
+                                                                            suggested_constraints))
+            except Exception as e:
+                self.__update_job(job_id, STATUS="FAILED", FINISHED_TS=datetime.now().isoformat(), ERROR=str(e))
+                return
+            self.__update_job(job_id,
+                              STATUS="DONE",
+                              FINISHED_TS=datetime.now().isoformat(),
+                              PROFILING_RESULTS=profiling_results,
+                              SUGGESTED_CONSTRAINTS=suggested_constraints)
+
+    def __update_history(self, profiling_results: list[dict]) -> dict | None:
+        with self.history_lock:
+            drift_by_table = DriftDetector().detect(profiling_results, self.history_store) \
+                if self.detect_drift else None
+            self.history_store.append_run(profiling_results)
+        return drift_by_table
+
+    def serve_forever(self, host: str = '127.0.0.1', port: int = 8765):
+        self.start()
+        server = ThreadingHTTPServer((host, port), build_request_handler(self))
+        print(f"Profiling service is listening on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stop()
+
+
+def build_request_handler(service: ProfilingService) -> type[BaseHTTPRequestHandler]:
+    # POST /jobs submits a job, with "wait": true the response is returned when the job is finished.
+    # GET /jobs lists jobs, GET /jobs/<JOB_ID> returns status and results of a job
+    class ProfilingRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, body):
+            payload = json.dumps(body, cls=ProfilingResultEncoder).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            path = self.path.rstrip("/").split("/")[1:]
+            if path == ["jobs"]:
+                self.send_json(200, service.list_jobs())
+            elif len(path) == 2 and path[0] == "jobs":
+                job = service.get_job(path[1])
+                if job:
+                    self.send_json(200, job)
+                else:
+                    self.send_json(404, {"ERROR": "Unknown job"})
+            else:
+                self.send_json(404, {"ERROR": "Unknown endpoint"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self.send_json(404, {"ERROR": "Unknown endpoint"})
+                return
+            try:
+                job_request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except json.JSONDecodeError:
+                self.send_json(400, {"ERROR": "Job has to be a JSON object"})
+                return
+            if not isinstance(job_request, dict):
+                self.send_json(400, {"ERROR": "Job has to be a JSON object"})
+                return
+
+            job = service.submit(job_request)
+            if job.get("ERROR") and not job.get("JOB_ID"):
+                self.send_json(400, job)
+            else:
+                self.send_json(200 if job["STATUS"] in ["DONE", "FAILED"] else 202, job)
+
+    return ProfilingRequestHandler
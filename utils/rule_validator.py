@@ -0,0 +1,68 @@
+import asyncio
+
+from utils.profilers import Profiler
+from utils.scheduler import TableScheduler
+from helpers.run_trace import build_table_key, get_table_key
+
+
+class RuleValidator:
+    def __init__(self, profilers: dict[str, Profiler]):
+        self.profilers = profilers
+
+    async def validate(self, table_config: list[dict], suggested_constraints: list[dict]) -> list[dict]:
+        suggestions_by_table = {get_table_key(table): table for table in suggested_constraints}
+        validations = []
+        for table_info in table_config:
+            profiler = self.profilers.get(TableScheduler.get_datasource_type(table_info))
+            table_suggestions = suggestions_by_table.get(build_table_key(table_info)) \
+                or suggestions_by_table.get(table_info.get("name"))
+            if not profiler or not table_suggestions:
+                continue
+            validations.append(self.validate_table(profiler, table_info, table_suggestions))
+        await asyncio.gather(*validations)
+        return suggested_constraints
+
+    @staticmethod
+    async def validate_table(profiler: Profiler, table_info: dict, table_suggestions: dict):
+        rules_check = profiler.build_rules_check(table_info)
+
+        checked_constraints, expressions, not_validatable = [], [], 0
+        for col_name, col_suggestions in table_suggestions["SUGGESTED_CONSTRAINTS"].items():
+            # Nested paths are not columns of the table and can not be referenced in the check query
+            if col_suggestions["BASE_INFO"].get("nested"):
+                continue
+            for constraint in col_suggestions["POSSIBLE_CONSTRAINTS"]:
+                expression = rules_check.build_violation_expression(constraint.get("RULE"),
+                                                                    col_name,
+                                                                    constraint,
+                                                                    col_suggestions["BASE_INFO"])
+                if expression:
+                    checked_constraints.append(constraint)
+                    expressions.append(expression)
+                else:
+                    # E.g. determined lists of columns with too many values to be listed
+                    constraint["VALIDATION"] = {"VALIDATABLE": False}
+                    not_validatable += 1
+        if not expressions:
+            return
+
+        violations = await rules_check.count_violations(profiler.executor, expressions)
+        if violations is None:
+            table_suggestions["VALIDATION"] = {"ERROR": "Failed to check suggested rules"}
+            return
+
+        # Rules suggested from thresholds or percentiles hold while violating rows stay within the tolerated share
+        for constraint, rule_violations in zip(checked_constraints, violations["violations"]):
+            violation_share = rule_violations / violations["table_cnt"] if violations["table_cnt"] else 0
+            constraint["VALIDATION"] = {
+                "VALIDATABLE": True,
+                "VIOLATIONS": rule_violations,
+                "VIOLATION_SHARE": violation_share,
+                "HOLDS": violation_share <= constraint.get("TOLERATED_VIOLATION_SHARE", 0),
+            }
+        table_suggestions["VALIDATION"] = {
+            "CHECKED_ROWS": violations["table_cnt"],
+            "CHECKED_RULES": len(checked_constraints),
+            "VIOLATED_RULES": sum(1 for constraint in checked_constraints if not constraint["VALIDATION"]["HOLDS"]),
+            "NOT_VALIDATABLE_RULES": not_validatable,
+        }
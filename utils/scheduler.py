@@ -0,0 +1,138 @@
+from datetime import datetime
+import asyncio
+import heapq
+import time
+
+from utils.profilers import Profiler
+from utils.budgeted_profiling import ProgressiveRefinement
+from helpers.run_trace import build_table_key, read_trace, append_trace
+from helpers.result_model import compact_table_description
+
+
+class TableScheduler:
+    # Used until the trace has timings to learn the throughput from
+    DEFAULT_SECONDS_PER_GB = 60
+    DEFAULT_SECONDS_PER_MILLION_ROWS = 30
+    DEFAULT_TABLE_SECONDS = 10
+
+    def __init__(self,
+                 profilers: dict[str, Profiler],
+                 concurrency_slots: int = 4,
+                 trace_file_path: str = None):
+        self.profilers = profilers
+        self.concurrency_slots = max(1, concurrency_slots)
+        self.trace_file_path = trace_file_path
+        self.trace = read_trace(trace_file_path)
+
+    @staticmethod
+    def get_datasource_type(table_info: dict) -> str:
+        return table_info.get("datasource_type") if table_info.get("datasource_type") else "SPARK"
+
+    def assign_profilers(self, table_config: list[dict]) -> list[tuple[dict, Profiler]]:
+        assigned = []
+        for table_info in table_config:
+            profiler = self.profilers.get(self.get_datasource_type(table_info))
+            if not profiler:
+                print(f'Table {build_table_key(table_info)} is skipped since there is no profiler '
+                      f'for datasource type {self.get_datasource_type(table_info)}')
+                continue
+            assigned.append((table_info, profiler))
+        return assigned
+
+    async def estimate_costs(self, assigned: list[tuple[dict, Profiler]]) -> list[dict]:
+        # Size lookups block on Snowflake queries and file system listings, so each of them runs in a thread
+        # and the calling loop, e.g. the one shared by jobs of the profiling service, is not stalled
+        sizes = await asyncio.gather(*[asyncio.to_thread(asyncio.run, profiler.estimate_table_size(table_info))
+                                       for table_info, profiler in assigned], return_exceptions=True)
+        # A misconfigured or unreachable table gets the default cost, its error is reported when it is profiled
+        sizes = [{} if isinstance(size, Exception) else size for size in sizes]
+        return [{**size, "ESTIMATED_SEC": self.estimate_cost(table_info, size)}
+                for (table_info, _), size in zip(assigned, sizes)]
+
+    def estimate_cost(self, table_info: dict, size: dict) -> float:
+        table_key = build_table_key(table_info)
+        table_history = [record for record in self.trace if record.get("table_key") == table_key]
+        if table_history:
+            last_run = table_history[-1]
+            # Previous timing is scaled by the growth of the table since that run
+            for size_measure in ["ROWS", "BYTES"]:
+                if size.get(size_measure) and last_run.get(size_measure):
+                    return last_run["elapsed_sec"] * size[size_measure] / last_run[size_measure]
+            return last_run["elapsed_sec"]
+
+        datasource_history = [record for record in self.trace
+                              if record.get("datasource_type") == self.get_datasource_type(table_info)]
+        for size_measure, default_rate, unit in [("BYTES", self.DEFAULT_SECONDS_PER_GB, 1024 ** 3),
+                                                 ("ROWS", self.DEFAULT_SECONDS_PER_MILLION_ROWS, 1000000)]:
+            if not size.get(size_measure):
+                continue
+            measured = [record for record in datasource_history if record.get(size_measure)]
+            if measured:
+                rate = sum(record["elapsed_sec"] for record in measured) \
+                       / sum(record[size_measure] for record in measured)
+                return rate * size[size_measure]
+            return default_rate * size[size_measure] / unit
+        return self.DEFAULT_TABLE_SECONDS
+
+    def pack(self, costs: list[float]) -> list[list[int]]:
+        # Longest processing time first: the next largest table goes to the least loaded slot
+        slots = [(0.0, slot_num) for slot_num in range(self.concurrency_slots)]
+        assignment = [[] for _ in range(self.concurrency_slots)]
+        for table_num in sorted(range(len(costs)), key=lambda x: -costs[x]):
+            load, slot_num = heapq.heappop(slots)
+            assignment[slot_num].append(table_num)
+            heapq.heappush(slots, (load + costs[table_num], slot_num))
+        return [slot for slot in assignment if slot]
+
+    async def profile_table(self, table_info: dict, profiler: Profiler, estimate: dict) -> tuple[dict, dict]:
+        ts = time.time()
+        if table_info.get("budget"):
+            refinement = ProgressiveRefinement(seconds=table_info["budget"].get("seconds"),
+                                               bytes_scanned=table_info["budget"].get("bytes"))
+            result = await refinement.profile(profiler, table_info, table_size=estimate)
+        else:
+            result = await profiler.describe_table_config(table_info, table_size=estimate)
+        result = compact_table_description(result)
+        result["TABLE_KEY"] = build_table_key(table_info)
+        return result, {
+            "run_ts": datetime.now().isoformat(),
+            "table_key": build_table_key(table_info),
+            "datasource_type": self.get_datasource_type(table_info),
+            # Sizes are the unfiltered and unsampled ones of the estimate, so they compare with later estimates
+            "ROWS": estimate.get("ROWS"),
+            "PROFILED_ROWS": result.get("TABLE_PROFILING_INFO", {}).get("TABLE_COUNT"),
+            "BYTES": estimate.get("BYTES"),
+            "COLUMNS": len(result.get("TABLE_PROFILING_INFO", {}).get("COLUMNS", {})),
+            "estimated_sec": estimate["ESTIMATED_SEC"],
+            "elapsed_sec": time.time() - ts,
+            "execution_profile": result.get("EXECUTION_PROFILE"),
+        }
+
+    async def run(self, table_config: list[dict]) -> list[dict]:
+        assigned = self.assign_profilers(table_config)
+        estimates = await self.estimate_costs(assigned)
+        plan = self.pack([estimate["ESTIMATED_SEC"] for estimate in estimates])
+
+        results = [None] * len(assigned)
+        trace_records = []
+
+        async def run_slot(slot: list[int]):
+            for table_num in slot:
+                table_info, profiler = assigned[table_num]
+                # A failed table does not stop the slot, its error is returned as its result without a timing
+                try:
+                    results[table_num], trace_record = await self.profile_table(table_info, profiler,
+                                                                                estimates[table_num])
+                except Exception as e:
+                    results[table_num] = {"TABLE_NAME": table_info.get("name"),
+                                          "TABLE_KEY": build_table_key(table_info),
+                                          "ERROR": str(e)}
+                    continue
+                trace_records.append(trace_record)
+
+        # Profilers block on Spark and Snowflake calls, so every slot runs in its own thread and event loop
+        try:
+            await asyncio.gather(*[asyncio.to_thread(asyncio.run, run_slot(slot)) for slot in plan])
+        finally:
+            append_trace(self.trace_file_path, trace_records)
+        return results
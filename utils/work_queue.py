@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils.scheduler import TableScheduler
+from helpers.run_trace import append_trace, build_table_key
+from helpers.result_model import ProfilingResultEncoder, compact_table_description
+
+
+class TableWorkQueue:
+    # Work items live in a SQLite file, so worker processes of one host can pull from it. The file must stay
+    # on a local disk, locks of SQLite are not reliable on network file systems.
+    # An item is claimed within an immediate transaction, claims of workers which stopped sending
+    # heartbeats for longer than lease_sec expire and the item is pulled again by another worker
+    def __init__(self, queue_path: str = 'profiling_queue.sqlite', lease_sec: float = 300):
+        self.queue_path = queue_path
+        self.lease_sec = lease_sec
+        with self.__connect() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS work_items (
+                item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                table_num INTEGER NOT NULL,
+                table_info TEXT NOT NULL,
+                estimate TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'PENDING',
+                worker_id TEXT,
+                heartbeat_ts REAL,
+                result TEXT
+            )""")
+
+    @contextmanager
+    def __connect(self):
+        connection = sqlite3.connect(self.queue_path, timeout=60, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def enqueue(self, run_id: str, table_config: list[dict], estimates: list[dict]):
+        with self.__connect() as connection:
+            connection.executemany(
+                "INSERT INTO work_items (run_id, table_num, table_info, estimate) VALUES (?, ?, ?, ?)",
+                [(run_id, table_num, json.dumps(table_info), json.dumps(estimate, cls=ProfilingResultEncoder))
+                 for table_num, (table_info, estimate) in enumerate(zip(table_config, estimates))])
+
+    def claim(self, worker_id: str, run_id: str = None) -> sqlite3.Row | None:
+        # Largest tables are pulled first, so slow tables start early and the small ones fill idle workers at the end.
+        # Only items of the given run are pulled, without a run the latest enqueued one is served,
+        # so items left over by a coordinator which died are not worked on within later runs
+        with self.__connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                item = connection.execute("""SELECT * FROM work_items
+                    WHERE run_id = COALESCE(?, (SELECT run_id FROM work_items ORDER BY item_id DESC LIMIT 1))
+                        AND (status = 'PENDING' OR (status = 'RUNNING' AND heartbeat_ts < ?))
+                    ORDER BY json_extract(estimate, '$.ESTIMATED_SEC') DESC, item_id
+                    LIMIT 1""", (run_id, time.time() - self.lease_sec)).fetchone()
+                if item:
+                    connection.execute("UPDATE work_items SET status = 'RUNNING', worker_id = ?, heartbeat_ts = ? "
+                                       "WHERE item_id = ?", (worker_id, time.time(), item["item_id"]))
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return item
+
+    def heartbeat(self, worker_id: str):
+        with self.__connect() as connection:
+            connection.execute("UPDATE work_items SET heartbeat_ts = ? WHERE worker_id = ? AND status = 'RUNNING'",
+                               (time.time(), worker_id))
+
+    def complete(self, item_id: int, worker_id: str, result: dict):
+        # An expired claim may have been taken over, only the current owner stores its result
+        with self.__connect() as connection:
+            connection.execute("UPDATE work_items SET status = 'DONE', result = ? "
+                               "WHERE item_id = ? AND worker_id = ? AND status = 'RUNNING'",
+                               (json.dumps(result, cls=ProfilingResultEncoder), item_id, worker_id))
+
+    def count_unfinished(self, run_id: str) -> int:
+        with self.__connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM work_items WHERE run_id = ? AND status != 'DONE'",
+                                      (run_id,)).fetchone()[0]
+
+    def collect_results(self, run_id: str) -> list[dict]:
+        with self.__connect() as connection:
+            return [compact_table_description(json.loads(item["result"]))
+                    for item in connection.execute("SELECT result FROM work_items WHERE run_id = ? AND status = 'DONE' "
+                                                   "ORDER BY table_num", (run_id,))]
+
+    def purge(self, run_id: str):
+        with self.__connect() as connection:
+            connection.execute("DELETE FROM work_items WHERE run_id = ?", (run_id,))
+
+
+class QueueWorker:
+    # Every slot pulls the next item as soon as it is done with the previous one,
+    # so no worker waits while there are tables left in the queue
+    def __init__(self,
+                 work_queue: TableWorkQueue,
+                 scheduler: TableScheduler,
+                 idle_sec: float = 0,
+                 poll_sec: float = 5,
+                 run_id: str = None):
+        self.work_queue = work_queue
+        self.scheduler = scheduler
+        self.idle_sec = idle_sec
+        self.poll_sec = poll_sec
+        self.run_id = run_id
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def run(self) -> int:
+        stop_heartbeat = threading.Event()
+
+        def send_heartbeats():
+            # Own thread, since slots block on Spark and Snowflake calls
+            while not stop_heartbeat.wait(self.work_queue.lease_sec / 3):
+                self.work_queue.heartbeat(self.worker_id)
+
+        heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+        heartbeat_thread.start()
+        try:
+            processed = await asyncio.gather(*[asyncio.to_thread(asyncio.run, self.run_slot())
+                                               for _ in range(self.scheduler.concurrency_slots)])
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+        return sum(processed)
+
+    async def run_slot(self) -> int:
+        processed, idle_since = 0, time.time()
+        while True:
+            item = self.work_queue.claim(self.worker_id, self.run_id)
+            if not item:
+                if time.time() - idle_since >= self.idle_sec:
+                    return processed
+                await asyncio.sleep(self.poll_sec)
+                continue
+
+            table_info = json.loads(item["table_info"])
+            profiler = self.scheduler.profilers.get(self.scheduler.get_datasource_type(table_info))
+            if not profiler:
+                result, trace_record = {"TABLE_NAME": table_info.get("name"),
+                                        "TABLE_KEY": build_table_key(table_info),
+                                        "ERROR": "No profiler for the datasource type on the worker"}, None
+            else:
+                try:
+                    result, trace_record = await self.scheduler.profile_table(table_info, profiler,
+                                                                              json.loads(item["estimate"]))
+                except Exception as e:
+                    result, trace_record = {"TABLE_NAME": table_info.get("name"),
+                                            "TABLE_KEY": build_table_key(table_info),
+                                            "ERROR": str(e)}, None
+            self.work_queue.complete(item["item_id"], self.worker_id, result)
+            if trace_record:
+                append_trace(self.scheduler.trace_file_path, [trace_record])
+            processed, idle_since = processed + 1, time.time()
+
+
+class QueueCoordinator:
+    # Coordinator puts the table list into the queue, works on it like any other worker
+    # and returns results of all workers in the order of the table list
+    def __init__(self, work_queue: TableWorkQueue, scheduler: TableScheduler, poll_sec: float = 5):
+        self.work_queue = work_queue
+        self.scheduler = scheduler
+        self.poll_sec = poll_sec
+
+    async def run(self, table_config: list[dict]) -> list[dict]:
+        run_id = uuid.uuid4().hex
+        assigned = self.scheduler.assign_profilers(table_config)
+        estimates = await self.scheduler.estimate_costs(assigned)
+        self.work_queue.enqueue(run_id, [table_info for table_info, _ in assigned], estimates)
+
+        # Claims of workers which died expire only by being claimed again, so the coordinator keeps pulling
+        # items until the run is done instead of waiting for the queue to drain on its own
+        worker = QueueWorker(self.work_queue, self.scheduler, poll_sec=self.poll_sec, run_id=run_id)
+        await worker.run()
+        while self.work_queue.count_unfinished(run_id):
+            await asyncio.sleep(self.poll_sec)
+            await worker.run()
+
+        results = self.work_queue.collect_results(run_id)
+        self.work_queue.purge(run_id)
+        return results